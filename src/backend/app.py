@@ -1,30 +1,128 @@
-from flask import Flask, request, jsonify
+import contextvars
+import hashlib
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from flask import Flask, Response, request, jsonify, stream_with_context
 from datetime import datetime
-from db.redis import get_all_stats, get_stat, increment_stat
+from bson.objectid import ObjectId
+from config import (
+    USERS_PAGE_SIZE, USERS_PAGE_MAX, TASK_BATCH_MAX, FRIEND_BATCH_MAX, TASKS_PAGE_MAX, EVENTS_HEARTBEAT,
+    HEALTH_CHECK_TIMEOUT, DASHBOARD_WORKERS, EVENTS_WSGI_MAX_STREAMS, EVENTS_RETRY_AFTER
+)
+from db import mongo, neo4j, redis
+from db.redis import (
+    iter_all_stats, get_stat, get_workspace_stats, increment_stat,
+    migrate_legacy_workspace_stats, publish_workspace_events, subscribe_workspace_events
+)
 from db.mongo import (
-    delete_task_from_db, get_tasks_by_workspace_and_date, get_user_workspaces, register_user, get_users,
+    delete_task_from_db, find_tasks, migrate_workspace_roles, get_tasks_by_workspace_and_date, TASK_FIELDS, get_user_workspaces, register_user,
+    find_users, iter_users, users_version,
     create_workspace, get_user_role_in_workspace,
     add_member_to_workspace, remove_member_from_workspace,
-    get_workspace_members,
-    create_task, update_task_status_by_id
+    get_workspace_members, get_role_cache_stats, get_usernames, get_username_cache_stats,
+    create_task, update_task_status_by_id,
+    create_tasks_bulk, update_tasks_status_bulk, delete_tasks_bulk
 )
-from db.neo4j import (
-    add_friend, get_user_friends, remove_friend_relation,
-    get_friend_recommendations
+from db.indexes import ensure_indexes
+from db.task_cache import select_tasks
+from metrics import init_metrics
+from db.neo4j import ensure_schema, get_user_friends, migrate_directed_friendships
+from db.recommendations import (
+    add_friendship, add_friendships_bulk, get_recommendations, remove_friendship, remove_friendships_bulk
 )
 
 app = Flask(__name__)
+init_metrics(app)
+
+# Проверки баз идут параллельно и ограничены по времени
+_health_executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="health")
+_dashboard_executor = ThreadPoolExecutor(max_workers=DASHBOARD_WORKERS, thread_name_prefix="dashboard")
+# Открытые потоки событий процесса; каждый занимает поток сервера до отключения клиента
+_event_streams = threading.BoundedSemaphore(EVENTS_WSGI_MAX_STREAMS) if EVENTS_WSGI_MAX_STREAMS else None
+
+
+def conditional_jsonify(payload):
+    """JSON-ответ с ETag; если у клиента та же версия (If-None-Match), отвечает 304"""
+    response = jsonify(payload)
+    response.add_etag()
+    return response.make_conditional(request)
+
+
+@app.route('/health/live', methods=['GET'])
+def health_live():
+    """Процесс жив и обслуживает запросы; базы не проверяются"""
+    return jsonify({"status": "ok"}), 200
+
+
+@app.route('/health/ready', methods=['GET'])
+def health_ready():
+    """Готовность принимать трафик: MongoDB, Redis и Neo4j отвечают"""
+    def probe(ping):
+        started = time.perf_counter()
+        ping()
+        return round((time.perf_counter() - started) * 1000, 1)
+
+    futures = {
+        name: _health_executor.submit(probe, ping)
+        for name, ping in (("mongo", mongo.ping), ("redis", redis.ping), ("neo4j", neo4j.ping))
+    }
+    checks = {}
+    for name, future in futures.items():
+        try:
+            checks[name] = {"status": "ok", "latency_ms": future.result(timeout=HEALTH_CHECK_TIMEOUT)}
+        except FutureTimeoutError:
+            checks[name] = {"status": "error", "error": "timeout"}
+        except Exception as e:
+            checks[name] = {"status": "error", "error": str(e)}
+
+    ready = all(check["status"] == "ok" for check in checks.values())
+    return jsonify({"status": "ok" if ready else "unavailable", "checks": checks}), 200 if ready else 503
 
 
 @app.route('/users', methods=['GET'])
 def get_all_users():
+    """Список пользователей постранично (?limit=&cursor=&prefix=) или потоком NDJSON (?stream=1)"""
+    prefix = request.args.get('prefix') or None
+    cursor = request.args.get('cursor') or None
+
     try:
-        users = get_users()         
-        return jsonify({
+        stream = request.args.get('stream', '').lower() in ('1', 'true')
+        if stream or request.accept_mimetypes.best == 'application/x-ndjson':
+            # Тело потока заранее неизвестно: ETag строится по версии списка, а не по содержимому.
+            # Префикс - ввод пользователя (может содержать "), поэтому в ETag идет его хеш
+            prefix_hash = hashlib.sha1(prefix.encode()).hexdigest() if prefix else ''
+            etag = f"{users_version()}-{prefix_hash}"
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+                response.set_etag(etag)
+                return response
+
+            def generate():
+                for user in iter_users(prefix):
+                    yield json.dumps(user) + "\n"
+            response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+            response.set_etag(etag)
+            return response
+
+        try:
+            limit = min(int(request.args.get('limit', USERS_PAGE_SIZE)), USERS_PAGE_MAX)
+        except ValueError:
+            return jsonify({"error": "limit must be an integer"}), 400
+        if limit <= 0:
+            return jsonify({"error": "limit must be positive"}), 400
+
+        users = find_users(prefix, cursor, limit)
+        next_cursor = users[-1]["username"] if len(users) == limit else None
+        return conditional_jsonify({
             "users": users,
-            "count": len(users)
-            }), 200
+            "count": len(users),
+            "next_cursor": next_cursor
+            })
     except Exception as e:
+        app.logger.exception("%s %s failed", request.method, request.path)
         return jsonify({"error": str(e)}), 500
 
 @app.route('/users/<user_id>/workspaces', methods=['GET'])
@@ -44,6 +142,7 @@ def increment_stat_route():
         increment_stat(data['key'])
         return jsonify({"status": "success", "key": data['key']}), 200
     except Exception as e:
+        app.logger.exception("%s %s failed", request.method, request.path)
         return jsonify({"error": str(e)}), 500
 
 @app.route('/stats/get', methods=['GET'])
@@ -57,43 +156,58 @@ def get_stat_route():
         value = get_stat(key)
         return jsonify({"key": key, "value": value}), 200
     except Exception as e:
+        app.logger.exception("%s %s failed", request.method, request.path)
         return jsonify({"error": str(e)}), 500
 
 @app.route('/stats/workspace/<workspace_id>', methods=['GET'])
 def get_workspace_stats_route(workspace_id):
     """Получает всю статистику для конкретной рабочей области"""
     try:
-        # Ищем все ключи, начинающиеся с ws:{workspace_id}:
-        pattern = f"ws:{workspace_id}:*"
-        stats = {}
-        
-        # Используем ваш существующий метод get_all_stats()
-        all_stats = get_all_stats()
-        
-        # Фильтруем только нужные ключи
-        for key_bytes, value_bytes in all_stats.items():
-            key = key_bytes.decode('utf-8')
-            if key.startswith(f"ws:{workspace_id}:"):
-                stat_name = key.split(':')[-1]  # Извлекаем название метрики
-                stats[stat_name] = int(value_bytes.decode('utf-8'))
-        
+        stats = get_workspace_stats(workspace_id)
         return jsonify(stats), 200
     except Exception as e:
+        app.logger.exception("%s %s failed", request.method, request.path)
         return jsonify({"error": str(e)}), 500
 
 @app.route('/stats/all', methods=['GET'])
 def get_all_stats_route():
-    """Получает всю статистику (административный)"""
+    """Получает всю статистику (административный).
+
+    Ключи обходятся через SCAN пачками, JSON-объект отдается по частям,
+    не собираясь в памяти целиком.
+    """
+    stats = iter_all_stats()
     try:
-        # Используем ваш существующий метод
-        stats = get_all_stats()
-        # Декодируем бинарные данные из Redis
-        decoded_stats = {k.decode('utf-8'): int(v.decode('utf-8')) 
-                        for k, v in stats.items()}
-        return jsonify(decoded_stats), 200
+        # Ошибка подключения до первой пачки - это еще обычный ответ 500
+        first = next(stats, None)
     except Exception as e:
+        app.logger.exception("%s %s failed", request.method, request.path)
         return jsonify({"error": str(e)}), 500
 
+    def generate():
+        if first is None:
+            yield "{}"
+            return
+        yield "{" + json.dumps(first[0]) + ": " + json.dumps(first[1])
+        try:
+            for key, value in stats:
+                yield ", " + json.dumps(key) + ": " + json.dumps(value)
+        except Exception:
+            # Статус уже отправлен: ответ обрывается некорректным JSON
+            app.logger.exception("%s %s failed while streaming", request.method, request.path)
+            raise
+        yield "}"
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+@app.route('/stats/cache', methods=['GET'])
+def get_cache_stats_route():
+    """Счетчики попаданий и промахов in-process кешей"""
+    return jsonify({
+        "roles": get_role_cache_stats(),
+        "usernames": get_username_cache_stats()
+    }), 200
+
 @app.route('/register', methods=['POST'])
 def register():
     """Регистрация нового пользователя"""
@@ -130,6 +244,7 @@ def delete_task_route(workspace_id, task_id):
         return jsonify({"error": "Only admin can delete tasks"}), 403
     
     if delete_task_from_db(workspace_id, task_id):
+        publish_workspace_events(workspace_id, [{"type": "task_deleted", "task_id": task_id}])
         return jsonify({"message": "Task deleted"}), 200
     else:
         return jsonify({"error": "Task not found"}), 404
@@ -150,7 +265,7 @@ def create_workspace_route():
 @app.route('/workspaces/<workspace_id>/members', methods=['GET'])
 def list_workspace_members(workspace_id):
     members = get_workspace_members(workspace_id)
-    return jsonify({"members": members, "count": len(members)}), 200
+    return conditional_jsonify({"members": members, "count": len(members)})
 
 
 @app.route('/workspaces/<workspace_id>/members', methods=['POST'])
@@ -170,6 +285,8 @@ def add_member(workspace_id):
     if not success:
         return jsonify({"error": "User already in workspace"}), 400
 
+    publish_workspace_events(workspace_id, [{"type": "member_added", "user_id": user_id, "role": role}])
+
     return jsonify({"message": "Member added"}), 200
 
 
@@ -189,6 +306,8 @@ def remove_member(workspace_id):
     if not success:
         return jsonify({"error": "User not found in workspace"}), 404
 
+    publish_workspace_events(workspace_id, [{"type": "member_removed", "user_id": target_id}])
+
     return jsonify({"message": "Member removed"}), 200
 
 
@@ -211,6 +330,10 @@ def create_task_route(workspace_id):
         return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
 
     task_id = create_task(workspace_id, text, date)
+    publish_workspace_events(workspace_id, [{
+        "type": "task_created",
+        "task": {"task_id": task_id, "text": text, "date": date, "is_done": False}
+    }])
     return jsonify({"task_id": task_id, "message": "Task created"}), 201
 
 
@@ -226,22 +349,269 @@ def update_task_status(workspace_id, task_id):
     if get_user_role_in_workspace(workspace_id, user_id) not in ["admin", "editor"]:
         return jsonify({"error": "No permission to update task"}), 403
 
-    updated = update_task_status_by_id(task_id, bool(status))
-    if not updated:
+    task = update_task_status_by_id(workspace_id, task_id, bool(status))
+    if task is None:
         return jsonify({"error": "Task not found"}), 404
 
-    return jsonify({"message": "Task updated"}), 200
+    # Задача в событии нужна клиентам, у которых ее нет в списке (снова открытая)
+    publish_workspace_events(workspace_id, [
+        {"type": "task_updated", "task_id": task_id, "is_done": task["is_done"], "task": task}
+    ])
 
+    return jsonify({"message": "Task updated", "task": task}), 200
 
-@app.route('/workspaces/<workspace_id>/tasks', methods=['GET'])
-def get_tasks(workspace_id):
-    date = request.args.get("date")
 
-    if not date:
-        return jsonify({"error": "date required"}), 400
+def _batch_items(data, field, limit=TASK_BATCH_MAX):
+    """Достает список элементов пакетного запроса или возвращает ответ с ошибкой"""
+    items = data.get(field)
+    if not isinstance(items, list) or not items:
+        return None, (jsonify({"error": f"{field} must be a non-empty list"}), 400)
+    if len(items) > limit:
+        return None, (jsonify({"error": f"At most {limit} items per batch"}), 400)
+    return items, None
 
-    tasks = get_tasks_by_workspace_and_date(workspace_id, date)
-    return jsonify({"tasks": tasks, "count": len(tasks)}), 200
+
+@app.route('/workspaces/<workspace_id>/tasks:batch', methods=['POST'])
+def create_tasks_batch_route(workspace_id):
+    """Создает пакет задач: {"user_id", "tasks": [{"text", "date"}, ...]}"""
+    data = request.get_json() or {}
+    user_id = data.get("user_id")
+    if not user_id:
+        return jsonify({"error": "user_id is required"}), 400
+
+    tasks, error = _batch_items(data, "tasks")
+    if error:
+        return error
+
+    if get_user_role_in_workspace(workspace_id, user_id) not in ["admin", "editor"]:
+        return jsonify({"error": "No permission to add task"}), 403
+
+    results = [None] * len(tasks)
+    valid, positions = [], []
+    for i, task in enumerate(tasks):
+        text = task.get("text") if isinstance(task, dict) else None
+        date = task.get("date") if isinstance(task, dict) else None
+        try:
+            datetime.strptime(date or "", '%Y-%m-%d')
+        except ValueError:
+            date = None
+        if not text or not date:
+            results[i] = {"status": "invalid", "error": "text and date (YYYY-MM-DD) are required"}
+            continue
+        valid.append({"text": text, "date": date})
+        positions.append(i)
+
+    events = []
+    for i, task, result in zip(positions, valid, create_tasks_bulk(workspace_id, valid) if valid else []):
+        results[i] = result
+        if result["status"] == "created":
+            events.append({"type": "task_created", "task": {**task, "task_id": result["task_id"], "is_done": False}})
+    publish_workspace_events(workspace_id, events)
+
+    return jsonify({"results": results, "count": len(results)}), 200
+
+
+@app.route('/workspaces/<workspace_id>/tasks:batch', methods=['PUT'])
+def update_tasks_batch_route(workspace_id):
+    """Меняет статус пакета задач: {"user_id", "updates": [{"task_id", "is_done"}, ...]}"""
+    data = request.get_json() or {}
+    user_id = data.get("user_id")
+    if not user_id:
+        return jsonify({"error": "user_id is required"}), 400
+
+    updates, error = _batch_items(data, "updates")
+    if error:
+        return error
+    if not all(isinstance(u, dict) and u.get("task_id") and u.get("is_done") is not None for u in updates):
+        return jsonify({"error": "Each update needs task_id and is_done"}), 400
+
+    if get_user_role_in_workspace(workspace_id, user_id) not in ["admin", "editor"]:
+        return jsonify({"error": "No permission to update task"}), 403
+
+    results = update_tasks_status_bulk(workspace_id, updates)
+    publish_workspace_events(workspace_id, [
+        {"type": "task_updated", "task_id": update["task_id"], "is_done": bool(update["is_done"])}
+        for update, result in zip(updates, results) if result["status"] == "updated"
+    ])
+    return jsonify({"results": results, "count": len(results)}), 200
+
+
+@app.route('/workspaces/<workspace_id>/tasks:batch', methods=['DELETE'])
+def delete_tasks_batch_route(workspace_id):
+    """Удаляет пакет задач: {"user_id", "task_ids": [...]}"""
+    data = request.get_json() or {}
+    user_id = data.get("user_id")
+    if not user_id:
+        return jsonify({"error": "user_id is required"}), 400
+
+    task_ids, error = _batch_items(data, "task_ids")
+    if error:
+        return error
+    if not all(isinstance(tid, str) for tid in task_ids):
+        return jsonify({"error": "task_ids must be strings"}), 400
+
+    if get_user_role_in_workspace(workspace_id, user_id) != "admin":
+        return jsonify({"error": "Only admin can delete tasks"}), 403
+
+    results = delete_tasks_bulk(workspace_id, task_ids)
+    # Повторы id в запросе дают одно событие
+    deleted = dict.fromkeys(result["task_id"] for result in results if result["status"] == "deleted")
+    publish_workspace_events(workspace_id, [{"type": "task_deleted", "task_id": task_id} for task_id in deleted])
+    return jsonify({"results": results, "count": len(results)}), 200
+
+
+def parse_task_query(args):
+    """Разбирает параметры выдачи задач; возвращает (параметры запроса, текст ошибки)"""
+    date = args.get("date")
+    date_from = args.get("from") or date
+    date_to = args.get("to") or date or date_from
+
+    if not date_from:
+        return None, "date or from/to required"
+
+    try:
+        for value in (date_from, date_to):
+            datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        return None, "Invalid date format. Use YYYY-MM-DD"
+    if date_from > date_to:
+        return None, "from must not be after to"
+
+    is_done = args.get("is_done")
+    if is_done is not None:
+        if is_done.lower() not in ("true", "false", "1", "0"):
+            return None, "is_done must be true or false"
+        is_done = is_done.lower() in ("true", "1")
+
+    fields = TASK_FIELDS
+    if args.get("fields"):
+        fields = tuple(f for f in args["fields"].split(",") if f)
+        if not set(fields) <= set(TASK_FIELDS):
+            return None, f"fields must be a subset of {', '.join(TASK_FIELDS)}"
+
+    limit = None
+    if args.get("limit"):
+        try:
+            limit = min(int(args["limit"]), TASKS_PAGE_MAX)
+        except ValueError:
+            return None, "limit must be an integer"
+        if limit <= 0:
+            return None, "limit must be positive"
+
+    after = None
+    if args.get("cursor"):
+        after = tuple(args["cursor"].split(":", 1))
+        if len(after) != 2 or not ObjectId.is_valid(after[1]):
+            return None, "Invalid cursor"
+
+    return {
+        "date_from": date_from,
+        "date_to": date_to,
+        "is_done": is_done,
+        # date нужна для курсора, поэтому в запрос она попадает всегда
+        "fields": fields if "date" in fields or not limit else fields + ("date",),
+        "limit": limit,
+        "after": after,
+        "requested_fields": fields,
+    }, None
+
+
+def task_page(tasks, query):
+    """Тело ответа со страницей задач и курсором следующей страницы"""
+    next_cursor = None
+    if query["limit"] and len(tasks) == query["limit"]:
+        next_cursor = f"{tasks[-1]['date']}:{tasks[-1]['task_id']}"
+    if query["fields"] != query["requested_fields"]:
+        for task in tasks:
+            del task["date"]
+    return {"tasks": tasks, "count": len(tasks), "next_cursor": next_cursor}
+
+
+@app.route('/workspaces/<workspace_id>/tasks', methods=['GET'])
+def get_tasks(workspace_id):
+    """Задачи за дату (?date=) или диапазон (?from=&to=) с фильтром ?is_done=,
+    набором полей ?fields=text,is_done и постраничной выдачей ?limit=&cursor="""
+    query, error = parse_task_query(request.args)
+    if error:
+        return jsonify({"error": error}), 400
+    return jsonify(task_page(load_tasks(workspace_id, query), query)), 200
+
+
+def load_tasks(workspace_id, query):
+    """Задачи по разобранным параметрам parse_task_query"""
+    if query["date_from"] == query["date_to"]:
+        # Запрос за один день - самый частый; отвечаем из кеша
+        return select_tasks(
+            get_tasks_by_workspace_and_date(workspace_id, query["date_from"]),
+            query["is_done"], query["fields"], query["limit"], query["after"]
+        )
+    return find_tasks(
+        workspace_id, query["date_from"], query["date_to"], query["is_done"],
+        query["fields"], query["limit"], query["after"]
+    )
+
+
+@app.route('/workspaces/<workspace_id>/dashboard', methods=['GET'])
+def workspace_dashboard(workspace_id):
+    """Данные вида рабочей области одним запросом: задачи (параметры как у /tasks),
+    участники, роль ?user_id= и статистика. Чтения из MongoDB и Redis идут параллельно"""
+    user_id = request.args.get("user_id")
+    if not user_id:
+        return jsonify({"error": "user_id is required"}), 400
+    query, error = parse_task_query(request.args)
+    if error:
+        return jsonify({"error": error}), 400
+
+    def submit(fn, *args):
+        # Потоки пула не видят контекст запроса; копия сохраняет учет обращений к базам в метриках
+        return _dashboard_executor.submit(contextvars.copy_context().run, fn, *args)
+
+    futures = {
+        "tasks": submit(load_tasks, workspace_id, query),
+        "members": submit(get_workspace_members, workspace_id),
+        "role": submit(get_user_role_in_workspace, workspace_id, user_id),
+        "stats": submit(get_workspace_stats, workspace_id),
+    }
+    results = {name: future.result() for name, future in futures.items()}
+    results["tasks"] = task_page(results["tasks"], query)
+    return jsonify(results), 200
+
+
+@app.route('/workspaces/<workspace_id>/events', methods=['GET'])
+def workspace_events(workspace_id):
+    """Поток изменений задач, участников и статистики рабочей области (Server-Sent Events).
+
+    Под asgi.py этот маршрут не вызывается: поток событий обслуживает Quart.
+    Здесь число потоков ограничено EVENTS_WSGI_MAX_STREAMS, сверх него - 503.
+    """
+    if _event_streams is None or not _event_streams.acquire(blocking=False):
+        response = jsonify({"error": "Event stream capacity exhausted"})
+        response.status_code = 503
+        response.headers["Retry-After"] = str(EVENTS_RETRY_AFTER)
+        return response
+
+    def generate():
+        pubsub = subscribe_workspace_events(workspace_id)
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                message = pubsub.get_message(timeout=EVENTS_HEARTBEAT)
+                if message is None:
+                    # Комментарий держит соединение открытым и выявляет отключившихся клиентов
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"data: {message['data'].decode('utf-8')}\n\n"
+        finally:
+            pubsub.close()
+
+    response = Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+    # Сервер закрывает ответ и тогда, когда генератор так и не был запущен
+    response.call_on_close(_event_streams.release)
+    return response
 
 
 @app.route('/friends', methods=['POST'])
@@ -256,7 +626,7 @@ def add_friend_route():
     if user_id == friend_id:
         return jsonify({"error": "Cannot add yourself as friend"}), 400
 
-    success = add_friend(user_id, friend_id)
+    success = add_friendship(user_id, friend_id)
     return (jsonify({"message": "Friend added"}), 200) if success else (jsonify({"error": "Failed to add"}), 500)
 
 @app.route('/friends', methods=['DELETE'])
@@ -268,25 +638,73 @@ def remove_friend_route():
     if not all([user_id, friend_id]):
         return jsonify({"error": "user_id and friend_id are required"}), 400
 
-    success = remove_friend_relation(user_id, friend_id)
+    success = remove_friendship(user_id, friend_id)
     return (jsonify({"message": "Friend removed"}), 200) if success else (jsonify({"error": "Failed to remove"}), 500)
 
 
+def _friend_pairs_batch(bulk_write, allow_self):
+    """Общая часть /friends:batch: проверка пар, пакетная запись и результаты по позициям"""
+    data = request.get_json() or {}
+    pairs, error = _batch_items(data, "pairs", FRIEND_BATCH_MAX)
+    if error:
+        return error
+
+    results = [None] * len(pairs)
+    valid, positions = [], []
+    for i, pair in enumerate(pairs):
+        user_id = pair.get("user_id") if isinstance(pair, dict) else None
+        friend_id = pair.get("friend_id") if isinstance(pair, dict) else None
+        if not isinstance(user_id, str) or not isinstance(friend_id, str) or not user_id or not friend_id:
+            results[i] = {"status": "invalid", "error": "user_id and friend_id are required"}
+            continue
+        if user_id == friend_id and not allow_self:
+            results[i] = {"user_id": user_id, "friend_id": friend_id,
+                          "status": "invalid", "error": "Cannot add yourself as friend"}
+            continue
+        valid.append((user_id, friend_id))
+        positions.append(i)
+
+    for i, result in zip(positions, bulk_write(valid) if valid else []):
+        results[i] = result
+    return jsonify({"results": results, "count": len(results)}), 200
+
+
+@app.route('/friends:batch', methods=['POST'])
+def add_friends_batch_route():
+    """Добавляет дружбу пакетом: {"pairs": [{"user_id", "friend_id"}, ...]}"""
+    return _friend_pairs_batch(add_friendships_bulk, allow_self=False)
+
+
+@app.route('/friends:batch', methods=['DELETE'])
+def remove_friends_batch_route():
+    """Удаляет дружбу пакетом: {"pairs": [{"user_id", "friend_id"}, ...]}"""
+    return _friend_pairs_batch(remove_friendships_bulk, allow_self=True)
+
+
 @app.route('/friends/<user_id>', methods=['GET'])
 def list_friends(user_id):
     friends = get_user_friends(user_id)
-    users = get_users()
+    usernames = get_usernames(friends)
     friends_data = [
-        {"user_id": fid, "username": next((u["username"] for u in users if u["_id"] == fid), "Unknown")}
+        {"user_id": fid, "username": usernames.get(fid, "Unknown")}
         for fid in friends
     ]
-    return jsonify({"friends": friends_data, "count": len(friends_data)}), 200
+    return conditional_jsonify({"friends": friends_data, "count": len(friends_data)})
 
 
 @app.route('/friends/<user_id>/recommendations', methods=['GET'])
 def recommend_friends(user_id):
-    recommendations = get_friend_recommendations(user_id)
+    recommendations = get_recommendations(user_id)
+    usernames = get_usernames([r["user_id"] for r in recommendations])
+    for rec in recommendations:
+        rec["username"] = usernames.get(rec["user_id"], "Unknown")
     return jsonify({"recommendations": recommendations, "count": len(recommendations)}), 200
 
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    migrate_legacy_workspace_stats()
+    migrate_workspace_roles()
+    ensure_indexes()
+    ensure_schema()
+    migrate_directed_friendships()
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,275 @@
+"""ASGI-сервер API.
+
+Частые маршруты (чтение задач, участников, статистики и друзей, изменение
+одной задачи, поток событий) обслуживает Quart поверх асинхронных драйверов:
+запрос, ожидающий базу, не занимает поток. Остальные маршруты передаются
+Flask-приложению из app.py через WSGI-адаптер, поэтому API не меняется.
+
+Запуск из src/backend:
+    python asgi.py
+    uvicorn asgi:application --host 0.0.0.0 --port 5000
+"""
+import asyncio
+from datetime import datetime
+
+from asgiref.wsgi import WsgiToAsgi
+from quart import Quart, Response, jsonify, make_response, request
+from werkzeug.exceptions import MethodNotAllowed, NotFound
+
+from app import app as wsgi_app, parse_task_query, task_page
+from config import EVENTS_HEARTBEAT
+from db import mongo_async, neo4j_async, redis_async
+from db.recommendations import get_recommendations
+from db.task_cache import select_tasks
+from metrics import init_async_metrics
+
+app = Quart(__name__)
+init_async_metrics(app)
+
+
+@app.before_serving
+async def open_pools():
+    await mongo_async.init()
+    await redis_async.init()
+    await neo4j_async.init()
+
+
+@app.after_serving
+async def close_pools():
+    await neo4j_async.close()
+    await redis_async.close()
+    await mongo_async.close()
+
+
+async def conditional_jsonify(payload):
+    """JSON-ответ с ETag; если у клиента та же версия (If-None-Match), отвечает 304"""
+    response = jsonify(payload)
+    await response.add_etag()
+    etag, _ = response.get_etag()
+    if request.if_none_match.contains(etag):
+        return Response("", status=304, headers={"ETag": response.headers["ETag"]})
+    return response
+
+
+@app.route('/users/<user_id>/workspaces', methods=['GET'])
+async def list_user_workspaces(user_id):
+    workspaces = await mongo_async.get_user_workspaces(user_id)
+    return jsonify({"workspaces": workspaces, "count": len(workspaces)}), 200
+
+
+@app.route('/stats/increment', methods=['POST'])
+async def increment_stat_route():
+    data = await request.get_json()
+    if not data or 'key' not in data:
+        return jsonify({"error": "Key is required"}), 400
+
+    try:
+        await redis_async.increment_stat(data['key'])
+        return jsonify({"status": "success", "key": data['key']}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/stats/workspace/<workspace_id>', methods=['GET'])
+async def get_workspace_stats_route(workspace_id):
+    try:
+        stats = await redis_async.get_workspace_stats(workspace_id)
+        return jsonify(stats), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/workspaces/<workspace_id>/members', methods=['GET'])
+async def list_workspace_members(workspace_id):
+    members = await mongo_async.get_workspace_members(workspace_id)
+    return await conditional_jsonify({"members": members, "count": len(members)})
+
+
+@app.route('/workspaces/<workspace_id>/tasks', methods=['GET'])
+async def get_tasks(workspace_id):
+    query, error = parse_task_query(request.args)
+    if error:
+        return jsonify({"error": error}), 400
+    return jsonify(task_page(await load_tasks(workspace_id, query), query)), 200
+
+
+async def load_tasks(workspace_id, query):
+    if query["date_from"] == query["date_to"]:
+        return select_tasks(
+            await mongo_async.get_tasks_by_workspace_and_date(workspace_id, query["date_from"]),
+            query["is_done"], query["fields"], query["limit"], query["after"]
+        )
+    return await mongo_async.find_tasks(
+        workspace_id, query["date_from"], query["date_to"], query["is_done"],
+        query["fields"], query["limit"], query["after"]
+    )
+
+
+@app.route('/workspaces/<workspace_id>/dashboard', methods=['GET'])
+async def workspace_dashboard(workspace_id):
+    user_id = request.args.get("user_id")
+    if not user_id:
+        return jsonify({"error": "user_id is required"}), 400
+    query, error = parse_task_query(request.args)
+    if error:
+        return jsonify({"error": error}), 400
+
+    tasks, members, role, stats = await asyncio.gather(
+        load_tasks(workspace_id, query),
+        mongo_async.get_workspace_members(workspace_id),
+        mongo_async.get_user_role_in_workspace(workspace_id, user_id),
+        redis_async.get_workspace_stats(workspace_id),
+    )
+    return jsonify({"tasks": task_page(tasks, query), "members": members, "role": role, "stats": stats}), 200
+
+
+@app.route('/workspaces/<workspace_id>/tasks', methods=['POST'])
+async def create_task_route(workspace_id):
+    data = await request.get_json()
+    user_id = data.get("user_id")
+    text = data.get("text")
+    date = data.get("date")
+
+    if not all([user_id, text, date]):
+        return jsonify({"error": "user_id, text and date are required"}), 400
+
+    if await mongo_async.get_user_role_in_workspace(workspace_id, user_id) not in ["admin", "editor"]:
+        return jsonify({"error": "No permission to add task"}), 403
+
+    try:
+        datetime.strptime(date, '%Y-%m-%d')
+    except ValueError:
+        return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
+
+    task_id = await mongo_async.create_task(workspace_id, text, date)
+    await redis_async.publish_workspace_events(workspace_id, [{
+        "type": "task_created",
+        "task": {"task_id": task_id, "text": text, "date": date, "is_done": False}
+    }])
+    return jsonify({"task_id": task_id, "message": "Task created"}), 201
+
+
+@app.route('/workspaces/<workspace_id>/tasks/<task_id>', methods=['PUT'])
+async def update_task_status(workspace_id, task_id):
+    data = await request.get_json()
+    user_id = data.get("user_id")
+    status = data.get("is_done")
+
+    if not all([user_id, status is not None]):
+        return jsonify({"error": "user_id and status required"}), 400
+
+    if await mongo_async.get_user_role_in_workspace(workspace_id, user_id) not in ["admin", "editor"]:
+        return jsonify({"error": "No permission to update task"}), 403
+
+    task = await mongo_async.update_task_status_by_id(workspace_id, task_id, bool(status))
+    if task is None:
+        return jsonify({"error": "Task not found"}), 404
+
+    await redis_async.publish_workspace_events(
+        workspace_id, [{"type": "task_updated", "task_id": task_id, "is_done": task["is_done"], "task": task}]
+    )
+    return jsonify({"message": "Task updated", "task": task}), 200
+
+
+@app.route('/workspaces/<workspace_id>/tasks/<task_id>', methods=['DELETE'])
+async def delete_task_route(workspace_id, task_id):
+    data = await request.get_json()
+    user_id = data.get("user_id")
+
+    if not user_id:
+        return jsonify({"error": "user_id is required"}), 400
+
+    if await mongo_async.get_user_role_in_workspace(workspace_id, user_id) != "admin":
+        return jsonify({"error": "Only admin can delete tasks"}), 403
+
+    if not await mongo_async.delete_task_from_db(workspace_id, task_id):
+        return jsonify({"error": "Task not found"}), 404
+
+    await redis_async.publish_workspace_events(workspace_id, [{"type": "task_deleted", "task_id": task_id}])
+    return jsonify({"message": "Task deleted"}), 200
+
+
+@app.route('/workspaces/<workspace_id>/events', methods=['GET'])
+async def workspace_events(workspace_id):
+    """Поток событий рабочей области (SSE); подписчик не занимает поток сервера"""
+    async def generate():
+        pubsub = await redis_async.subscribe_workspace_events(workspace_id)
+        try:
+            yield b"retry: 3000\n\n"
+            while True:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=EVENTS_HEARTBEAT)
+                if message is None:
+                    yield b": keepalive\n\n"
+                    continue
+                yield b"data: " + message["data"] + b"\n\n"
+        finally:
+            await pubsub.reset()
+
+    response = await make_response(generate(), 200, {
+        "Content-Type": "text/event-stream",
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+    # Поток открыт, пока клиент не отключится
+    response.timeout = None
+    return response
+
+
+@app.route('/friends/<user_id>', methods=['GET'])
+async def list_friends(user_id):
+    friends = await neo4j_async.get_user_friends(user_id)
+    usernames = await mongo_async.get_usernames(friends)
+    friends_data = [
+        {"user_id": fid, "username": usernames.get(fid, "Unknown")}
+        for fid in friends
+    ]
+    return await conditional_jsonify({"friends": friends_data, "count": len(friends_data)})
+
+
+@app.route('/friends/<user_id>/recommendations', methods=['GET'])
+async def recommend_friends(user_id):
+    recommendations = await redis_async.get_cached_recommendations(user_id)
+    if recommendations is None:
+        # Холодный кеш заполняется синхронным кодом в отдельном потоке
+        recommendations = await asyncio.to_thread(get_recommendations, user_id)
+    usernames = await mongo_async.get_usernames([r["user_id"] for r in recommendations])
+    for rec in recommendations:
+        rec["username"] = usernames.get(rec["user_id"], "Unknown")
+    return jsonify({"recommendations": recommendations, "count": len(recommendations)}), 200
+
+
+_wsgi_fallback = WsgiToAsgi(wsgi_app)
+_async_routes = app.url_map.bind("localhost")
+
+
+def _is_async_route(scope) -> bool:
+    try:
+        _async_routes.match(scope["path"], method=scope["method"])
+    except (NotFound, MethodNotAllowed):
+        return False
+    return True
+
+
+async def application(scope, receive, send):
+    """Точка входа ASGI: async-маршруты обслуживает Quart, остальные - Flask"""
+    if scope["type"] == "http" and not _is_async_route(scope):
+        await _wsgi_fallback(scope, receive, send)
+    else:
+        # lifespan и websocket тоже идут в Quart: он открывает и закрывает пулы
+        await app(scope, receive, send)
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    from db.indexes import ensure_indexes
+    from db.mongo import migrate_workspace_roles
+    from db.neo4j import ensure_schema, migrate_directed_friendships
+    from db.redis import migrate_legacy_workspace_stats
+
+    migrate_legacy_workspace_stats()
+    migrate_workspace_roles()
+    ensure_indexes()
+    ensure_schema()
+    migrate_directed_friendships()
+    uvicorn.run("asgi:application", host='0.0.0.0', port=5000)
@@ -0,0 +1,74 @@
+"""Импорт дружеских связей: по одной паре против пакетов UNWIND.
+
+Сравнивает add_friend на каждую пару (своя сессия и транзакция) с
+add_friends_bulk при разных размерах пачки, затем так же удаление.
+Пользователи создаются с уникальным префиксом id и удаляются в конце.
+
+Запуск из src/backend:
+    python -m benchmarks.bench_friendships_bulk --pairs 1000 5000 --chunks 100 500 2000
+"""
+import argparse
+import random
+import time
+import uuid
+
+from db import neo4j
+
+
+def make_pairs(prefix: str, count: int, rng: random.Random):
+    users = [f"{prefix}{i}" for i in range(max(int(count ** 0.5) * 4, 2))]
+    pairs = set()
+    while len(pairs) < count:
+        user_id, friend_id = sorted(rng.sample(users, 2))
+        pairs.add((user_id, friend_id))
+    return list(pairs)
+
+
+def cleanup(prefix: str):
+    with neo4j.driver.session() as session:
+        session.run("MATCH (u:User) WHERE u.id STARTS WITH $prefix DETACH DELETE u", prefix=prefix).consume()
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+def one_by_one(write, pairs):
+    return [write(user_id, friend_id) for user_id, friend_id in pairs]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pairs", type=int, nargs="+", default=[1000, 5000])
+    parser.add_argument("--chunks", type=int, nargs="+", default=[100, 500, 2000])
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    neo4j.ensure_schema()
+    rng = random.Random(args.seed)
+    print(f"{'pairs':>7} {'mode':<14} {'add, s':>8} {'pairs/s':>9} {'remove, s':>10} {'pairs/s':>9}")
+    for count in args.pairs:
+        prefix = f"bench_{uuid.uuid4().hex[:8]}_"
+        pairs = make_pairs(prefix, count, rng)
+        modes = [("one-by-one", None)] + [(f"chunk={c}", c) for c in args.chunks]
+        for mode, chunk in modes:
+            try:
+                if chunk is None:
+                    added, add_time = timed(one_by_one, neo4j.add_friend, pairs)
+                    removed, remove_time = timed(one_by_one, neo4j.remove_friend_relation, pairs)
+                    assert all(added) and all(removed)
+                else:
+                    added, add_time = timed(neo4j.add_friends_bulk, pairs, chunk)
+                    removed, remove_time = timed(neo4j.remove_friends_bulk, pairs, chunk)
+                    assert all(r["status"] == "added" for r in added), "pairs left from a previous mode"
+                    assert all(r["status"] == "removed" for r in removed)
+            finally:
+                cleanup(prefix)
+            print(f"{count:>7} {mode:<14} {add_time:>8.2f} {count / add_time:>9.0f} "
+                  f"{remove_time:>10.2f} {count / remove_time:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
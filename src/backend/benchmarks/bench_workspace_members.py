@@ -0,0 +1,83 @@
+"""Задержка get_workspace_members в зависимости от числа участников.
+
+Сравнивает прежний вариант (find_one на каждого участника) с пакетным
+запросом $in. Данные создаются в отдельной базе {MONGO_DB}_bench.
+
+Запуск из src/backend:
+    python -m benchmarks.bench_workspace_members --sizes 10 100 500 1000
+"""
+import argparse
+import statistics
+import time
+
+from bson.objectid import ObjectId
+
+from config import MONGO_DB
+from db import mongo
+
+
+def get_workspace_members_per_user(workspace_id: str):
+    """Прежняя реализация: один find_one на каждого участника"""
+    workspace = mongo.get_workspace_by_id(workspace_id)
+    if not workspace:
+        return []
+    members_info = []
+    for m in workspace["members"]:
+        user = mongo.get_user_by_id(m["user_id"])
+        if user:
+            members_info.append({
+                "user_id": user["_id"],
+                "username": user["username"],
+                "role": m["role"]
+            })
+    return members_info
+
+
+def seed_workspace(member_count: int) -> str:
+    users = [{"_id": ObjectId(), "username": f"bench_user_{i}"} for i in range(member_count)]
+    mongo.users_collection.insert_many(users)
+    result = mongo.workspaces_collection.insert_one({
+        "name": f"bench_{member_count}",
+        "members": [
+            {"user_id": str(u["_id"]), "role": "admin" if i == 0 else "viewer"}
+            for i, u in enumerate(users)
+        ]
+    })
+    return str(result.inserted_id)
+
+
+def measure(func, workspace_id: str, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        # Имена из username_cache подменили бы запрос $in попаданиями в LRU
+        mongo.username_cache.clear()
+        started = time.perf_counter()
+        func(workspace_id)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 100, 500, 1000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    bench_db = mongo.client[f"{MONGO_DB}_bench"]
+    mongo.users_collection = bench_db.users
+    mongo.workspaces_collection = bench_db.workspaces
+
+    try:
+        print(f"{'members':>8} {'per-user, ms':>14} {'batched, ms':>12} {'speedup':>8}")
+        for size in args.sizes:
+            workspace_id = seed_workspace(size)
+            assert get_workspace_members_per_user(workspace_id) == mongo.get_workspace_members(workspace_id)
+            old = measure(get_workspace_members_per_user, workspace_id, args.repeat)
+            new = measure(mongo.get_workspace_members, workspace_id, args.repeat)
+            print(f"{size:>8} {old:>14.2f} {new:>12.2f} {old / new:>7.1f}x")
+    finally:
+        mongo.client.drop_database(bench_db.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""In-memory замены MongoDB, Redis и Neo4j для бенчмарков без контейнеров.
+
+MongoDB и Redis подменяются mongomock и fakeredis. Для Neo4j нет встраиваемой
+реализации Cypher, поэтому GraphStub исполняет только запросы из db/neo4j.py
+на словаре смежности.
+"""
+import threading
+from collections import defaultdict
+
+from db import mongo, neo4j, redis, task_cache
+
+
+class GraphStub:
+    """Драйвер Neo4j в памяти: граф дружбы как словарь смежности"""
+
+    def __init__(self):
+        self.friends = defaultdict(set)
+        self.lock = threading.Lock()
+
+    def session(self, **kwargs):
+        return _StubSession(self)
+
+    def verify_connectivity(self):
+        pass
+
+    def close(self):
+        pass
+
+    def execute(self, query, params):
+        with self.lock:
+            if query == neo4j.FRIENDS_QUERY:
+                return [{"friend_id": f} for f in sorted(self.friends[params["user_id"]])]
+            if query == neo4j.RECOMMENDATIONS_QUERY:
+                return self._recommendations(params["user_id"], params["limit"])
+            if query == neo4j.FRIENDS_OF_QUERY:
+                friends = set().union(*(self.friends[uid] for uid in params["user_ids"]))
+                return [{"friend_id": f} for f in sorted(friends)]
+            if query == neo4j.ADD_FRIENDS_BULK_QUERY:
+                return [self._write_pair(pair, add=True) for pair in params["pairs"]]
+            if query == neo4j.REMOVE_FRIENDS_BULK_QUERY:
+                return [self._write_pair(pair, add=False) for pair in params["pairs"]]
+            if "DELETE" in query:
+                self.friends[params["user_id"]].discard(params["friend_id"])
+                self.friends[params["friend_id"]].discard(params["user_id"])
+                return []
+            if "MERGE" in query and "FRIENDS_WITH" in query:
+                self.friends[params["user_id"]].add(params["friend_id"])
+                self.friends[params["friend_id"]].add(params["user_id"])
+                return []
+        raise NotImplementedError(f"GraphStub does not support query: {query.strip()[:80]}")
+
+    def _write_pair(self, pair, add):
+        user_id, friend_id = pair["user_id"], pair["friend_id"]
+        existed = friend_id in self.friends[user_id]
+        if add:
+            self.friends[user_id].add(friend_id)
+            self.friends[friend_id].add(user_id)
+        else:
+            self.friends[user_id].discard(friend_id)
+            self.friends[friend_id].discard(user_id)
+        return {"index": pair["index"], "existed": existed}
+
+    def _recommendations(self, user_id, limit):
+        mine = self.friends[user_id]
+        counts = defaultdict(int)
+        for common in mine:
+            for candidate in self.friends[common]:
+                if candidate != user_id and candidate not in mine:
+                    counts[candidate] += 1
+        ranked = sorted(counts.items(), key=lambda item: -item[1])[:limit]
+        return [{"user_id": uid, "common_friends": count} for uid, count in ranked]
+
+
+class _StubResult(list):
+    def data(self):
+        return [dict(record) for record in self]
+
+    def consume(self):
+        return None
+
+    def single(self):
+        return self[0] if self else None
+
+
+class _StubSession:
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, parameters=None, **params):
+        return _StubResult(self.graph.execute(query, {**(parameters or {}), **params}))
+
+    def execute_read(self, fn, *args, **kwargs):
+        return fn(self, *args, **kwargs)
+
+    def execute_write(self, fn, *args, **kwargs):
+        return fn(self, *args, **kwargs)
+
+    def close(self):
+        pass
+
+
+def install_fakes():
+    """Подменяет клиенты баз in-memory реализациями в текущем процессе"""
+    import fakeredis
+    import mongomock
+
+    mongo.client.replace(mongomock.MongoClient)
+    redis.redis_db.replace(fakeredis.FakeRedis)
+    neo4j.driver.replace(GraphStub)
+    mongo.role_cache.clear()
+    mongo.username_cache.clear()
+    task_cache.local_cache.clear()
@@ -0,0 +1,316 @@
+"""Бенчмарк REST API: задержки и пропускная способность по маршрутам.
+
+Создает N пользователей, M рабочих областей, K задач и F дружеских связей,
+затем прогоняет взвешенную смесь маршрутов app.py заданным числом потоков
+и печатает p50/p95/p99 и запросы в секунду по каждому маршруту.
+
+Запросы идут либо в приложение в том же процессе (Flask test client), либо
+на сервер по --url. С --fake базы заменяются in-memory реализациями
+(mongomock, fakeredis, GraphStub из benchmarks/fakes.py) и контейнеры не нужны.
+
+Запуск из src/backend:
+    python -m benchmarks.harness --fake --users 200 --workspaces 20 --tasks 5000
+    python -m benchmarks.harness --url http://localhost:5000 --concurrency 32
+    python -m benchmarks.harness --fake --mix tasks_by_date=10 toggle=1 --json results.json
+"""
+import argparse
+import json
+import random
+import statistics
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+# Маршрут -> вес по умолчанию (примерно как их вызывает десктоп-клиент)
+DEFAULT_MIX = {
+    "tasks_by_date": 8,
+    "toggle": 2,
+    "members": 3,
+    "friends": 2,
+    "recommendations": 1,
+    "stats": 3,
+    "stats_increment": 1,
+    "dashboard": 2,
+}
+
+
+class InProcessTransport:
+    """Запросы к app.py без сети; у каждого потока свой test client"""
+
+    def __init__(self):
+        from app import app
+        self.app = app
+        self.local = threading.local()
+
+    def request(self, method, path, params=None, body=None):
+        client = getattr(self.local, "client", None)
+        if client is None:
+            client = self.local.client = self.app.test_client()
+        response = client.open(path, method=method, query_string=params, json=body)
+        return response.status_code, response.get_json(silent=True)
+
+
+class HttpTransport:
+    def __init__(self, base_url):
+        import requests
+        self.base_url = base_url.rstrip("/")
+        self.requests = requests
+        self.local = threading.local()
+
+    def request(self, method, path, params=None, body=None):
+        session = getattr(self.local, "session", None)
+        if session is None:
+            session = self.local.session = self.requests.Session()
+        response = session.request(method, f"{self.base_url}{path}", params=params, json=body, timeout=30)
+        try:
+            return response.status_code, response.json()
+        except ValueError:
+            return response.status_code, None
+
+
+class Dataset:
+    def __init__(self, date):
+        self.date = date
+        self.users = []
+        # workspace_id -> (admin_id, [task_id, ...])
+        self.workspaces = {}
+
+    def workspace(self, rng):
+        workspace_id = rng.choice(list(self.workspaces))
+        admin_id, task_ids = self.workspaces[workspace_id]
+        return workspace_id, admin_id, task_ids
+
+    def user(self, rng):
+        return rng.choice(self.users)
+
+
+def _check(status, body, what):
+    if status >= 400:
+        raise RuntimeError(f"Seeding failed ({what}): HTTP {status} {body}")
+    return body
+
+
+def seed(transport, rng, users, workspaces, tasks, members, friendships):
+    """Создает данные через API, чтобы они попали в те же базы, что видит сервер"""
+    data = Dataset(time.strftime("%Y-%m-%d"))
+    run_id = uuid.uuid4().hex[:8]
+
+    for i in range(users):
+        body = _check(*transport.request("POST", "/register", body={"username": f"bench_{run_id}_{i}"}), "users")
+        data.users.append(body["user_id"])
+
+    tasks_per_workspace = max(tasks // max(workspaces, 1), 1)
+    for w in range(workspaces):
+        admin_id = data.users[w % len(data.users)]
+        body = _check(*transport.request(
+            "POST", "/workspaces", body={"name": f"bench_{run_id}_{w}", "user_id": admin_id}
+        ), "workspaces")
+        workspace_id = body["workspace_id"]
+
+        for member_id in rng.sample(data.users, min(members, len(data.users))):
+            if member_id != admin_id:
+                transport.request("POST", f"/workspaces/{workspace_id}/members", body={
+                    "admin_id": admin_id, "user_id": member_id, "role": rng.choice(["editor", "viewer"])
+                })
+
+        task_ids = []
+        for start in range(0, tasks_per_workspace, 1000):
+            batch = [
+                {"text": f"task {i}", "date": data.date}
+                for i in range(start, min(start + 1000, tasks_per_workspace))
+            ]
+            body = _check(*transport.request(
+                "POST", f"/workspaces/{workspace_id}/tasks:batch", body={"user_id": admin_id, "tasks": batch}
+            ), "tasks")
+            task_ids.extend(r["task_id"] for r in body["results"] if r.get("status") == "created")
+        data.workspaces[workspace_id] = (admin_id, task_ids)
+
+    pairs = [dict(zip(("user_id", "friend_id"), rng.sample(data.users, 2))) for _ in range(friendships)]
+    for start in range(0, len(pairs), 1000):
+        _check(*transport.request("POST", "/friends:batch", body={"pairs": pairs[start:start + 1000]}), "friendships")
+
+    return data
+
+
+def build_routes(data):
+    """Маршрут -> функция rng -> (method, path, params, body) очередного запроса"""
+    def tasks_by_date(rng):
+        workspace_id, _, _ = data.workspace(rng)
+        return "GET", f"/workspaces/{workspace_id}/tasks", {"date": data.date, "is_done": "false", "fields": "text"}, None
+
+    def toggle(rng):
+        workspace_id, admin_id, task_ids = data.workspace(rng)
+        if not task_ids:
+            return tasks_by_date(rng)
+        return "PUT", f"/workspaces/{workspace_id}/tasks/{rng.choice(task_ids)}", None, {
+            "user_id": admin_id, "is_done": rng.random() < 0.5
+        }
+
+    def members(rng):
+        workspace_id, _, _ = data.workspace(rng)
+        return "GET", f"/workspaces/{workspace_id}/members", None, None
+
+    def friends(rng):
+        return "GET", f"/friends/{data.user(rng)}", None, None
+
+    def recommendations(rng):
+        return "GET", f"/friends/{data.user(rng)}/recommendations", None, None
+
+    def stats(rng):
+        workspace_id, _, _ = data.workspace(rng)
+        return "GET", f"/stats/workspace/{workspace_id}", None, None
+
+    def stats_increment(rng):
+        workspace_id, _, _ = data.workspace(rng)
+        return "POST", "/stats/increment", None, {"key": f"ws:{workspace_id}:bench_hits"}
+
+    def dashboard(rng):
+        workspace_id, admin_id, _ = data.workspace(rng)
+        return "GET", f"/workspaces/{workspace_id}/dashboard", {
+            "date": data.date, "user_id": admin_id, "is_done": "false", "fields": "text"
+        }, None
+
+    return {
+        "tasks_by_date": tasks_by_date,
+        "toggle": toggle,
+        "members": members,
+        "friends": friends,
+        "recommendations": recommendations,
+        "stats": stats,
+        "stats_increment": stats_increment,
+        "dashboard": dashboard,
+    }
+
+
+def run(transport, routes, mix, concurrency, duration, warmup, rng_seed):
+    names = [name for name in mix if mix[name] > 0]
+    weights = [mix[name] for name in names]
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    measure_from = time.perf_counter() + warmup
+    deadline = measure_from + duration
+
+    def worker(worker_id):
+        rng = random.Random(rng_seed + worker_id)
+        local_latencies = defaultdict(list)
+        local_errors = defaultdict(int)
+        while True:
+            started = time.perf_counter()
+            if started >= deadline:
+                break
+            name = rng.choices(names, weights)[0]
+            method, path, params, body = routes[name](rng)
+            try:
+                status, _ = transport.request(method, path, params, body)
+                failed = status >= 500
+            except Exception:
+                failed = True
+            finished = time.perf_counter()
+            if started >= measure_from:
+                local_latencies[name].append((finished - started) * 1000)
+                local_errors[name] += int(failed)
+        with lock:
+            for name, values in local_latencies.items():
+                latencies[name].extend(values)
+                errors[name] += local_errors[name]
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(worker, range(concurrency)))
+    return latencies, errors
+
+
+def _percentile(values, p):
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[p - 1]
+
+
+def report(latencies, errors, duration):
+    rows = []
+    for name in sorted(latencies):
+        values = latencies[name]
+        rows.append({
+            "route": name,
+            "count": len(values),
+            "errors": errors[name],
+            "rps": len(values) / duration,
+            "p50_ms": _percentile(values, 50),
+            "p95_ms": _percentile(values, 95),
+            "p99_ms": _percentile(values, 99),
+        })
+    all_values = [v for values in latencies.values() for v in values]
+    if all_values:
+        rows.append({
+            "route": "TOTAL",
+            "count": len(all_values),
+            "errors": sum(errors.values()),
+            "rps": len(all_values) / duration,
+            "p50_ms": _percentile(all_values, 50),
+            "p95_ms": _percentile(all_values, 95),
+            "p99_ms": _percentile(all_values, 99),
+        })
+
+    print(f"{'route':<16} {'count':>8} {'errors':>7} {'rps':>9} {'p50, ms':>8} {'p95, ms':>8} {'p99, ms':>8}")
+    for row in rows:
+        print(f"{row['route']:<16} {row['count']:>8} {row['errors']:>7} {row['rps']:>9.1f} "
+              f"{row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} {row['p99_ms']:>8.2f}")
+    return rows
+
+
+def _parse_mix(items):
+    mix = dict(DEFAULT_MIX)
+    if items:
+        mix = {name: 0 for name in DEFAULT_MIX}
+        for item in items:
+            name, _, weight = item.partition("=")
+            if name not in DEFAULT_MIX:
+                raise SystemExit(f"Unknown route {name!r}; known: {', '.join(DEFAULT_MIX)}")
+            mix[name] = float(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", help="адрес запущенного сервера; по умолчанию - app.py в этом процессе")
+    target.add_argument("--fake", action="store_true", help="in-memory базы вместо контейнеров")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--workspaces", type=int, default=10)
+    parser.add_argument("--tasks", type=int, default=2000, help="всего задач на сегодня")
+    parser.add_argument("--members", type=int, default=10, help="участников на рабочую область")
+    parser.add_argument("--friendships", type=int, default=300)
+    parser.add_argument("--mix", nargs="*", metavar="ROUTE=WEIGHT",
+                        help=f"веса маршрутов; по умолчанию {' '.join(f'{k}={v}' for k, v in DEFAULT_MIX.items())}")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=20, help="секунд замера")
+    parser.add_argument("--warmup", type=float, default=3, help="секунд прогрева без замера")
+    parser.add_argument("--seed", type=int, default=1, help="seed генератора для воспроизводимости")
+    parser.add_argument("--json", help="записать результаты в файл для сравнения прогонов")
+    args = parser.parse_args()
+
+    if args.fake:
+        from benchmarks.fakes import install_fakes
+        install_fakes()
+    transport = HttpTransport(args.url) if args.url else InProcessTransport()
+
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    data = seed(transport, rng, args.users, args.workspaces, args.tasks, args.members, args.friendships)
+    print(f"Seeded {len(data.users)} users, {len(data.workspaces)} workspaces, "
+          f"{sum(len(t) for _, t in data.workspaces.values())} tasks in {time.perf_counter() - started:.1f}s")
+
+    mix = _parse_mix(args.mix)
+    latencies, errors = run(transport, build_routes(data), mix, args.concurrency,
+                            args.duration, args.warmup, args.seed)
+    rows = report(latencies, errors, args.duration)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Нагрузочный тест: запросы в секунду на смеси частых маршрутов API.
+
+Запускает заданное число одновременных клиентов против каждого сервера из
+--targets и печатает RPS и задержки. Рабочая область с задачами и участниками
+создается через API первого сервера; серверы должны смотреть в одни базы.
+
+Сравнение Flask dev-сервера (app.py) с ASGI-сервером (asgi.py), из src/backend:
+    python app.py                                      # :5000
+    uvicorn asgi:application --port 5001
+    python -m benchmarks.load --targets http://localhost:5000 http://localhost:5001 \\
+        --concurrency 50 200 --duration 20
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import uuid
+
+import httpx
+
+
+def seed(base_url: str, tasks: int, members: int):
+    """Создает пользователя, рабочую область, участников и задачи на сегодня"""
+    today = time.strftime("%Y-%m-%d")
+    suffix = uuid.uuid4().hex[:8]
+    with httpx.Client(base_url=base_url, timeout=30) as client:
+        user_id = client.post("/register", json={"username": f"load_{suffix}"}).json()["user_id"]
+        workspace_id = client.post(
+            "/workspaces", json={"name": f"load_{suffix}", "user_id": user_id}
+        ).json()["workspace_id"]
+        for i in range(members):
+            member_id = client.post("/register", json={"username": f"load_{suffix}_{i}"}).json()["user_id"]
+            client.post(f"/workspaces/{workspace_id}/members",
+                        json={"admin_id": user_id, "user_id": member_id, "role": "viewer"})
+        for start in range(0, tasks, 1000):
+            client.post(f"/workspaces/{workspace_id}/tasks:batch", json={
+                "user_id": user_id,
+                "tasks": [{"text": f"task {i}", "date": today} for i in range(start, min(start + 1000, tasks))]
+            })
+    return user_id, workspace_id, today
+
+
+def route_mix(user_id: str, workspace_id: str, today: str):
+    """(вес, путь, параметры) - примерно как их вызывает десктоп-клиент"""
+    return [
+        (5, f"/workspaces/{workspace_id}/tasks", {"date": today, "is_done": "false", "fields": "text"}),
+        (2, f"/workspaces/{workspace_id}/members", None),
+        (2, f"/stats/workspace/{workspace_id}", None),
+        (1, f"/users/{user_id}/workspaces", None),
+        (1, f"/friends/{user_id}", None),
+    ]
+
+
+async def worker(client, routes, weights, deadline, latencies, errors):
+    while time.perf_counter() < deadline:
+        _, path, params = random.choices(routes, weights)[0]
+        started = time.perf_counter()
+        try:
+            response = await client.get(path, params=params)
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+
+async def run(base_url: str, routes, concurrency: int, duration: float):
+    weights = [weight for weight, _, _ in routes]
+    latencies, errors = [], []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        deadline = time.perf_counter() + duration
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            worker(client, routes, weights, deadline, latencies, errors)
+            for _ in range(concurrency)
+        ))
+        elapsed = time.perf_counter() - started
+    return latencies, errors, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--targets", nargs="+", default=["http://localhost:5000"])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--duration", type=float, default=15, help="секунд на каждый замер")
+    parser.add_argument("--tasks", type=int, default=200)
+    parser.add_argument("--members", type=int, default=20)
+    args = parser.parse_args()
+
+    routes = route_mix(*seed(args.targets[0], args.tasks, args.members))
+
+    print(f"{'target':<28} {'clients':>7} {'rps':>9} {'p50, ms':>8} {'p99, ms':>8} {'errors':>7}")
+    for target in args.targets:
+        for concurrency in args.concurrency:
+            latencies, errors, elapsed = asyncio.run(run(target, routes, concurrency, args.duration))
+            if not latencies:
+                print(f"{target:<28} {concurrency:>7} {'-':>9}")
+                continue
+            p99 = statistics.quantiles(latencies, n=100)[98] if len(latencies) > 1 else latencies[0]
+            print(f"{target:<28} {concurrency:>7} {len(latencies) / elapsed:>9.1f} "
+                  f"{statistics.median(latencies):>8.1f} {p99:>8.1f} {len(errors):>7}")
+
+
+if __name__ == "__main__":
+    main()
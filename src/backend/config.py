@@ -7,4 +7,70 @@ REDIS_URI = "redis://localhost:6379"
 
 # Neo4j
 NEO4J_URI = "bolt://localhost:7687"
-NEO4J_AUTH = ("neo4j", "neo4j")
\ No newline at end of file
+NEO4J_AUTH = ("neo4j", "neo4j")
+
+# Статистика
+STATS_SCAN_BATCH = 500
+# Размер пачки при переносе дружеских связей в Neo4j на одно ребро
+NEO4J_MIGRATE_BATCH = 1000
+
+# Кеш ролей участников рабочих областей
+ROLE_CACHE_TTL = 30  # секунд
+ROLE_CACHE_SIZE = 50000
+
+# Кеш имен пользователей (id -> username)
+USERNAME_CACHE_SIZE = 100000
+
+# Постраничная выдача /users
+USERS_PAGE_SIZE = 100
+USERS_PAGE_MAX = 1000
+
+# Максимальный размер пакетных операций с задачами
+TASK_BATCH_MAX = 1000
+
+# Пакетные операции с дружбой: пар в запросе и пар в одной транзакции Neo4j
+FRIEND_BATCH_MAX = 10000
+FRIEND_WRITE_CHUNK = 500
+
+# Выдача задач по диапазону дат
+TASKS_PAGE_MAX = 1000
+
+# Кеш задач за день (db/task_cache.py)
+TASKS_CACHE_TTL = 600  # секунд; ограничивает жизнь записи, если версия не обновилась
+TASKS_CACHE_LOCAL_SIZE = 2000  # дней в памяти каждого процесса
+TASKS_CACHE_MAX_TASKS = 5000  # дни с большим числом задач не кешируются
+
+# Поток событий рабочей области (Server-Sent Events)
+EVENTS_HEARTBEAT = 15  # секунд между keepalive-комментариями
+# Flask-приложение (serve.py без --asgi) держит каждый поток событий в отдельном
+# потоке сервера до отключения клиента. Сверх лимита на процесс отвечает 503,
+# чтобы потоки событий не заняли все SERVER_THREADS; 0 - отключить SSE в этом режиме.
+# Для сотен подписчиков запускайте serve.py --asgi: там подписчик не занимает поток.
+EVENTS_WSGI_MAX_STREAMS = 2
+EVENTS_RETRY_AFTER = 30  # секунд; Retry-After в ответе 503
+
+# Асинхронный сервер (asgi.py): размеры пулов соединений на процесс
+MONGO_MAX_POOL_SIZE = 100
+REDIS_MAX_CONNECTIONS = 200
+NEO4J_MAX_POOL_SIZE = 100
+
+# Production-сервер (serve.py)
+SERVER_BIND = "0.0.0.0:5000"
+SERVER_WORKERS = 4
+SERVER_THREADS = 8  # потоков на процесс; каждый поток событий (SSE) занимает один, см. EVENTS_WSGI_MAX_STREAMS
+SERVER_TIMEOUT = 30  # секунд без ответа до перезапуска процесса
+SERVER_GRACEFUL_TIMEOUT = 30  # секунд на завершение текущих запросов при остановке
+SERVER_KEEPALIVE = 5
+
+# Проверка готовности (/health/ready): время ожидания ответа каждой базы
+HEALTH_CHECK_TIMEOUT = 2  # секунд
+
+# /workspaces/<id>/dashboard: потоков на процесс для параллельного чтения из баз
+DASHBOARD_WORKERS = 32
+
+# Медленные запросы пишутся в лог с разбивкой времени по базам
+SLOW_REQUEST_MS = 500
+
+# Кеш рекомендаций друзей (Redis ZSET на пользователя)
+RECS_CACHE_TTL = 24 * 3600  # секунд; ограничивает расхождение при гонках обновлений
+RECS_WARM_LIMIT = 10000  # сколько кандидатов сохраняется при прогреве
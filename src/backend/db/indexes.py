@@ -0,0 +1,182 @@
+"""Управление индексами MongoDB для горячих запросов.
+
+Запуск из src/backend:
+    python -m db.indexes            # создать недостающие индексы
+    python -m db.indexes --report   # недостающие и неиспользуемые индексы ($indexStats)
+    python -m db.indexes --explain  # проверить, что горячие запросы идут через IXSCAN
+"""
+import argparse
+import logging
+import sys
+from bson.objectid import ObjectId
+from pymongo import ASCENDING
+from pymongo.errors import OperationFailure
+from db.mongo import db
+
+logger = logging.getLogger(__name__)
+
+# Описание индексов: коллекция -> список (имя, ключи, опции)
+INDEXES = {
+    "users": [
+        ("username_unique", [("username", ASCENDING)], {"unique": True}),
+    ],
+    "tasks": [
+        ("workspace_date_id", [("workspace_id", ASCENDING), ("date", ASCENDING), ("_id", ASCENDING)], {}),
+    ],
+    "workspaces": [
+        ("members_user_id", [("members.user_id", ASCENDING)], {}),
+    ],
+}
+
+# Индексы, которые перекрываются текущими и удаляются при ensure_indexes
+OBSOLETE_INDEXES = {
+    "tasks": ["workspace_date"],
+}
+
+# Горячие запросы: (описание, коллекция, фильтр) в той же форме, что и в db/mongo.py
+HOT_QUERIES = [
+    ("register_user / get_user_id", "users", {"username": "probe"}),
+    ("get_tasks_by_workspace_and_date", "tasks", {"workspace_id": ObjectId(), "date": "1970-01-01"}),
+    ("find_tasks (date range)", "tasks",
+     {"workspace_id": ObjectId(), "date": {"$gte": "1970-01-01", "$lte": "1970-01-31"}, "is_done": False}),
+    ("get_user_workspaces", "workspaces", {"members": {"$elemMatch": {"user_id": "probe"}}}),
+]
+
+
+def _find_by_key(existing: dict, keys):
+    for name, info in existing.items():
+        if list(info["key"]) == list(keys):
+            return name, info
+    return None, None
+
+
+def _check_unique(collection, keys):
+    """Проверяет, что уникальный индекс построится: дубли ключей дают OperationFailure"""
+    group_id = {field.replace(".", "_"): f"${field}" for field, _ in keys}
+    duplicate = next(collection.aggregate([
+        {"$group": {"_id": group_id, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$limit": 1},
+    ], allowDiskUse=True), None)
+    if duplicate:
+        raise OperationFailure(
+            f"Cannot build unique index on {collection.name}: duplicate key {duplicate['_id']}"
+        )
+
+
+def _index_options(info: dict) -> dict:
+    """Опции существующего индекса из index_information() для его пересоздания"""
+    return {k: v for k, v in info.items() if k not in ("v", "key", "ns")}
+
+
+def ensure_indexes() -> list:
+    """Создает недостающие индексы; повторный запуск ничего не меняет.
+
+    Индекс с теми же ключами, но другими опциями или именем пересоздается:
+    MongoDB не держит два индекса с одинаковыми ключами, поэтому старый
+    удаляется перед построением, а при ошибке построения восстанавливается.
+    Устаревшие индексы из OBSOLETE_INDEXES удаляются только после того, как
+    построены все индексы коллекции. Ошибка построения пробрасывается
+    (OperationFailure), чтобы запуск сервера прервался.
+    Возвращает список созданных индексов в виде "коллекция.имя".
+    """
+    created = []
+    for collection_name, specs in INDEXES.items():
+        collection = db[collection_name]
+        existing = collection.index_information()
+        for name, keys, options in specs:
+            current_name, current = _find_by_key(existing, keys)
+            if current_name == name and all(current.get(k) == v for k, v in options.items()):
+                continue
+            if current_name:
+                if options.get("unique"):
+                    _check_unique(collection, keys)
+                collection.drop_index(current_name)
+                logger.info("Dropped index %s.%s to rebuild it as %s", collection_name, current_name, name)
+            try:
+                collection.create_index(keys, name=name, **options)
+            except OperationFailure:
+                logger.exception("Error creating index %s.%s", collection_name, name)
+                if current_name:
+                    collection.create_index(keys, name=current_name, **_index_options(current))
+                    logger.warning("Restored index %s.%s", collection_name, current_name)
+                raise
+            logger.info("Created index %s.%s", collection_name, name)
+            created.append(f"{collection_name}.{name}")
+        for name in OBSOLETE_INDEXES.get(collection_name, []):
+            if name in existing:
+                collection.drop_index(name)
+                logger.info("Dropped obsolete index %s.%s", collection_name, name)
+    return created
+
+
+def report_indexes() -> dict:
+    """Недостающие индексы из INDEXES и индексы без обращений по $indexStats"""
+    missing, unused = [], []
+    for collection_name, specs in INDEXES.items():
+        collection = db[collection_name]
+        existing = collection.index_information()
+        for name, keys, _ in specs:
+            if _find_by_key(existing, keys)[0] is None:
+                missing.append(f"{collection_name}.{name}")
+        for stat in collection.aggregate([{"$indexStats": {}}]):
+            if stat["name"] != "_id_" and stat["accesses"]["ops"] == 0:
+                unused.append(f"{collection_name}.{stat['name']}")
+    return {"missing": missing, "unused": unused}
+
+
+def _plan_stages(plan) -> set:
+    """Собирает все стадии плана, включая вложенные inputStage/inputStages/queryPlan"""
+    stages = set()
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.add(plan["stage"])
+        for value in plan.values():
+            stages |= _plan_stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            stages |= _plan_stages(value)
+    return stages
+
+
+def explain_hot_queries() -> list:
+    """Проверяет через explain, что горячие запросы используют индекс (IXSCAN, не COLLSCAN)"""
+    results = []
+    for description, collection_name, query in HOT_QUERIES:
+        plan = db[collection_name].find(query).explain()["queryPlanner"]["winningPlan"]
+        stages = _plan_stages(plan)
+        results.append({
+            "query": description,
+            "collection": collection_name,
+            "stages": sorted(stages),
+            "ok": "IXSCAN" in stages and "COLLSCAN" not in stages,
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Управление индексами MongoDB")
+    parser.add_argument("--report", action="store_true", help="показать недостающие и неиспользуемые индексы")
+    parser.add_argument("--explain", action="store_true", help="проверить планы горячих запросов")
+    args = parser.parse_args()
+
+    if args.report:
+        report = report_indexes()
+        print("missing:", ", ".join(report["missing"]) or "-")
+        print("unused:", ", ".join(report["unused"]) or "-")
+        return 1 if report["missing"] else 0
+
+    if args.explain:
+        results = explain_hot_queries()
+        for r in results:
+            status = "OK  " if r["ok"] else "FAIL"
+            print(f"{status} {r['query']} ({r['collection']}): {', '.join(r['stages'])}")
+        return 0 if all(r["ok"] for r in results) else 1
+
+    created = ensure_indexes()
+    print("created:", ", ".join(created) or "-")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
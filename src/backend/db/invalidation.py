@@ -0,0 +1,89 @@
+"""Сброс in-process кешей во всех рабочих процессах через Redis pub/sub.
+
+Кеш регистрируется под именем (register), изменение публикуется через
+publish(name, key) - каждый процесс, где запущен слушатель, удаляет ключ
+из своей копии кеша. Слушатель - фоновый поток, который стартует при
+первом обращении к кешу в процессе (ensure_listener), поэтому после fork
+у каждого рабочего процесса свой.
+
+Пока слушатель не подписан (старт, разрыв соединения), сообщения теряются,
+поэтому при каждой (пере)подписке зарегистрированные кеши очищаются целиком.
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+from db.redis import redis_db
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "cache_invalidate"
+RECONNECT_DELAY = 1  # секунд
+
+_caches = {}
+_lock = threading.Lock()
+_listener_pid = None
+
+
+def register(name: str, cache):
+    """cache - объект с invalidate(key) и clear() (db/cache.py)"""
+    _caches[name] = cache
+
+
+def publish(name: str, key):
+    """Сбрасывает ключ кеша name во всех процессах; кортежи передаются как списки"""
+    try:
+        redis_db.publish(INVALIDATION_CHANNEL, json.dumps({"cache": name, "key": key}))
+    except Exception:
+        # Другие процессы увидят изменение по истечении TTL своего кеша
+        logger.exception("Error publishing invalidation of %s %s", name, key)
+
+
+def ensure_listener():
+    """Запускает слушатель в текущем процессе, если он еще не запущен"""
+    global _listener_pid
+    pid = os.getpid()
+    if _listener_pid == pid:
+        return
+    with _lock:
+        if _listener_pid != pid:
+            threading.Thread(target=_listen, name="cache-invalidation", daemon=True).start()
+            _listener_pid = pid
+
+
+def _clear_all():
+    for cache in _caches.values():
+        cache.clear()
+
+
+def _apply(message):
+    payload = json.loads(message["data"])
+    cache = _caches.get(payload["cache"])
+    if cache is not None:
+        key = payload["key"]
+        cache.invalidate(tuple(key) if isinstance(key, list) else key)
+
+
+def _listen():
+    while True:
+        pubsub = None
+        try:
+            pubsub = redis_db.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(INVALIDATION_CHANNEL)
+            # Изменения до подписки не пришли
+            _clear_all()
+            for message in pubsub.listen():
+                if message["type"] == "message":
+                    _apply(message)
+        except Exception:
+            logger.exception("Cache invalidation listener failed, reconnecting")
+            _clear_all()
+            time.sleep(RECONNECT_DELAY)
+        finally:
+            if pubsub is not None:
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
@@ -0,0 +1,89 @@
+"""Клиенты баз данных, безопасные для pre-fork серверов.
+
+Клиент создается при первом обращении, а не при импорте, и привязан к
+процессу: после fork рабочий процесс создает свой клиент вместо
+унаследованного (сокеты и фоновые потоки драйверов не переживают fork).
+Объект ведет себя как сам клиент - атрибуты и [] передаются ему.
+"""
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+_resources = []
+
+
+class ForkSafeResource:
+    def __init__(self, name, factory, close=None):
+        self.name = name
+        self._factory = factory
+        self._close = close
+        self._lock = threading.Lock()
+        self._pid = None
+        self._instance = None
+        _resources.append(self)
+
+    def get(self):
+        pid = os.getpid()
+        if self._instance is None or self._pid != pid:
+            with self._lock:
+                if self._instance is None or self._pid != pid:
+                    self._instance = self._factory()
+                    self._pid = pid
+        return self._instance
+
+    def derive(self, fn):
+        """Объект, вычисляемый из клиента (база, коллекция); пересоздается вместе с ним"""
+        return DerivedResource(self, fn)
+
+    def replace(self, factory, close=None):
+        """Подменяет создание клиента, например на in-memory базу в бенчмарках"""
+        self.close()
+        with self._lock:
+            self._factory = factory
+            self._close = close
+
+    def close(self):
+        """Закрывает клиент текущего процесса; унаследованный от родителя не трогает"""
+        with self._lock:
+            instance, self._instance = self._instance, None
+            owned = self._pid == os.getpid()
+        if instance is not None and owned and self._close:
+            self._close(instance)
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+    def __getitem__(self, key):
+        return self.get()[key]
+
+
+class DerivedResource:
+    def __init__(self, parent, fn):
+        self._parent = parent
+        self._fn = fn
+        self._cached = (None, None)
+
+    def get(self):
+        source = self._parent.get()
+        cached_source, value = self._cached
+        if cached_source is not source:
+            value = self._fn(source)
+            self._cached = (source, value)
+        return value
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+    def __getitem__(self, key):
+        return self.get()[key]
+
+
+def close_all():
+    """Закрывает все клиенты процесса (завершение рабочего процесса)"""
+    for resource in reversed(_resources):
+        try:
+            resource.close()
+        except Exception:
+            logger.exception("Error closing %s", resource.name)
@@ -1,22 +1,65 @@
+import re
 from datetime import datetime
-from pymongo import MongoClient
+from pymongo import ASCENDING, DeleteOne, InsertOne, MongoClient, ReturnDocument, UpdateOne, monitoring
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 from bson.objectid import ObjectId
-from config import MONGO_URI, MONGO_DB
+from config import MONGO_URI, MONGO_DB, ROLE_CACHE_TTL, ROLE_CACHE_SIZE, USERNAME_CACHE_SIZE
 from typing import Optional, Dict, List, Union
+from db.cache import MISSING, LRUCache, TTLCache
+from db import invalidation, task_cache
+from db.lifecycle import ForkSafeResource
+from metrics import record_datastore_call
 
-client = MongoClient(MONGO_URI)
-db = client[MONGO_DB]
 
-users_collection = db.users
-tasks_collection = db.tasks
-workspaces_collection = db.workspaces
+class CommandMetrics(monitoring.CommandListener):
+    """Учитывает каждую команду MongoDB в метриках текущего запроса"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        record_datastore_call("mongo", event.duration_micros / 1e6)
+
+    def failed(self, event):
+        record_datastore_call("mongo", event.duration_micros / 1e6, failed=True)
+
+
+# Клиент создается при первом запросе в каждом процессе (см. db/lifecycle.py)
+client = ForkSafeResource(
+    "mongo", lambda: MongoClient(MONGO_URI, event_listeners=[CommandMetrics()]), lambda c: c.close()
+)
+db = client.derive(lambda c: c[MONGO_DB])
+
+users_collection = client.derive(lambda c: c[MONGO_DB].users)
+tasks_collection = client.derive(lambda c: c[MONGO_DB].tasks)
+workspaces_collection = client.derive(lambda c: c[MONGO_DB].workspaces)
+
+# Кеш ролей: (workspace_id, user_id) -> role (None, если пользователь не участник).
+# Изменение участников сбрасывает запись во всех процессах (db/invalidation.py);
+# TTL ограничивает устаревание, если сообщение о сбросе потерялось
+role_cache = TTLCache(ttl=ROLE_CACHE_TTL, max_size=ROLE_CACHE_SIZE)
+invalidation.register("roles", role_cache)
+# Кеш имен пользователей: user_id -> username (имена не меняются после регистрации)
+username_cache = LRUCache(max_size=USERNAME_CACHE_SIZE)
+
+
+def ping():
+    client.admin.command("ping")
 
 
 def register_user(username: str):
+    """ID пользователя с таким именем; если его нет - создает.
+
+    Одновременные регистрации одного имени упираются в уникальный индекс
+    username_unique: проигравшая вставка читает созданную запись.
+    """
     existing_user = users_collection.find_one({"username": username})
     if existing_user:
         return str(existing_user["_id"])
-    result = users_collection.insert_one({"username": username})
+    try:
+        result = users_collection.insert_one({"username": username})
+    except DuplicateKeyError:
+        return str(users_collection.find_one({"username": username}, {"_id": 1})["_id"])
     return str(result.inserted_id)
 
 
@@ -27,9 +70,11 @@ def delete_task_from_db(workspace_id: str, task_id: str) -> bool:
             "_id": ObjectId(task_id),
             "workspace_id": ObjectId(workspace_id)
         })
-        return result.deleted_count > 0
     except Exception:
         return False
+    if result.deleted_count:
+        task_cache.bump_version(workspace_id)
+    return result.deleted_count > 0
 
 
 def get_user_id(username: str):
@@ -41,19 +86,87 @@ def get_users():
     return [{"_id": str(u["_id"]), "username": u["username"]} for u in users_collection.find()]
 
 
+def _users_query(prefix: Optional[str] = None, after: Optional[str] = None) -> Dict:
+    condition = {}
+    if prefix:
+        # Якорный regex по префиксу использует границы индекса username
+        condition["$regex"] = f"^{re.escape(prefix)}"
+    if after:
+        condition["$gt"] = after
+    return {"username": condition} if condition else {}
+
+
+def find_users(prefix: Optional[str] = None, after: Optional[str] = None, limit: int = 100) -> List[Dict]:
+    """Страница пользователей, отсортированных по username; after - курсор (последнее имя)"""
+    users = users_collection.find(
+        _users_query(prefix, after), {"username": 1}
+    ).sort("username", ASCENDING).limit(limit)
+    return [{"_id": str(u["_id"]), "username": u["username"]} for u in users]
+
+
+def iter_users(prefix: Optional[str] = None, batch_size: int = 1000):
+    """Потоковый обход пользователей без загрузки всей коллекции в память"""
+    users = users_collection.find(
+        _users_query(prefix), {"username": 1}
+    ).sort("username", ASCENDING).batch_size(batch_size)
+    for u in users:
+        yield {"_id": str(u["_id"]), "username": u["username"]}
+
+
+def users_version() -> str:
+    """Версия списка пользователей для ETag потоковой выдачи без чтения всего списка.
+
+    Пользователи только добавляются, имена не меняются: новый пользователь
+    меняет последний _id (индекс _id, одна запись), число документов
+    (метаданные коллекции) учитывает удаления вручную.
+    """
+    newest = users_collection.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+    return f"{newest['_id'] if newest else 0}-{users_collection.estimated_document_count()}"
+
+
 def get_user_by_id(user_id: str):
     user = users_collection.find_one({"_id": ObjectId(user_id)})
     return {"_id": str(user["_id"]), "username": user["username"]} if user else None
 
 
+def get_usernames(user_ids: List[str]) -> Dict[str, str]:
+    """Имена пользователей по списку ID: сначала из кеша, остальные одним запросом $in"""
+    usernames = username_cache.get_many(user_ids)
+    missing = [ObjectId(uid) for uid in set(user_ids) - usernames.keys() if ObjectId.is_valid(uid)]
+    if missing:
+        for user in users_collection.find({"_id": {"$in": missing}}, {"username": 1}):
+            user_id = str(user["_id"])
+            usernames[user_id] = user["username"]
+            username_cache.set(user_id, user["username"])
+    return usernames
+
+
+def get_username_cache_stats() -> dict:
+    return username_cache.stats()
+
+
 def create_workspace(name: str, creator_id: str):
     result = workspaces_collection.insert_one({
         "name": name,
         "members": [
             {"user_id": creator_id, "role": "admin"}
-        ]
+        ],
+        "roles": {creator_id: "admin"}
     })
-    return str(result.inserted_id)
+    workspace_id = str(result.inserted_id)
+    role_cache.set((workspace_id, creator_id), "admin")
+    return workspace_id
+
+
+# Роли участников хранятся дважды в одном документе: массив members
+# (порядок, индекс members.user_id для get_user_workspaces) и словарь
+# roles {user_id: role} для проверки роли чтением одного поля по _id.
+# Оба меняются одним атомарным update_one.
+def _role_field(user_id: str) -> Optional[str]:
+    """Путь к роли в словаре roles; None для id, недопустимых в имени поля"""
+    if not user_id or not isinstance(user_id, str) or "." in user_id or user_id.startswith("$"):
+        return None
+    return f"roles.{user_id}"
 
 
 def get_workspace_by_id(workspace_id: str):
@@ -61,52 +174,90 @@ def get_workspace_by_id(workspace_id: str):
 
 
 def get_user_role_in_workspace(workspace_id: str, user_id: str):
-    workspace = get_workspace_by_id(workspace_id)
-    if not workspace:
+    invalidation.ensure_listener()
+    cache_key = (workspace_id, user_id)
+    role = role_cache.get(cache_key)
+    if role is not MISSING:
+        return role
+
+    field = _role_field(user_id)
+    if not ObjectId.is_valid(workspace_id) or field is None:
         return None
-    for member in workspace["members"]:
-        if member["user_id"] == user_id:
-            return member["role"]
-    return None
+
+    # Чтение по _id одного поля словаря roles
+    workspace = workspaces_collection.find_one({"_id": ObjectId(workspace_id)}, {"_id": 0, field: 1})
+    role = workspace.get("roles", {}).get(user_id) if workspace else None
+    role_cache.set(cache_key, role)
+    return role
+
+
+def get_role_cache_stats() -> dict:
+    return role_cache.stats()
 
 
 def get_workspace_members(workspace_id: str):
-    workspace = get_workspace_by_id(workspace_id)
+    workspace = workspaces_collection.find_one(
+        {"_id": ObjectId(workspace_id)},
+        {"_id": 0, "members": 1}
+    )
     if not workspace:
         return []
-    members_info = []
-    for m in workspace["members"]:
-        user = get_user_by_id(m["user_id"])
-        if user:
-            members_info.append({
-                "user_id": user["_id"],
-                "username": user["username"],
-                "role": m["role"]
-            })
-    return members_info
+
+    members = workspace["members"]
+    # Имена всех участников одним запросом вместо find_one на каждого
+    usernames = get_usernames([m["user_id"] for m in members])
+    return [
+        {
+            "user_id": m["user_id"],
+            "username": usernames[m["user_id"]],
+            "role": m["role"]
+        }
+        for m in members
+        if m["user_id"] in usernames
+    ]
 
 
 def add_member_to_workspace(workspace_id: str, user_id: str, role: str):
-    workspace = get_workspace_by_id(workspace_id)
-    if not workspace:
-        return False
-    if any(member["user_id"] == user_id for member in workspace["members"]):
+    """Добавляет участника одним условным update_one; False, если он уже есть или области нет"""
+    field = _role_field(user_id)
+    if not ObjectId.is_valid(workspace_id) or field is None:
         return False
     result = workspaces_collection.update_one(
-        {"_id": ObjectId(workspace_id)},
-        {"$push": {"members": {"user_id": user_id, "role": role}}}
+        {"_id": ObjectId(workspace_id), field: {"$exists": False}},
+        {"$set": {field: role}, "$push": {"members": {"user_id": user_id, "role": role}}}
     )
+    role_cache.invalidate((workspace_id, user_id))
+    if result.modified_count:
+        invalidation.publish("roles", (workspace_id, user_id))
     return result.modified_count > 0
 
 
 def remove_member_from_workspace(workspace_id: str, user_id: str):
+    field = _role_field(user_id)
+    if not ObjectId.is_valid(workspace_id) or field is None:
+        return False
     result = workspaces_collection.update_one(
-        {"_id": ObjectId(workspace_id)},
-        {"$pull": {"members": {"user_id": user_id}}}
+        {"_id": ObjectId(workspace_id), field: {"$exists": True}},
+        {"$unset": {field: ""}, "$pull": {"members": {"user_id": user_id}}}
     )
+    role_cache.invalidate((workspace_id, user_id))
+    if result.modified_count:
+        invalidation.publish("roles", (workspace_id, user_id))
     return result.modified_count > 0
 
 
+def migrate_workspace_roles() -> int:
+    """Заполняет словарь roles из массива members у рабочих областей без него"""
+    result = workspaces_collection.update_many(
+        {"roles": {"$exists": False}},
+        [{"$set": {"roles": {"$arrayToObject": {"$map": {
+            "input": {"$ifNull": ["$members", []]},
+            "in": {"k": "$$this.user_id", "v": "$$this.role"}
+        }}}}}]
+    )
+    return result.modified_count
+
+
 def create_task(workspace_id, text, date):
     task = {
         "workspace_id": ObjectId(workspace_id),
@@ -116,37 +267,204 @@ def create_task(workspace_id, text, date):
         "created_at": datetime.utcnow()
     }
     result = tasks_collection.insert_one(task)
+    task_cache.bump_version(workspace_id)
     return str(result.inserted_id)
 
 
-def update_task_status_by_id(task_id: str, is_done: bool) -> bool:
+def update_task_status_by_id(workspace_id: str, task_id: str, is_done: bool) -> Optional[Dict]:
+    """Меняет статус задачи рабочей области одним find_one_and_update.
+
+    Возвращает задачу в новом состоянии или None, если ее нет в рабочей области.
+    """
     try:
         obj_id = ObjectId(task_id)
+        ws_id = ObjectId(workspace_id)
     except Exception:
-        return False  # Невалидный формат ID
-
-    result = tasks_collection.update_one(
-        {"_id": obj_id},
-        {"$set": {"is_done": is_done}}
+        return None  # Невалидный формат ID
+
+    # Прежнее состояние показывает, изменилось ли что-то; новое собираем из него
+    task = tasks_collection.find_one_and_update(
+        {"_id": obj_id, "workspace_id": ws_id},
+        {"$set": {"is_done": is_done}},
+        projection={field: 1 for field in TASK_FIELDS},
+        return_document=ReturnDocument.BEFORE
     )
-    return result.modified_count > 0
+    if task is None:
+        return None
+    if task["is_done"] != is_done:
+        task_cache.bump_version(workspace_id)
+    return _task_to_dict({**task, "is_done": is_done})
 
 
+def _bulk_write_tasks(operations):
+    """Неупорядоченный bulk_write.
 
-def get_tasks_by_workspace_and_date(workspace_id, date):
-    tasks = tasks_collection.find({
-        "workspace_id": ObjectId(workspace_id),
-        "date": date
-    })
-    return [
-        {
-            "task_id": str(task["_id"]),
+    Возвращает (результат, ошибки по индексу операции); результат - словарь
+    счетчиков BulkWriteResult (nMatched, nRemoved, ...), при ошибках - из BulkWriteError.
+    """
+    if not operations:
+        return {}, {}
+    try:
+        result = tasks_collection.bulk_write(operations, ordered=False)
+    except BulkWriteError as e:
+        errors = {err["index"]: err.get("errmsg", "write error") for err in e.details.get("writeErrors", [])}
+        return e.details, errors
+    return result.bulk_api_result, {}
+
+
+def _existing_task_ids(workspace_id: ObjectId, task_ids: List[str]) -> set:
+    """ID задач из списка, которые есть в рабочей области (один запрос $in)"""
+    obj_ids = [ObjectId(tid) for tid in task_ids if ObjectId.is_valid(tid)]
+    if not obj_ids:
+        return set()
+    found = tasks_collection.find({"_id": {"$in": obj_ids}, "workspace_id": workspace_id}, {"_id": 1})
+    return {str(task["_id"]) for task in found}
+
+
+def _bulk_results(task_ids: List[str], positions, errors, done: str, found) -> List[Dict]:
+    """Итог по каждой задаче; positions[op_index] - позиции задачи операции в запросе,
+    found(task_id) - нашлась ли задача, для которой не было ошибки"""
+    results = [{"task_id": tid, "status": "not_found"} for tid in task_ids]
+    for op_index, indexes in enumerate(positions):
+        if op_index in errors:
+            outcome = {"status": "error", "error": errors[op_index]}
+        elif found(task_ids[indexes[0]]):
+            outcome = {"status": done}
+        else:
+            continue
+        for i in indexes:
+            results[i].update(outcome)
+    return results
+
+
+def create_tasks_bulk(workspace_id: str, tasks: List[Dict]) -> List[Dict]:
+    """Создает задачи одним bulk_write; tasks - список {"text", "date"}"""
+    ws_id = ObjectId(workspace_id)
+    created_at = datetime.utcnow()
+    task_ids = [ObjectId() for _ in tasks]
+    operations = [
+        InsertOne({
+            "_id": task_id,
+            "workspace_id": ws_id,
             "text": task["text"],
             "date": task["date"],
-            "is_done": task["is_done"]
-        }
-        for task in tasks
+            "is_done": False,
+            "created_at": created_at
+        })
+        for task_id, task in zip(task_ids, tasks)
     ]
+    _, errors = _bulk_write_tasks(operations)
+    if len(errors) < len(operations):
+        task_cache.bump_version(workspace_id)
+    return [
+        {"task_id": str(task_id), "status": "error", "error": errors[i]} if i in errors
+        else {"task_id": str(task_id), "status": "created"}
+        for i, task_id in enumerate(task_ids)
+    ]
+
+
+def update_tasks_status_bulk(workspace_id: str, updates: List[Dict]) -> List[Dict]:
+    """Меняет статус задач одним bulk_write; updates - список {"task_id", "is_done"}
+
+    Каждая операция фильтрует по _id и workspace_id, поэтому чужие и
+    несуществующие задачи просто не совпадают. Если nMatched равен числу
+    операций без ошибок, найдены все; иначе найденные определяются одним
+    чтением после записи - задача, удаленная сразу после обновления,
+    будет отмечена not_found, что совпадает с итоговым состоянием.
+    """
+    ws_id = ObjectId(workspace_id)
+    task_ids = [u["task_id"] for u in updates]
+    operations, positions = [], []
+    for i, update in enumerate(updates):
+        if ObjectId.is_valid(update["task_id"]):
+            operations.append(UpdateOne(
+                {"_id": ObjectId(update["task_id"]), "workspace_id": ws_id},
+                {"$set": {"is_done": bool(update["is_done"])}}
+            ))
+            positions.append([i])
+    result, errors = _bulk_write_tasks(operations)
+    matched = result.get("nMatched", 0)
+    if matched:
+        task_cache.bump_version(workspace_id)
+    if matched == len(operations) - len(errors):
+        return _bulk_results(task_ids, positions, errors, "updated", lambda tid: True)
+    existing = _existing_task_ids(ws_id, [task_ids[indexes[0]] for indexes in positions])
+    return _bulk_results(task_ids, positions, errors, "updated", existing.__contains__)
+
+
+def delete_tasks_bulk(workspace_id: str, task_ids: List[str]) -> List[Dict]:
+    """Удаляет задачи рабочей области одним bulk_write
+
+    После удаления нельзя узнать, какие задачи были, поэтому они читаются
+    заранее. Если задачу удалили между чтением и записью (nRemoved меньше
+    ожидаемого), она все равно отмечается deleted: итоговое состояние то же.
+    Повторы id удаляются одной операцией и получают тот же результат.
+    """
+    ws_id = ObjectId(workspace_id)
+    existing = _existing_task_ids(ws_id, task_ids)
+    indexes_by_id = {}
+    for i, task_id in enumerate(task_ids):
+        if task_id in existing:
+            indexes_by_id.setdefault(task_id, []).append(i)
+    operations = [
+        DeleteOne({"_id": ObjectId(task_id), "workspace_id": ws_id})
+        for task_id in indexes_by_id
+    ]
+    positions = list(indexes_by_id.values())
+    result, errors = _bulk_write_tasks(operations)
+    if result.get("nRemoved", 0):
+        task_cache.bump_version(workspace_id)
+    return _bulk_results(task_ids, positions, errors, "deleted", lambda tid: True)
+
+
+# Поля задачи, которые можно запросить через projection
+TASK_FIELDS = ("text", "date", "is_done")
+
+
+def _task_to_dict(task: Dict, fields=TASK_FIELDS) -> Dict:
+    result = {"task_id": str(task["_id"])}
+    for field in fields:
+        result[field] = task[field]
+    return result
+
+
+# Порядок выдачи совпадает с индексом (workspace_id, date, _id)
+TASK_SORT = [("date", ASCENDING), ("_id", ASCENDING)]
+
+
+def _tasks_query(workspace_id: str, date_from: str, date_to: str, is_done: Optional[bool] = None,
+                 after: Optional[tuple] = None) -> Dict:
+    query = {"workspace_id": ObjectId(workspace_id)}
+    query["date"] = date_from if date_from == date_to else {"$gte": date_from, "$lte": date_to}
+    if is_done is not None:
+        query["is_done"] = is_done
+    if after:
+        after_date, after_id = after
+        query["$or"] = [
+            {"date": {"$gt": after_date}},
+            {"date": after_date, "_id": {"$gt": ObjectId(after_id)}}
+        ]
+    return query
+
+
+def find_tasks(workspace_id: str, date_from: str, date_to: str, is_done: Optional[bool] = None,
+               fields=TASK_FIELDS, limit: Optional[int] = None,
+               after: Optional[tuple] = None) -> List[Dict]:
+    """Задачи рабочей области за диапазон дат одним запросом по индексу (workspace_id, date, _id).
+
+    after - курсор (date, task_id) последней задачи предыдущей страницы.
+    """
+    query = _tasks_query(workspace_id, date_from, date_to, is_done, after)
+    projection = {field: 1 for field in fields}
+    tasks = tasks_collection.find(query, projection).sort(TASK_SORT)
+    if limit:
+        tasks = tasks.limit(limit)
+    return [_task_to_dict(task, fields) for task in tasks]
+
+
+def get_tasks_by_workspace_and_date(workspace_id, date):
+    """Все задачи за день через кеш db/task_cache.py"""
+    return task_cache.get_day_tasks(workspace_id, date, lambda: find_tasks(workspace_id, date, date))
 
 def get_user_workspaces(user_id: str) -> List[Dict]:
     workspaces = workspaces_collection.find({
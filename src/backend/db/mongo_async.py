@@ -0,0 +1,152 @@
+"""Асинхронный доступ к MongoDB (Motor) для asgi.py.
+
+Клиент создается в init() при старте сервера и закрывается в close().
+Кеши ролей и имен общие с db/mongo.py: маршруты, которые обслуживает
+WSGI-приложение, сбрасывают их для обоих вариантов сразу.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from bson.objectid import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+
+from config import MONGO_URI, MONGO_DB, MONGO_MAX_POOL_SIZE
+from db import invalidation, redis_async
+from db.cache import MISSING
+from db.mongo import (
+    TASK_FIELDS, TASK_SORT, CommandMetrics, _role_field, _task_to_dict, _tasks_query, role_cache, username_cache
+)
+
+_client: Optional[AsyncIOMotorClient] = None
+
+
+async def init():
+    global _client
+    if _client is None:
+        _client = AsyncIOMotorClient(MONGO_URI, maxPoolSize=MONGO_MAX_POOL_SIZE, event_listeners=[CommandMetrics()])
+
+
+async def close():
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
+
+
+def _collection(name: str):
+    if _client is None:
+        raise RuntimeError("mongo_async.init() was not called")
+    return _client[MONGO_DB][name]
+
+
+async def get_usernames(user_ids: List[str]) -> Dict[str, str]:
+    """Имена пользователей по списку ID: сначала из кеша, остальные одним запросом $in"""
+    usernames = username_cache.get_many(user_ids)
+    missing = [ObjectId(uid) for uid in set(user_ids) - usernames.keys() if ObjectId.is_valid(uid)]
+    if missing:
+        async for user in _collection("users").find({"_id": {"$in": missing}}, {"username": 1}):
+            user_id = str(user["_id"])
+            usernames[user_id] = user["username"]
+            username_cache.set(user_id, user["username"])
+    return usernames
+
+
+async def get_user_role_in_workspace(workspace_id: str, user_id: str):
+    invalidation.ensure_listener()
+    cache_key = (workspace_id, user_id)
+    role = role_cache.get(cache_key)
+    if role is not MISSING:
+        return role
+
+    field = _role_field(user_id)
+    if not ObjectId.is_valid(workspace_id) or field is None:
+        return None
+
+    workspace = await _collection("workspaces").find_one({"_id": ObjectId(workspace_id)}, {"_id": 0, field: 1})
+    role = workspace.get("roles", {}).get(user_id) if workspace else None
+    role_cache.set(cache_key, role)
+    return role
+
+
+async def get_workspace_members(workspace_id: str):
+    workspace = await _collection("workspaces").find_one(
+        {"_id": ObjectId(workspace_id)},
+        {"_id": 0, "members": 1}
+    )
+    if not workspace:
+        return []
+
+    members = workspace["members"]
+    usernames = await get_usernames([m["user_id"] for m in members])
+    return [
+        {"user_id": m["user_id"], "username": usernames[m["user_id"]], "role": m["role"]}
+        for m in members
+        if m["user_id"] in usernames
+    ]
+
+
+async def get_user_workspaces(user_id: str) -> List[Dict]:
+    workspaces = _collection("workspaces").find({"members": {"$elemMatch": {"user_id": user_id}}})
+    return [
+        {"_id": str(ws["_id"]), "name": ws["name"], "members": ws["members"]}
+        async for ws in workspaces
+    ]
+
+
+async def find_tasks(workspace_id: str, date_from: str, date_to: str, is_done: Optional[bool] = None,
+                     fields=TASK_FIELDS, limit: Optional[int] = None,
+                     after: Optional[tuple] = None) -> List[Dict]:
+    """То же, что db.mongo.find_tasks"""
+    query = _tasks_query(workspace_id, date_from, date_to, is_done, after)
+    projection = {field: 1 for field in fields}
+    tasks = _collection("tasks").find(query, projection).sort(TASK_SORT)
+    if limit:
+        tasks = tasks.limit(limit)
+    return [_task_to_dict(task, fields) async for task in tasks]
+
+
+async def get_tasks_by_workspace_and_date(workspace_id: str, date: str) -> List[Dict]:
+    """То же, что db.mongo.get_tasks_by_workspace_and_date"""
+    return await redis_async.get_day_tasks(workspace_id, date, lambda: find_tasks(workspace_id, date, date))
+
+
+async def create_task(workspace_id: str, text: str, date: str) -> str:
+    result = await _collection("tasks").insert_one({
+        "workspace_id": ObjectId(workspace_id),
+        "text": text,
+        "date": date,
+        "is_done": False,
+        "created_at": datetime.utcnow()
+    })
+    await redis_async.bump_tasks_version(workspace_id)
+    return str(result.inserted_id)
+
+
+async def update_task_status_by_id(workspace_id: str, task_id: str, is_done: bool) -> Optional[Dict]:
+    """То же, что db.mongo.update_task_status_by_id"""
+    if not (ObjectId.is_valid(task_id) and ObjectId.is_valid(workspace_id)):
+        return None
+    task = await _collection("tasks").find_one_and_update(
+        {"_id": ObjectId(task_id), "workspace_id": ObjectId(workspace_id)},
+        {"$set": {"is_done": is_done}},
+        projection={field: 1 for field in TASK_FIELDS},
+        return_document=ReturnDocument.BEFORE
+    )
+    if task is None:
+        return None
+    if task["is_done"] != is_done:
+        await redis_async.bump_tasks_version(workspace_id)
+    return _task_to_dict({**task, "is_done": is_done})
+
+
+async def delete_task_from_db(workspace_id: str, task_id: str) -> bool:
+    if not (ObjectId.is_valid(task_id) and ObjectId.is_valid(workspace_id)):
+        return False
+    result = await _collection("tasks").delete_one({
+        "_id": ObjectId(task_id),
+        "workspace_id": ObjectId(workspace_id)
+    })
+    if result.deleted_count:
+        await redis_async.bump_tasks_version(workspace_id)
+    return result.deleted_count > 0
@@ -1,76 +1,267 @@
+import logging
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
 from neo4j import GraphDatabase
-from config import NEO4J_URI, NEO4J_AUTH
+from config import NEO4J_URI, NEO4J_AUTH, NEO4J_MIGRATE_BATCH, FRIEND_WRITE_CHUNK
+from db.lifecycle import ForkSafeResource
+from metrics import datastore_timer
 
-driver = GraphDatabase.driver(NEO4J_URI, auth=None)
+logger = logging.getLogger(__name__)
+
+driver = ForkSafeResource("neo4j", lambda: GraphDatabase.driver(NEO4J_URI, auth=None), lambda d: d.close())
+
+
+@contextmanager
+def _session():
+    """Сессия Neo4j; время до ее закрытия (вместе с чтением результата) идет в метрики запроса"""
+    with datastore_timer("neo4j"), driver.session() as session:
+        yield session
+
+# Дружба хранится одним ребром FRIENDS_WITH от меньшего id к большему;
+# направление ничего не значит, читаем без него.
+# Запросы чтения общие с асинхронной версией (db/neo4j_async.py)
+FRIENDS_QUERY = """
+    MATCH (u:User {id: $user_id})-[:FRIENDS_WITH]-(friend:User)
+    RETURN DISTINCT friend.id AS friend_id
+"""
+
+RECOMMENDATIONS_QUERY = """
+    MATCH (me:User {id: $user_id})-[:FRIENDS_WITH]-(common:User)-[:FRIENDS_WITH]-(recommended:User)
+    WHERE NOT (me)-[:FRIENDS_WITH]-(recommended) AND me <> recommended
+    WITH recommended, count(DISTINCT common) AS common_friends
+    RETURN recommended.id AS user_id, common_friends
+    ORDER BY common_friends DESC
+    LIMIT $limit
+"""
+
+# С ограничением уникальности MERGE по id идет через индекс, а не перебор всех :User
+USER_ID_CONSTRAINT = "user_id_unique"
+SCHEMA_QUERIES = [
+    f"CREATE CONSTRAINT {USER_ID_CONSTRAINT} IF NOT EXISTS FOR (u:User) REQUIRE u.id IS UNIQUE",
+]
+
+CONSTRAINT_EXISTS_QUERY = """
+    SHOW CONSTRAINTS YIELD name WHERE name = $name
+    RETURN count(*) > 0 AS exists
+"""
+
+# Конкурентные MERGE без ограничения могли создать несколько :User с одним id;
+# ограничение на таких данных не создается
+DUPLICATE_USERS_QUERY = """
+    MATCH (u:User) WHERE u.id IS NOT NULL
+    WITH u.id AS user_id, count(*) AS nodes
+    WHERE nodes > 1
+    RETURN user_id LIMIT $batch_size
+"""
+
+# Узлы одного id сводятся к первому: связи дубликатов переносятся на него
+# в каноническом направлении (от меньшего id к большему), дубликаты удаляются
+MERGE_DUPLICATE_USER_QUERY = """
+    MATCH (u:User {id: $user_id})
+    WITH u ORDER BY elementId(u)
+    WITH collect(u) AS nodes
+    WITH head(nodes) AS keep, tail(nodes) AS duplicates
+    UNWIND duplicates AS dup
+    OPTIONAL MATCH (dup)-[:FRIENDS_WITH]-(other:User)
+    WITH keep, dup, collect(DISTINCT other) AS others
+    FOREACH (other IN [o IN others WHERE o.id > keep.id] | MERGE (keep)-[:FRIENDS_WITH]->(other))
+    FOREACH (other IN [o IN others WHERE o.id < keep.id] | MERGE (other)-[:FRIENDS_WITH]->(keep))
+    DETACH DELETE dup
+    RETURN count(*) AS merged
+"""
+
+ADD_FRIEND_QUERY = """
+    MERGE (u1:User {id: $user_id})
+    MERGE (u2:User {id: $friend_id})
+    MERGE (u1)-[:FRIENDS_WITH]->(u2)
+"""
+
+REMOVE_FRIEND_QUERY = """
+    MATCH (:User {id: $user_id})-[r:FRIENDS_WITH]-(:User {id: $friend_id})
+    DELETE r
+"""
+
+# Пакетные версии: одна транзакция на FRIEND_WRITE_CHUNK пар;
+# existed - была ли связь до записи
+ADD_FRIENDS_BULK_QUERY = """
+    UNWIND $pairs AS pair
+    MERGE (u1:User {id: pair.user_id})
+    MERGE (u2:User {id: pair.friend_id})
+    WITH pair, u1, u2, exists { (u1)-[:FRIENDS_WITH]-(u2) } AS existed
+    MERGE (u1)-[:FRIENDS_WITH]->(u2)
+    RETURN pair.index AS index, existed
+"""
+
+REMOVE_FRIENDS_BULK_QUERY = """
+    UNWIND $pairs AS pair
+    OPTIONAL MATCH (:User {id: pair.user_id})-[r:FRIENDS_WITH]-(:User {id: pair.friend_id})
+    WITH pair, collect(r) AS rels
+    FOREACH (r IN rels | DELETE r)
+    RETURN pair.index AS index, size(rels) > 0 AS existed
+"""
+
+FRIENDS_OF_QUERY = """
+    UNWIND $user_ids AS user_id
+    MATCH (:User {id: user_id})-[:FRIENDS_WITH]-(friend:User)
+    RETURN DISTINCT friend.id AS friend_id
+"""
+
+# Старые двунаправленные пары: ребро против канонического направления
+# заменяется каноническим (MERGE не создаст второе, если оно уже есть)
+MIGRATE_FRIENDSHIPS_QUERY = """
+    MATCH (u1:User)-[r:FRIENDS_WITH]->(u2:User)
+    WHERE u1.id > u2.id
+    WITH u1, u2, r LIMIT $batch_size
+    MERGE (u2)-[:FRIENDS_WITH]->(u1)
+    DELETE r
+    RETURN count(*) AS migrated
+"""
+
+def ping():
+    driver.verify_connectivity()
+
+def ensure_schema():
+    """Создает ограничения Neo4j; повторный запуск ничего не меняет.
+
+    Пока ограничения на id нет, сначала сводятся дубликаты :User.
+    """
+    with _session() as session:
+        if not session.run(CONSTRAINT_EXISTS_QUERY, name=USER_ID_CONSTRAINT).single()["exists"]:
+            merged = merge_duplicate_users()
+            if merged:
+                logger.info("Merged %d duplicate :User nodes", merged)
+        for query in SCHEMA_QUERIES:
+            session.run(query).consume()
+
+def merge_duplicate_users(batch_size: int = NEO4J_MIGRATE_BATCH) -> int:
+    """Сводит узлы :User с одинаковым id к одному; возвращает число удаленных дубликатов.
+
+    Каждый id - своя транзакция: связи между дубликатами разных id
+    переносятся по очереди и не теряются.
+    """
+    merged = 0
+    with _session() as session:
+        while True:
+            user_ids = [
+                record["user_id"]
+                for record in session.run(DUPLICATE_USERS_QUERY, batch_size=batch_size)
+            ]
+            if not user_ids:
+                return merged
+            for user_id in user_ids:
+                merged += session.execute_write(
+                    lambda tx: tx.run(MERGE_DUPLICATE_USER_QUERY, user_id=user_id).single()["merged"]
+                )
+
+def migrate_directed_friendships(batch_size: int = NEO4J_MIGRATE_BATCH) -> int:
+    """Сводит пары встречных связей FRIENDS_WITH к одному ребру; возвращает число перенесенных"""
+    migrated = 0
+    with _session() as session:
+        while True:
+            count = session.execute_write(
+                lambda tx: tx.run(MIGRATE_FRIENDSHIPS_QUERY, batch_size=batch_size).single()["migrated"]
+            )
+            if not count:
+                return migrated
+            migrated += count
+
+def _write_friendship(query: str, user_id: str, friend_id: str):
+    # Одинаковый порядок id: конкурентные записи берут блокировки узлов
+    # в одном порядке и не встают в deadlock; повтор при транзиентных
+    # ошибках делает execute_write
+    user_id, friend_id = sorted((user_id, friend_id))
+    with _session() as session:
+        session.execute_write(lambda tx: tx.run(query, user_id=user_id, friend_id=friend_id).consume())
 
 def add_friend(user_id: str, friend_id: str) -> bool:
-    """Создание двусторонней дружеской связи в Neo4j"""
+    """Создание дружеской связи в Neo4j"""
     try:
-        with driver.session() as session:
-            # Создаем двунаправленную связь за один запрос
-            result = session.run("""
-                // Находим или создаем обоих пользователей
-                MERGE (u1:User {id: $user_id})
-                MERGE (u2:User {id: $friend_id})
-                
-                // Создаем связи в обоих направлениях
-                MERGE (u1)-[r1:FRIENDS_WITH]->(u2)
-                MERGE (u1)<-[r2:FRIENDS_WITH]-(u2)
-                
-                // Возвращаем результат для проверки
-                RETURN r1, r2
-            """, user_id=user_id, friend_id=friend_id)
-            
-            # Если есть обе связи, считаем операцию успешной
-            return len(result.data()) > 0
-    except Exception as e:
-        print(f"Error creating friendship: {str(e)}")
+        _write_friendship(ADD_FRIEND_QUERY, user_id, friend_id)
+        return True
+    except Exception:
+        logger.exception("Error creating friendship %s - %s", user_id, friend_id)
         return False
 
+def query_user_friends(user_id: str):
+    """ID друзей пользователя; ошибки Neo4j пробрасываются"""
+    with _session() as session:
+        result = session.run(FRIENDS_QUERY, user_id=user_id)
+        return [record["friend_id"] for record in result]
+
 def get_user_friends(user_id: str):
     """Получение списка ID друзей пользователя из Neo4j"""
     try:
-        with driver.session() as session:
-            result = session.run("""
-                MATCH (u:User {id: $user_id})-[:FRIENDS_WITH]->(friend:User)
-                RETURN friend.id AS friend_id
-            """, user_id=user_id)
-            
-            return [record["friend_id"] for record in result]
-    except Exception as e:
-        print(f"Error getting friends: {e}")
+        return query_user_friends(user_id)
+    except Exception:
+        logger.exception("Error getting friends of %s", user_id)
         return []
     
 def remove_friend_relation(user_id: str, friend_id: str) -> bool:
-    """Удаление дружеской связи между пользователями (альтернативная версия)"""
+    """Удаление дружеской связи между пользователями"""
     try:
-        with driver.session() as session:
-            # Удаляем связи без возврата количества
-            session.run("""
-                MATCH (u1:User {id: $user_id})-[r:FRIENDS_WITH]-(u2:User {id: $friend_id})
-                DELETE r
-            """, user_id=user_id, friend_id=friend_id)
-            return True
-    except Exception as e:
-        print(f"Error removing friend relation: {e}")
+        _write_friendship(REMOVE_FRIEND_QUERY, user_id, friend_id)
+        return True
+    except Exception:
+        logger.exception("Error removing friend relation %s - %s", user_id, friend_id)
         return False
-    
+
+
+def _write_friendships_bulk(query: str, pairs: List[Tuple[str, str]], statuses, chunk_size: int) -> List[Dict]:
+    """Пишет пары пачками UNWIND; statuses - (статус для existed=True, для existed=False).
+
+    Повторы пары (в любом порядке id) пишутся один раз и получают тот же
+    результат. Ошибка пачки помечает только ее пары, остальные пачки пишутся.
+    """
+    results = [{"user_id": user_id, "friend_id": friend_id} for user_id, friend_id in pairs]
+    positions = {}
+    for i, (user_id, friend_id) in enumerate(pairs):
+        positions.setdefault(tuple(sorted((user_id, friend_id))), []).append(i)
+    # Пары в порядке id: пачки берут блокировки узлов в одном порядке
+    unique = sorted(positions)
+
+    with _session() as session:
+        for start in range(0, len(unique), chunk_size):
+            chunk = [
+                {"index": n, "user_id": user_id, "friend_id": friend_id}
+                for n, (user_id, friend_id) in enumerate(unique[start:start + chunk_size], start)
+            ]
+            try:
+                records = session.execute_write(lambda tx: tx.run(query, pairs=chunk).data())
+            except Exception as e:
+                logger.exception("Error writing friendships %d-%d", start, start + len(chunk))
+                outcome = {n["index"]: {"status": "error", "error": str(e)} for n in chunk}
+            else:
+                outcome = {r["index"]: {"status": statuses[0] if r["existed"] else statuses[1]} for r in records}
+            for n in chunk:
+                for i in positions[unique[n["index"]]]:
+                    results[i].update(outcome.get(n["index"], {"status": "error", "error": "no result"}))
+    return results
+
+def add_friends_bulk(pairs: List[Tuple[str, str]], chunk_size: int = FRIEND_WRITE_CHUNK) -> List[Dict]:
+    """Создает дружбу для списка пар (user_id, friend_id); статус каждой пары - added, exists или error"""
+    return _write_friendships_bulk(ADD_FRIENDS_BULK_QUERY, pairs, ("exists", "added"), chunk_size)
+
+def remove_friends_bulk(pairs: List[Tuple[str, str]], chunk_size: int = FRIEND_WRITE_CHUNK) -> List[Dict]:
+    """Удаляет дружбу для списка пар; статус каждой пары - removed, not_found или error"""
+    return _write_friendships_bulk(REMOVE_FRIENDS_BULK_QUERY, pairs, ("removed", "not_found"), chunk_size)
+
+def query_friends_of(user_ids: List[str]) -> List[str]:
+    """ID друзей всех пользователей из списка одним запросом; ошибки пробрасываются"""
+    with _session() as session:
+        result = session.run(FRIENDS_OF_QUERY, user_ids=list(user_ids))
+        return [record["friend_id"] for record in result]
+
+def query_friend_recommendations(user_id: str, limit: int = 5):
+    """Рекомендации обходом друзей друзей; ошибки Neo4j пробрасываются"""
+    with _session() as session:
+        result = session.run(RECOMMENDATIONS_QUERY, user_id=user_id, limit=limit)
+        return [{"user_id": record["user_id"], "common_friends": record["common_friends"]}
+                for record in result]
 
 def get_friend_recommendations(user_id: str, limit: int = 5):
     """Получение рекомендаций друзей на основе общих друзей"""
     try:
-        with driver.session() as session:
-            result = session.run("""
-                MATCH (me:User {id: $user_id})-[:FRIENDS_WITH]->(common:User)-[:FRIENDS_WITH]->(recommended:User)
-                WHERE NOT (me)-[:FRIENDS_WITH]->(recommended) AND me <> recommended
-                WITH recommended, count(common) AS common_friends
-                RETURN recommended.id AS user_id, common_friends
-                ORDER BY common_friends DESC
-                LIMIT $limit
-            """, user_id=user_id, limit=limit)
-            
-            return [{"user_id": record["user_id"], "common_friends": record["common_friends"]} 
-                   for record in result]
-    except Exception as e:
-        print(f"Error getting friend recommendations: {e}")
+        return query_friend_recommendations(user_id, limit)
+    except Exception:
+        logger.exception("Error getting friend recommendations for %s", user_id)
         return []
\ No newline at end of file
@@ -0,0 +1,44 @@
+"""Асинхронный доступ к Neo4j (AsyncGraphDatabase) для asgi.py; драйвер создается в init()"""
+import logging
+from typing import Optional
+
+from neo4j import AsyncDriver, AsyncGraphDatabase
+
+from config import NEO4J_URI, NEO4J_MAX_POOL_SIZE
+from db.neo4j import FRIENDS_QUERY
+from metrics import datastore_timer
+
+logger = logging.getLogger(__name__)
+
+_driver: Optional[AsyncDriver] = None
+
+
+async def init():
+    global _driver
+    if _driver is None:
+        _driver = AsyncGraphDatabase.driver(NEO4J_URI, auth=None, max_connection_pool_size=NEO4J_MAX_POOL_SIZE)
+
+
+async def close():
+    global _driver
+    if _driver is not None:
+        await _driver.close()
+        _driver = None
+
+
+def _session():
+    if _driver is None:
+        raise RuntimeError("neo4j_async.init() was not called")
+    return _driver.session()
+
+
+async def get_user_friends(user_id: str):
+    try:
+        with datastore_timer("neo4j"):
+            async with _session() as session:
+                result = await session.run(FRIENDS_QUERY, user_id=user_id)
+                return [record["friend_id"] async for record in result]
+    except Exception:
+        logger.exception("Error getting friends of %s", user_id)
+        return []
+
@@ -0,0 +1,206 @@
+"""Рекомендации друзей, предвычисленные в Redis.
+
+recs:{user_id} - ZSET кандидатов (друзей друзей, которые еще не друзья)
+со счетом = числом общих друзей. recs_ready:{user_id} отмечает, что ZSET
+заполнен: пустой ZSET в Redis не хранится, и без отметки нельзя отличить
+"рекомендаций нет" от "кеш холодный".
+
+Чтение теплого кеша - ZREVRANGE на limit элементов. Холодный кеш
+заполняется обходом графа в Neo4j. Добавление и удаление дружбы меняет
+счета только у затронутых пользователей с теплым кешем; холодные
+посчитаются при следующем чтении. Гонки одновременных изменений могут
+сдвинуть счет на единицу - RECS_CACHE_TTL ограничивает время жизни такого
+расхождения.
+
+Пакетные изменения дружбы не пересчитывают счета, а сбрасывают кеш всех
+затронутых: участников пар и их друзей.
+"""
+import logging
+from collections import defaultdict
+
+from config import RECS_CACHE_TTL, RECS_WARM_LIMIT
+from db.neo4j import (
+    add_friend, add_friends_bulk, query_friend_recommendations, query_friends_of, query_user_friends,
+    remove_friend_relation, remove_friends_bulk
+)
+from db.redis import RECS_PREFIX, RECS_READY_PREFIX, redis_db
+
+logger = logging.getLogger(__name__)
+
+# Ключей пользователей в одной команде DEL при пакетном сбросе
+INVALIDATE_CHUNK = 1000
+
+
+def _recs_key(user_id: str) -> str:
+    return f"{RECS_PREFIX}{user_id}"
+
+
+def _ready_key(user_id: str) -> str:
+    return f"{RECS_READY_PREFIX}{user_id}"
+
+
+def queue_read(pipe, user_id: str, limit: int):
+    """Команды чтения кеша; годится и для асинхронного pipeline"""
+    pipe.exists(_ready_key(user_id))
+    pipe.zrevrange(_recs_key(user_id), 0, limit - 1, withscores=True)
+
+
+def parse_read(results):
+    """Результат queue_read: список рекомендаций или None, если кеш холодный"""
+    ready, entries = results
+    if not ready:
+        return None
+    return [{"user_id": member.decode("utf-8"), "common_friends": int(score)} for member, score in entries]
+
+
+def _store(user_id: str, recommendations):
+    pipe = redis_db.pipeline()
+    pipe.delete(_recs_key(user_id))
+    if recommendations:
+        pipe.zadd(_recs_key(user_id), {r["user_id"]: r["common_friends"] for r in recommendations})
+        pipe.expire(_recs_key(user_id), RECS_CACHE_TTL)
+    pipe.set(_ready_key(user_id), 1, ex=RECS_CACHE_TTL)
+    pipe.execute()
+
+
+def invalidate(*user_ids):
+    redis_db.delete(*(key for uid in user_ids for key in (_ready_key(uid), _recs_key(uid))))
+
+
+
+def get_recommendations(user_id: str, limit: int = 5):
+    """Рекомендации из кеша; при холодном кеше - из Neo4j с заполнением кеша"""
+    pipe = redis_db.pipeline(transaction=False)
+    queue_read(pipe, user_id, limit)
+    cached = parse_read(pipe.execute())
+    if cached is not None:
+        return cached
+
+    try:
+        recommendations = query_friend_recommendations(user_id, limit=RECS_WARM_LIMIT)
+    except Exception:
+        logger.exception("Error computing friend recommendations for %s", user_id)
+        return []
+    _store(user_id, recommendations)
+    return recommendations[:limit]
+
+
+def _apply(deltas, removals=(), scores=None):
+    """Применяет изменения к ZSET-ам пользователей с теплым кешем.
+
+    deltas - {(owner, candidate): изменение счета}, removals - пары, которые
+    больше не кандидаты, scores - пары с заново посчитанным счетом.
+    """
+    scores = scores or {}
+    owners = list({owner for owner, _ in [*deltas, *removals, *scores]})
+    if not owners:
+        return
+    pipe = redis_db.pipeline(transaction=False)
+    for owner in owners:
+        pipe.exists(_ready_key(owner))
+    warm = {owner for owner, ready in zip(owners, pipe.execute()) if ready}
+    if not warm:
+        return
+
+    pipe = redis_db.pipeline(transaction=False)
+    for (owner, candidate), delta in deltas.items():
+        if owner in warm:
+            pipe.zincrby(_recs_key(owner), delta, candidate)
+    for owner, candidate in removals:
+        if owner in warm:
+            pipe.zrem(_recs_key(owner), candidate)
+    for (owner, candidate), score in scores.items():
+        if owner in warm:
+            pipe.zadd(_recs_key(owner), {candidate: score})
+    for owner in warm:
+        # Кандидаты без общих друзей больше не рекомендуются
+        pipe.zremrangebyscore(_recs_key(owner), "-inf", 0)
+        pipe.expire(_recs_key(owner), RECS_CACHE_TTL)
+    pipe.execute()
+
+
+def _friend_sets(user_id: str, friend_id: str):
+    try:
+        return set(query_user_friends(user_id)), set(query_user_friends(friend_id))
+    except Exception:
+        logger.exception("Error reading friends of %s and %s", user_id, friend_id)
+        return None, None
+
+
+def _fof_deltas(user_id, friend_id, friends_a, friends_b, delta):
+    """Изменения счетов, когда появляется или исчезает связь user_id - friend_id.
+
+    Друзья одной стороны, которые не дружат с другой, становятся (или
+    перестают быть) ее кандидатами через эту связь - и наоборот.
+    """
+    deltas = defaultdict(int)
+    for candidate in friends_b - friends_a - {user_id}:
+        deltas[(user_id, candidate)] += delta
+        deltas[(candidate, user_id)] += delta
+    for candidate in friends_a - friends_b - {friend_id}:
+        deltas[(friend_id, candidate)] += delta
+        deltas[(candidate, friend_id)] += delta
+    return deltas
+
+
+def add_friendship(user_id: str, friend_id: str) -> bool:
+    """Добавляет дружбу в Neo4j и обновляет кеш рекомендаций затронутых пользователей"""
+    friends_a, friends_b = _friend_sets(user_id, friend_id)
+    if not add_friend(user_id, friend_id):
+        return False
+    if friends_a is None:
+        invalidate(user_id, friend_id)
+    elif friend_id not in friends_a:
+        _apply(
+            _fof_deltas(user_id, friend_id, friends_a, friends_b, 1),
+            removals=[(user_id, friend_id), (friend_id, user_id)]
+        )
+    return True
+
+
+def remove_friendship(user_id: str, friend_id: str) -> bool:
+    """Удаляет дружбу в Neo4j и обновляет кеш рекомендаций затронутых пользователей"""
+    friends_a, friends_b = _friend_sets(user_id, friend_id)
+    if not remove_friend_relation(user_id, friend_id):
+        return False
+    if friends_a is None:
+        invalidate(user_id, friend_id)
+    elif friend_id in friends_a:
+        friends_a.discard(friend_id)
+        friends_b.discard(user_id)
+        # Бывшие друзья остаются кандидатами друг для друга, если есть общие друзья
+        common = len(friends_a & friends_b)
+        _apply(
+            _fof_deltas(user_id, friend_id, friends_a, friends_b, -1),
+            scores={(user_id, friend_id): common, (friend_id, user_id): common} if common else None
+        )
+    return True
+
+
+def _invalidate_around(results, changed_status: str):
+    """Сбрасывает кеш участников измененных пар и их друзей"""
+    users = {uid for r in results if r["status"] == changed_status for uid in (r["user_id"], r["friend_id"])}
+    if not users:
+        return
+    try:
+        users.update(query_friends_of(list(users)))
+    except Exception:
+        # Кеш друзей досчитается после RECS_CACHE_TTL
+        logger.exception("Error reading friends of %d users for cache invalidation", len(users))
+    users = list(users)
+    for start in range(0, len(users), INVALIDATE_CHUNK):
+        invalidate(*users[start:start + INVALIDATE_CHUNK])
+
+
+def add_friendships_bulk(pairs):
+    """Пакетное добавление дружбы (add_friends_bulk) со сбросом кеша рекомендаций"""
+    results = add_friends_bulk(pairs)
+    _invalidate_around(results, "added")
+    return results
+
+
+def remove_friendships_bulk(pairs):
+    """Пакетное удаление дружбы (remove_friends_bulk) со сбросом кеша рекомендаций"""
+    results = remove_friends_bulk(pairs)
+    _invalidate_around(results, "removed")
+    return results
@@ -1,14 +1,169 @@
+import json
+import logging
 import redis
-from config import REDIS_URI
+from redis.client import Pipeline
+from config import REDIS_URI, STATS_SCAN_BATCH
+from db.lifecycle import ForkSafeResource
+from metrics import datastore_timer
+
+logger = logging.getLogger(__name__)
+
+
+class InstrumentedRedis(redis.Redis):
+    """Redis-клиент, который учитывает команды и pipeline в метриках запроса"""
+
+    def execute_command(self, *args, **options):
+        with datastore_timer("redis"):
+            return super().execute_command(*args, **options)
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+class InstrumentedPipeline(Pipeline):
+    def execute(self, raise_on_error=True):
+        with datastore_timer("redis"):
+            return super().execute(raise_on_error)
+
+
+redis_db = ForkSafeResource("redis", lambda: InstrumentedRedis.from_url(REDIS_URI), lambda r: r.close())
+
+# Канал событий рабочей области (Redis pub/sub)
+WORKSPACE_EVENTS_PREFIX = "ws_events:"
+
+# Счетчики рабочей области хранятся в одном hash на рабочую область:
+# ws_stats:{workspace_id} -> {stat_name: value}
+WORKSPACE_STATS_PREFIX = "ws_stats:"
+
+# Ключи кешей в той же базе (db/task_cache.py, db/recommendations.py): это не счетчики
+TASKS_VERSION_PREFIX = "tasks_ver:"
+TASKS_DAY_PREFIX = "tasks_day:"
+RECS_PREFIX = "recs:"
+RECS_READY_PREFIX = "recs_ready:"
+NON_STAT_PREFIXES = (TASKS_VERSION_PREFIX, TASKS_DAY_PREFIX, RECS_PREFIX, RECS_READY_PREFIX)
+
+
+def ping():
+    redis_db.ping()
+
+
+def _workspace_stats_key(workspace_id: str) -> str:
+    return f"{WORKSPACE_STATS_PREFIX}{workspace_id}"
+
+
+def _split_workspace_key(key: str):
+    """Разбирает ключ вида ws:{workspace_id}:{stat_name}, иначе возвращает None"""
+    parts = key.split(':')
+    if len(parts) == 3 and parts[0] == 'ws' and parts[1] and parts[2]:
+        return parts[1], parts[2]
+    return None
 
-redis_db = redis.Redis.from_url(REDIS_URI)
 
 def increment_stat(key: str):
-    redis_db.incr(key)
+    workspace_key = _split_workspace_key(key)
+    if workspace_key:
+        workspace_id, stat_name = workspace_key
+        value = redis_db.hincrby(_workspace_stats_key(workspace_id), stat_name, 1)
+        publish_workspace_events(workspace_id, [{"type": "stat", "name": stat_name, "value": value}])
+    else:
+        redis_db.incr(key)
+
 
 def get_stat(key: str) -> int:
+    workspace_key = _split_workspace_key(key)
+    if workspace_key:
+        workspace_id, stat_name = workspace_key
+        return int(redis_db.hget(_workspace_stats_key(workspace_id), stat_name) or 0)
     return int(redis_db.get(key) or 0)
 
-def get_all_stats() -> dict:
-    keys = redis_db.keys('*')
-    return {k: redis_db.get(k) for k in keys}
+
+def get_workspace_stats(workspace_id: str) -> dict:
+    """Все счетчики рабочей области за один запрос (HGETALL)"""
+    stats = redis_db.hgetall(_workspace_stats_key(workspace_id))
+    return {k.decode('utf-8'): int(v) for k, v in stats.items()}
+
+
+def _scan_batches(batch_size: int, match=None, key_type=None):
+    """Пачки ключей SCAN с фильтром по шаблону и типу (фильтрует сам Redis)"""
+    cursor = 0
+    while True:
+        cursor, keys = redis_db.scan(cursor=cursor, match=match, count=batch_size, _type=key_type)
+        if keys:
+            yield keys
+        if cursor == 0:
+            break
+
+
+def iter_all_stats(batch_size: int = STATS_SCAN_BATCH):
+    """Обходит все счетчики пачками через SCAN, значения читаются pipeline-ом.
+
+    Возвращает пары (key, value); счетчики рабочих областей разворачиваются
+    в прежний формат ключей ws:{workspace_id}:{stat_name}. Строковые ключи
+    кешей (NON_STAT_PREFIXES) счетчиками не считаются.
+    """
+    for keys in _scan_batches(batch_size, match=f"{WORKSPACE_STATS_PREFIX}*", key_type="hash"):
+        pipe = redis_db.pipeline(transaction=False)
+        for key in keys:
+            pipe.hgetall(key)
+        for key, value in zip(keys, pipe.execute()):
+            workspace_id = key.decode('utf-8')[len(WORKSPACE_STATS_PREFIX):]
+            for stat_name, stat_value in value.items():
+                yield f"ws:{workspace_id}:{stat_name.decode('utf-8')}", int(stat_value)
+
+    for keys in _scan_batches(batch_size, key_type="string"):
+        keys = [key.decode('utf-8') for key in keys]
+        keys = [key for key in keys if not key.startswith(NON_STAT_PREFIXES)]
+        if not keys:
+            continue
+        for key, value in zip(keys, redis_db.mget(keys)):
+            if value is None:
+                continue
+            try:
+                yield key, int(value)
+            except ValueError:
+                continue
+
+
+# Перенос счетчика одной командой: между чтением и удалением старого ключа
+# не вклинится ни INCR другого клиента, ни обрыв соединения
+_MOVE_LEGACY_STAT = """
+local value = redis.call('GET', KEYS[1])
+if not value then
+    return nil
+end
+redis.call('HINCRBY', KEYS[2], ARGV[1], value)
+redis.call('DEL', KEYS[1])
+return value
+"""
+
+
+def migrate_legacy_workspace_stats(batch_size: int = STATS_SCAN_BATCH) -> int:
+    """Переносит старые строковые ключи ws:{id}:{stat} в hash-и рабочих областей"""
+    move = redis_db.register_script(_MOVE_LEGACY_STAT)
+    migrated = 0
+    for key in redis_db.scan_iter(match="ws:*:*", count=batch_size):
+        workspace_key = _split_workspace_key(key.decode('utf-8'))
+        if not workspace_key:
+            continue
+        workspace_id, stat_name = workspace_key
+        if move(keys=[key, _workspace_stats_key(workspace_id)], args=[stat_name]) is not None:
+            migrated += 1
+    return migrated
+
+
+def publish_workspace_events(workspace_id: str, events: list):
+    """Публикует изменения рабочей области подписчикам (одним pipeline)"""
+    try:
+        pipe = redis_db.pipeline(transaction=False)
+        for event in events:
+            pipe.publish(f"{WORKSPACE_EVENTS_PREFIX}{workspace_id}", json.dumps(event))
+        pipe.execute()
+    except redis.RedisError:
+        logger.exception("Error publishing workspace events for %s", workspace_id)
+
+
+def subscribe_workspace_events(workspace_id: str):
+    """Подписка на события рабочей области; вызывающий закрывает ее через close()"""
+    pubsub = redis_db.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(f"{WORKSPACE_EVENTS_PREFIX}{workspace_id}")
+    return pubsub
@@ -0,0 +1,130 @@
+"""Асинхронный доступ к Redis (redis.asyncio) для asgi.py; пул создается в init()"""
+import json
+import logging
+from typing import Optional
+
+import redis
+import redis.asyncio as aioredis
+from redis.asyncio.client import Pipeline
+
+from config import REDIS_URI, REDIS_MAX_CONNECTIONS, TASKS_CACHE_TTL
+from db import task_cache
+from db.recommendations import parse_read, queue_read
+from db.redis import WORKSPACE_EVENTS_PREFIX, _split_workspace_key, _workspace_stats_key
+from metrics import datastore_timer
+
+logger = logging.getLogger(__name__)
+
+
+class InstrumentedRedis(aioredis.Redis):
+    """Как db.redis.InstrumentedRedis: команды и pipeline учитываются в метриках запроса"""
+
+    async def execute_command(self, *args, **options):
+        with datastore_timer("redis"):
+            return await super().execute_command(*args, **options)
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+class InstrumentedPipeline(Pipeline):
+    async def execute(self, raise_on_error=True):
+        with datastore_timer("redis"):
+            return await super().execute(raise_on_error)
+
+_redis: Optional[aioredis.Redis] = None
+
+
+async def init():
+    global _redis
+    if _redis is None:
+        _redis = InstrumentedRedis.from_url(REDIS_URI, max_connections=REDIS_MAX_CONNECTIONS)
+
+
+async def close():
+    global _redis
+    if _redis is not None:
+        await _redis.connection_pool.disconnect()
+        _redis = None
+
+
+def _db() -> aioredis.Redis:
+    if _redis is None:
+        raise RuntimeError("redis_async.init() was not called")
+    return _redis
+
+
+async def increment_stat(key: str):
+    workspace_key = _split_workspace_key(key)
+    if workspace_key:
+        workspace_id, stat_name = workspace_key
+        value = await _db().hincrby(_workspace_stats_key(workspace_id), stat_name, 1)
+        await publish_workspace_events(workspace_id, [{"type": "stat", "name": stat_name, "value": value}])
+    else:
+        await _db().incr(key)
+
+
+async def get_workspace_stats(workspace_id: str) -> dict:
+    stats = await _db().hgetall(_workspace_stats_key(workspace_id))
+    return {k.decode('utf-8'): int(v) for k, v in stats.items()}
+
+
+async def publish_workspace_events(workspace_id: str, events: list):
+    try:
+        async with _db().pipeline(transaction=False) as pipe:
+            for event in events:
+                pipe.publish(f"{WORKSPACE_EVENTS_PREFIX}{workspace_id}", json.dumps(event))
+            await pipe.execute()
+    except redis.RedisError:
+        logger.exception("Error publishing workspace events for %s", workspace_id)
+
+
+async def subscribe_workspace_events(workspace_id: str):
+    """Подписка на события рабочей области; вызывающий закрывает ее через reset()"""
+    pubsub = _db().pubsub(ignore_subscribe_messages=True)
+    await pubsub.subscribe(f"{WORKSPACE_EVENTS_PREFIX}{workspace_id}")
+    return pubsub
+
+
+async def get_cached_recommendations(user_id: str, limit: int = 5):
+    """Рекомендации из кеша db/recommendations.py или None, если кеш холодный"""
+    async with _db().pipeline(transaction=False) as pipe:
+        queue_read(pipe, user_id, limit)
+        return parse_read(await pipe.execute())
+
+
+async def get_day_tasks(workspace_id: str, date: str, load):
+    """То же, что db.task_cache.get_day_tasks; load - корутина чтения из MongoDB"""
+    local = task_cache.local_entry(workspace_id, date)
+    try:
+        async with _db().pipeline(transaction=False) as pipe:
+            task_cache.queue_version(pipe, workspace_id)
+            if local is None:
+                pipe.get(task_cache.day_key(workspace_id, date))
+            results = await pipe.execute()
+        version = int(results[1])
+        if local is not None and local[0] == version:
+            return local[1]
+        raw = results[2] if local is None else await _db().get(task_cache.day_key(workspace_id, date))
+        tasks = task_cache.decode(raw, version)
+    except redis.RedisError:
+        logger.exception("Error reading task cache for %s/%s", workspace_id, date)
+        return await load()
+
+    if tasks is None:
+        tasks = await load()
+        if not task_cache.cacheable(tasks):
+            return tasks
+        try:
+            await _db().set(task_cache.day_key(workspace_id, date), task_cache.encode(version, tasks), ex=TASKS_CACHE_TTL)
+        except redis.RedisError:
+            logger.exception("Error writing task cache for %s/%s", workspace_id, date)
+    task_cache.remember(workspace_id, date, version, tasks)
+    return tasks
+
+
+async def bump_tasks_version(workspace_id: str):
+    try:
+        await _db().incr(task_cache.version_key(workspace_id))
+    except redis.RedisError:
+        logger.exception("Error bumping task cache version for %s", workspace_id)
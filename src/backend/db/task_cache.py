@@ -0,0 +1,128 @@
+"""Кеш задач рабочей области за день (GET /workspaces/<id>/tasks?date=).
+
+Два уровня: LRU в памяти процесса и общий для всех процессов Redis
+(tasks_day:{workspace_id}:{date}). Каждая запись хранит версию рабочей
+области tasks_ver:{workspace_id}, при которой она прочитана из MongoDB.
+Любое изменение задач (db/mongo.py, db/mongo_async.py) увеличивает версию,
+и записи со старой версией больше не отдаются - ни в этом процессе, ни в
+других. Поэтому каждое чтение стоит одного обращения к Redis за версией;
+на промахе локального уровня в том же pipeline читается и запись Redis.
+
+Версия читается до запроса к MongoDB: если задачи изменились во время
+чтения, запись сохранится со старой версией и не будет использована.
+Пропавший ключ версии инициализируется текущим временем в наносекундах,
+а не нулем, чтобы не совпасть с версией старых записей.
+"""
+import json
+import logging
+import time
+
+from config import TASKS_CACHE_LOCAL_SIZE, TASKS_CACHE_MAX_TASKS, TASKS_CACHE_TTL
+from db.cache import MISSING, LRUCache
+from db.redis import TASKS_DAY_PREFIX, TASKS_VERSION_PREFIX, redis_db
+
+logger = logging.getLogger(__name__)
+
+# (workspace_id, date) -> (версия, срок годности по time.monotonic(), задачи)
+local_cache = LRUCache(max_size=TASKS_CACHE_LOCAL_SIZE)
+
+
+def version_key(workspace_id: str) -> str:
+    return f"{TASKS_VERSION_PREFIX}{workspace_id}"
+
+
+def day_key(workspace_id: str, date: str) -> str:
+    return f"{TASKS_DAY_PREFIX}{workspace_id}:{date}"
+
+
+def local_entry(workspace_id: str, date: str):
+    """Локальная запись (версия, задачи) или None"""
+    entry = local_cache.get((workspace_id, date))
+    if entry is MISSING or entry[1] <= time.monotonic():
+        return None
+    return entry[0], entry[2]
+
+
+def remember(workspace_id: str, date: str, version: int, tasks):
+    local_cache.set((workspace_id, date), (version, time.monotonic() + TASKS_CACHE_TTL, tasks))
+
+
+def queue_version(pipe, workspace_id: str):
+    """Команды чтения версии; годится и для асинхронного pipeline. Результат - последний"""
+    pipe.set(version_key(workspace_id), time.time_ns(), nx=True)
+    pipe.get(version_key(workspace_id))
+
+
+def encode(version: int, tasks) -> str:
+    return json.dumps({"version": version, "tasks": tasks})
+
+
+def decode(raw, version: int):
+    """Задачи из записи Redis, если она соответствует версии, иначе None"""
+    if raw is None:
+        return None
+    entry = json.loads(raw)
+    return entry["tasks"] if entry["version"] == version else None
+
+
+def cacheable(tasks) -> bool:
+    return len(tasks) <= TASKS_CACHE_MAX_TASKS
+
+
+def get_day_tasks(workspace_id: str, date: str, load):
+    """Все задачи рабочей области за день (поля TASK_FIELDS, порядок TASK_SORT).
+
+    load() читает их из MongoDB на промахе. При недоступности Redis
+    кеш пропускается.
+    """
+    local = local_entry(workspace_id, date)
+    try:
+        pipe = redis_db.pipeline(transaction=False)
+        queue_version(pipe, workspace_id)
+        if local is None:
+            pipe.get(day_key(workspace_id, date))
+        results = pipe.execute()
+        version = int(results[1])
+        if local is not None and local[0] == version:
+            return local[1]
+        raw = results[2] if local is None else redis_db.get(day_key(workspace_id, date))
+        tasks = decode(raw, version)
+    except Exception:
+        logger.exception("Error reading task cache for %s/%s", workspace_id, date)
+        return load()
+
+    if tasks is None:
+        tasks = load()
+        if not cacheable(tasks):
+            return tasks
+        try:
+            redis_db.set(day_key(workspace_id, date), encode(version, tasks), ex=TASKS_CACHE_TTL)
+        except Exception:
+            logger.exception("Error writing task cache for %s/%s", workspace_id, date)
+    remember(workspace_id, date, version, tasks)
+    return tasks
+
+
+def bump_version(workspace_id: str):
+    """Делает недействительными закешированные дни рабочей области во всех процессах"""
+    try:
+        redis_db.incr(version_key(workspace_id))
+    except Exception:
+        # Устаревшие записи проживут не дольше TASKS_CACHE_TTL
+        logger.exception("Error bumping task cache version for %s", workspace_id)
+
+
+def select_tasks(tasks, is_done, fields, limit=None, after=None):
+    """Выборка из задач дня так же, как find_tasks выбирает из MongoDB"""
+    if after:
+        after = (after[0], after[1].lower())
+    result = []
+    for task in tasks:
+        if is_done is not None and task["is_done"] != is_done:
+            continue
+        if after and (task["date"], task["task_id"]) <= after:
+            continue
+        result.append({"task_id": task["task_id"], **{field: task[field] for field in fields}})
+        if limit and len(result) == limit:
+            break
+    return result
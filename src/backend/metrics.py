@@ -0,0 +1,168 @@
+"""Метрики запросов в формате Prometheus.
+
+Для каждого запроса считается время ответа по маршруту и число обращений
+к MongoDB, Redis и Neo4j с временем в каждой базе. Обращения к базам
+отмечают сами модули db/* через record_datastore_call() и datastore_timer().
+Медленные запросы пишутся в лог с разбивкой по базам. Замеры подключаются
+к Flask-приложению (init_metrics) и к Quart-приложению asgi.py (init_async_metrics).
+
+Под gunicorn с несколькими процессами задайте PROMETHEUS_MULTIPROC_DIR:
+/metrics тогда суммирует значения всех рабочих процессов.
+"""
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram,
+    generate_latest, multiprocess
+)
+
+from config import SLOW_REQUEST_MS
+
+STORES = ("mongo", "redis", "neo4j")
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Время обработки запроса",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+REQUEST_DATASTORE_SECONDS = Histogram(
+    "http_request_datastore_seconds", "Время запроса, проведенное в базе",
+    ["route", "store"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+)
+DATASTORE_CALLS = Counter("datastore_calls_total", "Обращения к базам", ["store", "route"])
+DATASTORE_ERRORS = Counter("datastore_errors_total", "Ошибки обращений к базам", ["store", "route"])
+DATASTORE_SECONDS = Counter("datastore_seconds_total", "Суммарное время в базах", ["store", "route"])
+
+slow_log = logging.getLogger("todo.slow_requests")
+
+# Обращения к базам текущего запроса: {"route": ..., "stores": {store: [calls, seconds]}}
+_current = ContextVar("datastore_breakdown", default=None)
+
+
+def record_datastore_call(store: str, seconds: float, failed: bool = False):
+    breakdown = _current.get()
+    route = breakdown["route"] if breakdown else "-"
+    DATASTORE_CALLS.labels(store, route).inc()
+    DATASTORE_SECONDS.labels(store, route).inc(seconds)
+    if failed:
+        DATASTORE_ERRORS.labels(store, route).inc()
+    if breakdown is not None:
+        entry = breakdown["stores"].setdefault(store, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+
+@contextmanager
+def datastore_timer(store: str):
+    started = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except Exception:
+        failed = True
+        raise
+    finally:
+        record_datastore_call(store, time.perf_counter() - started, failed)
+
+
+def _route(req):
+    return req.url_rule.rule if req.url_rule else "<unmatched>"
+
+
+def _start(req):
+    """Начало запроса: время старта и токен контекста обращений к базам"""
+    return time.perf_counter(), _current.set({"route": _route(req), "stores": {}})
+
+
+def _observe(req, response, started):
+    elapsed = time.perf_counter() - started
+    route = _route(req)
+    REQUEST_SECONDS.labels(req.method, route, str(response.status_code)).observe(elapsed)
+
+    breakdown = _current.get()
+    stores = breakdown["stores"] if breakdown else {}
+    for store, (_, seconds) in stores.items():
+        REQUEST_DATASTORE_SECONDS.labels(route, store).observe(seconds)
+
+    if elapsed * 1000 >= SLOW_REQUEST_MS:
+        details = " ".join(
+            f"{store}={calls}x/{seconds * 1000:.1f}ms" for store, (calls, seconds) in sorted(stores.items())
+        )
+        slow_log.warning(
+            "%s %s -> %s in %.1fms [%s]",
+            req.method, req.full_path.rstrip("?"), response.status_code, elapsed * 1000,
+            details or "no datastore calls"
+        )
+
+
+def _before_request():
+    g.metrics_started, g.metrics_token = _start(request)
+
+
+def _after_request(response):
+    started = g.pop("metrics_started", None)
+    if started is not None:
+        _observe(request, response, started)
+    return response
+
+
+def _teardown_request(exc):
+    token = g.pop("metrics_token", None)
+    if token is not None:
+        _current.reset(token)
+
+
+def metrics_view():
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+
+def init_metrics(app):
+    """Подключает замеры запросов и маршрут /metrics к Flask-приложению"""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view, methods=['GET'])
+
+
+def init_async_metrics(app):
+    """Те же замеры для Quart-приложения (asgi.py); /metrics отдает Flask-приложение.
+
+    Обработчики асинхронные: синхронные Quart выполняет в отдельном потоке,
+    и контекст обращений к базам не дошел бы до маршрута.
+    """
+    from quart import g as quart_g, request as quart_request
+
+    async def before_request():
+        quart_g.metrics_started, quart_g.metrics_token = _start(quart_request)
+
+    async def after_request(response):
+        started = quart_g.pop("metrics_started", None)
+        if started is not None:
+            _observe(quart_request, response, started)
+        return response
+
+    async def teardown_request(exc):
+        token = quart_g.pop("metrics_token", None)
+        if token is not None:
+            _current.reset(token)
+
+    app.before_request(before_request)
+    app.after_request(after_request)
+    app.teardown_request(teardown_request)
+
+
+def worker_exit(pid: int):
+    """Отмечает завершенный рабочий процесс в multiprocess-режиме"""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(pid)
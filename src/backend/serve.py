@@ -0,0 +1,98 @@
+"""Production-запуск API: gunicorn с несколькими процессами и потоками.
+
+Приложение загружается один раз в главном процессе (preload), клиенты баз
+создаются лениво уже в рабочих процессах (db/lifecycle.py). При остановке
+(SIGTERM) процессы дожидаются текущих запросов до graceful_timeout и
+закрывают соединения с базами.
+
+В режиме gthread каждый поток событий (SSE) занимает поток сервера, поэтому
+их число на процесс ограничено EVENTS_WSGI_MAX_STREAMS (сверх него - 503).
+Развертывания, где поток событий нужен многим клиентам, запускаются с --asgi.
+
+Запуск из src/backend:
+    python serve.py --workers 4 --threads 8
+    python serve.py --asgi          # asgi.py на рабочих процессах uvicorn
+"""
+import argparse
+
+from gunicorn.app.base import BaseApplication
+
+from config import (
+    SERVER_BIND, SERVER_WORKERS, SERVER_THREADS, SERVER_TIMEOUT,
+    SERVER_GRACEFUL_TIMEOUT, SERVER_KEEPALIVE
+)
+from db.lifecycle import close_all
+import metrics
+
+
+def on_starting(server):
+    """Миграции, индексы и схема Neo4j - один раз до запуска рабочих процессов"""
+    from db.indexes import ensure_indexes
+    from db.mongo import migrate_workspace_roles
+    from db.neo4j import ensure_schema, migrate_directed_friendships
+    from db.redis import migrate_legacy_workspace_stats
+
+    migrate_legacy_workspace_stats()
+    migrate_workspace_roles()
+    ensure_indexes()
+    ensure_schema()
+    migrate_directed_friendships()
+    # Рабочие процессы откроют свои соединения
+    close_all()
+
+
+def worker_exit(server, worker):
+    close_all()
+    metrics.worker_exit(worker.pid)
+
+
+class ApiServer(BaseApplication):
+    def __init__(self, options, asgi=False):
+        self.options = options
+        self.asgi = asgi
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        if self.asgi:
+            from asgi import application
+            return application
+        from app import app
+        return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bind", default=SERVER_BIND)
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS)
+    parser.add_argument("--threads", type=int, default=SERVER_THREADS)
+    parser.add_argument("--timeout", type=int, default=SERVER_TIMEOUT)
+    parser.add_argument("--graceful-timeout", type=int, default=SERVER_GRACEFUL_TIMEOUT)
+    parser.add_argument("--asgi", action="store_true", help="обслуживать asgi.py через uvicorn worker")
+    args = parser.parse_args()
+
+    options = {
+        "bind": args.bind,
+        "workers": args.workers,
+        "timeout": args.timeout,
+        "graceful_timeout": args.graceful_timeout,
+        "keepalive": SERVER_KEEPALIVE,
+        "preload_app": True,
+        "on_starting": on_starting,
+        "worker_exit": worker_exit,
+    }
+    if args.asgi:
+        # Пулы асинхронных драйверов открываются и закрываются через lifespan
+        options["worker_class"] = "uvicorn.workers.UvicornWorker"
+    else:
+        options["worker_class"] = "gthread"
+        options["threads"] = args.threads
+
+    ApiServer(options, asgi=args.asgi).run()
+
+
+if __name__ == "__main__":
+    main()
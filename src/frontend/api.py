@@ -1,43 +1,88 @@
+import json
 import requests
-from config import BASE_URL
+from config import (
+    BASE_URL, CONNECT_TIMEOUT, READ_TIMEOUT, HTTP_RETRIES, HTTP_BACKOFF, HTTP_POOL_SIZE,
+    USERS_CACHE_TTL, MEMBERS_CACHE_TTL, FRIENDS_CACHE_TTL, EVENTS_READ_TIMEOUT
+)
+from http_client import ApiClient
+
+# Общий клиент для всех запросов к бэкенду
+client = ApiClient(
+    BASE_URL,
+    connect_timeout=CONNECT_TIMEOUT,
+    read_timeout=READ_TIMEOUT,
+    retries=HTTP_RETRIES,
+    backoff_factor=HTTP_BACKOFF,
+    pool_size=HTTP_POOL_SIZE,
+)
 
 def create_user(username):
     """Получаем или создаем пользователя по имени"""
     try:
-        response = requests.post(
-            f"{BASE_URL}/register",
+        response = client.post(
+            "/register",
             json={"username": username}
         )
+        if response.status_code == 201:
+            client.invalidate("/users")
         return response.json() if response.ok else None
     except requests.exceptions.RequestException as e:
         print(f"User error: {e}")
         return None
     
 def get_all_users():
-    """Получение всех пользователей из API"""
+    """Все пользователи потоком NDJSON - для выгрузки списка целиком.
+
+    Интерфейс читает пользователей страницами через search_users.
+    """
     try:
-        response = requests.get(f"{BASE_URL}/users")
-        if response.ok:
-            # Преобразуем данные в нужный формат
-            users = response.json()
-            if isinstance(users, list):
-                return users
-            elif isinstance(users, dict) and 'users' in users:
-                return users['users']
-            return []
-        return None
-    except requests.exceptions.RequestException as e:
+        return client.get_cached(
+            "/users", USERS_CACHE_TTL, params={"stream": 1},
+            parse=lambda response: [json.loads(line) for line in response.iter_lines() if line]
+        )
+    except (requests.exceptions.RequestException, ValueError) as e:
         print(f"User error: {e}")
         return None
 
 
+def search_users(prefix=None, cursor=None, limit=100):
+    """Страница пользователей по префиксу имени; возвращает (users, next_cursor)"""
+    params = {"limit": limit}
+    if prefix:
+        params["prefix"] = prefix
+    if cursor:
+        params["cursor"] = cursor
+    try:
+        data = client.get_cached("/users", USERS_CACHE_TTL, params=params)
+        if data is not None:
+            return data.get('users', []), data.get('next_cursor')
+        return None, None
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"User error: {e}")
+        return None, None
+
+
+def find_user_by_username(username):
+    """Поиск пользователя по точному имени через префиксный поиск"""
+    users, _ = search_users(prefix=username, limit=10)
+    return next((u for u in users or [] if u['username'] == username), None)
+
+
+def _invalidate_friends(*user_ids):
+    """Сбрасывает кеш друзей и рекомендаций пользователей"""
+    for user_id in user_ids:
+        client.invalidate(f"/friends/{user_id}")
+
+
 def add_friend_api(user_id, friend_id):
     """Добавление друга через API"""
     try:
-        response = requests.post(
-            f"{BASE_URL}/friends",
+        response = client.post(
+            "/friends",
             json={"user_id": user_id, "friend_id": friend_id}
         )
+        if response.ok:
+            _invalidate_friends(user_id, friend_id)
         return response.ok
     except requests.exceptions.RequestException as e:
         print(f"Add friend error: {e}")
@@ -47,8 +92,8 @@ def add_friend_api(user_id, friend_id):
 def get_tasks(username, date):
     """Получение задач пользователя на конкретную дату"""
     try:
-        response = requests.get(
-            f"{BASE_URL}/tasks",
+        response = client.get(
+            "/tasks",
             params={"username": username, "date": date}
         )
         return response.json() if response.ok else {}
@@ -59,8 +104,8 @@ def get_tasks(username, date):
 def add_task(username, date, text):
     """Добавление новой задачи"""
     try:
-        response = requests.post(
-            f"{BASE_URL}/tasks",
+        response = client.post(
+            "/tasks",
             json={"username": username, "date": date, "text": text}
         )
         return response.ok
@@ -71,8 +116,8 @@ def add_task(username, date, text):
 def update_task(task_id, status):
     """Обновление статуса задачи"""
     try:
-        response = requests.put(
-            f"{BASE_URL}/tasks/{task_id}",
+        response = client.put(
+            f"/tasks/{task_id}",
             json={"status": status}
         )
         return response.ok
@@ -83,7 +128,7 @@ def update_task(task_id, status):
 def delete_task(task_id):
     """Удаление задачи"""
     try:
-        response = requests.delete(f"{BASE_URL}/tasks/{task_id}")
+        response = client.delete(f"/tasks/{task_id}")
         return response.ok
     except requests.exceptions.RequestException as e:
         print(f"Delete task error: {e}")
@@ -93,26 +138,23 @@ def delete_task(task_id):
 def get_friends_api(user_id: str):
     """Получение списка друзей пользователя"""
     try:
-        response = requests.get(
-            f"{BASE_URL}/friends/{user_id}"
-        )
-        if response.ok:
-            return response.json()
-        return None
-    except requests.exceptions.RequestException as e:
+        return client.get_cached(f"/friends/{user_id}", FRIENDS_CACHE_TTL)
+    except (requests.exceptions.RequestException, ValueError) as e:
         print(f"Get friends error: {e}")
         return None
 
 def remove_friend_api(user_id: str, friend_id: str) -> bool:
     """Удаление друга"""
     try:
-        response = requests.delete(
-            f"{BASE_URL}/friends",
+        response = client.delete(
+            "/friends",
             json={
                 "user_id": user_id,
                 "friend_id": friend_id
             }
         )
+        if response.ok:
+            _invalidate_friends(user_id, friend_id)
         return response.ok
     except requests.exceptions.RequestException as e:
         print(f"Remove friend error: {e}")
@@ -122,15 +164,9 @@ def remove_friend_api(user_id: str, friend_id: str) -> bool:
 def get_friend_recommendations_api(user_id: str):
     """Получение рекомендаций друзей с бэкенда"""
     try:
-        response = requests.get(
-            f"{BASE_URL}/friends/{user_id}/recommendations"
-        )
-        if response.ok:
-            data = response.json()
-            # Дополняем данные из MongoDB если нужно
-            return data.get('recommendations', [])
-        return None
-    except requests.exceptions.RequestException as e:
+        data = client.get_cached(f"/friends/{user_id}/recommendations", FRIENDS_CACHE_TTL)
+        return data.get('recommendations', []) if data is not None else None
+    except (requests.exceptions.RequestException, ValueError) as e:
         print(f"Get recommendations error: {e}")
         return None
 
@@ -138,8 +174,8 @@ def increment_workspace_stat(workspace_id: str, stat_name: str):
     """Увеличивает счетчик статистики для рабочей области"""
     key = f"ws:{workspace_id}:{stat_name}"
     try:
-        response = requests.post(
-            f"{BASE_URL}/stats/increment",
+        response = client.post(
+            "/stats/increment",
             json={"key": key}
         )
         return response.status_code == 200
@@ -149,11 +185,203 @@ def increment_workspace_stat(workspace_id: str, stat_name: str):
 def get_workspace_stats(workspace_id: str) -> dict:
     """Получает статистику для рабочей области"""
     try:
-        response = requests.get(
-            f"{BASE_URL}/stats/workspace/{workspace_id}"
+        response = client.get(
+            f"/stats/workspace/{workspace_id}"
         )
         if response.status_code == 200:
             return response.json()
         return {}
     except Exception:
-        return {}
\ No newline at end of file
+        return {}
+
+def create_tasks_batch(workspace_id: str, user_id: str, tasks: list):
+    """Пакетное создание задач; tasks - список {"text", "date"}. Возвращает результаты по элементам"""
+    try:
+        response = client.post(
+            f"/workspaces/{workspace_id}/tasks:batch",
+            json={"user_id": user_id, "tasks": tasks}
+        )
+        return response.json().get('results', []) if response.ok else None
+    except requests.exceptions.RequestException as e:
+        print(f"Batch create error: {e}")
+        return None
+
+def update_tasks_batch(workspace_id: str, user_id: str, updates: list):
+    """Пакетное изменение статуса; updates - список {"task_id", "is_done"}"""
+    try:
+        response = client.put(
+            f"/workspaces/{workspace_id}/tasks:batch",
+            json={"user_id": user_id, "updates": updates}
+        )
+        return response.json().get('results', []) if response.ok else None
+    except requests.exceptions.RequestException as e:
+        print(f"Batch update error: {e}")
+        return None
+
+def delete_tasks_batch(workspace_id: str, user_id: str, task_ids: list):
+    """Пакетное удаление задач"""
+    try:
+        response = client.delete(
+            f"/workspaces/{workspace_id}/tasks:batch",
+            json={"user_id": user_id, "task_ids": task_ids}
+        )
+        return response.json().get('results', []) if response.ok else None
+    except requests.exceptions.RequestException as e:
+        print(f"Batch delete error: {e}")
+        return None
+
+
+def get_workspace_tasks(workspace_id: str, date_from: str, date_to: str = None, is_done=None,
+                        fields=None, limit=None, cursor=None):
+    """Задачи рабочей области за дату или диапазон дат с фильтрацией на сервере"""
+    params = {"from": date_from, "to": date_to or date_from}
+    if is_done is not None:
+        params["is_done"] = "true" if is_done else "false"
+    if fields:
+        params["fields"] = ",".join(fields)
+    if limit:
+        params["limit"] = limit
+    if cursor:
+        params["cursor"] = cursor
+    try:
+        response = client.get(f"/workspaces/{workspace_id}/tasks", params=params)
+        return response.json() if response.ok else None
+    except requests.exceptions.RequestException as e:
+        print(f"Get tasks error: {e}")
+        return None
+
+
+def get_workspace_dashboard(workspace_id: str, user_id: str, date: str, is_done=None, fields=None):
+    """Задачи за дату, участники, роль пользователя и статистика рабочей области одним запросом"""
+    params = {"date": date, "user_id": user_id}
+    if is_done is not None:
+        params["is_done"] = "true" if is_done else "false"
+    if fields:
+        params["fields"] = ",".join(fields)
+    try:
+        response = client.get(f"/workspaces/{workspace_id}/dashboard", params=params)
+        return response.json() if response.ok else None
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"Get dashboard error: {e}")
+        return None
+
+def get_user_workspaces_api(user_id: str):
+    """Рабочие области пользователя"""
+    try:
+        response = client.get(f"/users/{user_id}/workspaces")
+        return response.json().get('workspaces', []) if response.ok else None
+    except requests.exceptions.RequestException as e:
+        print(f"Get workspaces error: {e}")
+        return None
+
+def create_workspace_api(name: str, user_id: str) -> bool:
+    """Создание рабочей области"""
+    try:
+        response = client.post(
+            "/workspaces",
+            json={"name": name, "user_id": user_id}
+        )
+        return response.status_code == 201
+    except requests.exceptions.RequestException as e:
+        print(f"Create workspace error: {e}")
+        return False
+
+def get_workspace_members_api(workspace_id: str):
+    """Участники рабочей области с именами и ролями"""
+    try:
+        data = client.get_cached(f"/workspaces/{workspace_id}/members", MEMBERS_CACHE_TTL)
+        return data.get('members', []) if data is not None else None
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"Get members error: {e}")
+        return None
+
+def add_workspace_member_api(workspace_id: str, admin_id: str, user_id: str, role: str) -> bool:
+    """Добавление участника в рабочую область"""
+    try:
+        response = client.post(
+            f"/workspaces/{workspace_id}/members",
+            json={"admin_id": admin_id, "user_id": user_id, "role": role}
+        )
+        if response.ok:
+            client.invalidate(f"/workspaces/{workspace_id}/members")
+        return response.ok
+    except requests.exceptions.RequestException as e:
+        print(f"Add member error: {e}")
+        return False
+
+def remove_workspace_member_api(workspace_id: str, requester_id: str, target_id: str):
+    """Удаление участника; возвращает (успех, текст ошибки)"""
+    try:
+        response = client.delete(
+            f"/workspaces/{workspace_id}/members",
+            json={"requester_id": requester_id, "target_id": target_id}
+        )
+        if response.ok:
+            client.invalidate(f"/workspaces/{workspace_id}/members")
+            return True, None
+        return False, response.json().get('error', 'Неизвестная ошибка')
+    except (requests.exceptions.RequestException, ValueError) as e:
+        return False, f"Ошибка соединения: {e}"
+
+def invalidate_workspace_members(workspace_id: str):
+    """Сбрасывает кеш участников после изменения, пришедшего из потока событий"""
+    client.invalidate(f"/workspaces/{workspace_id}/members")
+
+def create_task_api(workspace_id: str, user_id: str, text: str, date: str):
+    """Создание задачи в рабочей области; возвращает id новой задачи или None"""
+    try:
+        response = client.post(
+            f"/workspaces/{workspace_id}/tasks",
+            json={"user_id": user_id, "text": text, "date": date}
+        )
+        return response.json().get('task_id') if response.status_code == 201 else None
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"Create task error: {e}")
+        return None
+
+def update_task_status_api(workspace_id: str, task_id: str, user_id: str, is_done: bool):
+    """Изменение статуса задачи; возвращает задачу в новом состоянии или None"""
+    try:
+        response = client.put(
+            f"/workspaces/{workspace_id}/tasks/{task_id}",
+            json={"user_id": user_id, "is_done": is_done}
+        )
+        return response.json().get('task') if response.ok else None
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"Update task error: {e}")
+        return None
+
+def delete_task_api(workspace_id: str, task_id: str, user_id: str):
+    """Удаление задачи; возвращает (успех, текст ошибки)"""
+    try:
+        response = client.delete(
+            f"/workspaces/{workspace_id}/tasks/{task_id}",
+            json={"user_id": user_id}
+        )
+        if response.ok:
+            return True, None
+        return False, response.json().get('error', 'Не удалось удалить задачу')
+    except (requests.exceptions.RequestException, ValueError) as e:
+        return False, f"Ошибка соединения: {e}"
+
+
+def open_workspace_events(workspace_id: str):
+    """Открывает поток событий рабочей области (SSE); ответ читается построчно"""
+    response = client.get(
+        f"/workspaces/{workspace_id}/events",
+        stream=True,
+        timeout=(CONNECT_TIMEOUT, EVENTS_READ_TIMEOUT),
+        headers={"Accept": "text/event-stream"}
+    )
+    response.encoding = "utf-8"
+    return response
+
+
+def get_latency_stats():
+    """Счетчики задержек клиента по маршрутам API"""
+    return client.latency_stats()
+
+
+def get_cache_stats():
+    """Счетчики кеша ответов: попадания, подтверждения через 304 и промахи"""
+    return client.cache_stats()
@@ -1 +1,25 @@
-BASE_URL = "http://localhost:5000"
\ No newline at end of file
+BASE_URL = "http://localhost:5000"
+
+# HTTP-клиент
+CONNECT_TIMEOUT = 3.05  # секунд
+READ_TIMEOUT = 10
+HTTP_RETRIES = 3
+HTTP_BACKOFF = 0.3
+HTTP_POOL_SIZE = 10
+
+# Время жизни кеша ответов по ресурсам, секунд
+USERS_CACHE_TTL = 60
+MEMBERS_CACHE_TTL = 15
+FRIENDS_CACHE_TTL = 15
+
+# Панель "Добавить" в друзья: пользователи читаются страницами по префиксу имени
+USERS_SEARCH_PAGE = 50
+USERS_SEARCH_DELAY = 300  # мс после последнего нажатия клавиши до запроса
+
+# Поток событий рабочей области: сервер шлет keepalive, поэтому тишина
+# дольше этого времени считается обрывом соединения
+EVENTS_READ_TIMEOUT = 45
+EVENTS_RECONNECT_DELAY = 3
+
+# Сколько последних открытых рабочих областей держать в памяти
+WORKSPACE_VIEW_CACHE_SIZE = 5
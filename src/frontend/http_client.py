@@ -0,0 +1,181 @@
+import re
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class _InFlight:
+    """Запрос, который уже выполняется; остальные потоки ждут его результат"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _CacheEntry:
+    def __init__(self, data, etag, fetched_at):
+        self.data = data
+        self.etag = etag
+        self.fetched_at = fetched_at
+
+
+# Идентификаторы в пути заменяются на <id>, чтобы счетчики велись по маршрутам
+_ID_SEGMENT = re.compile(r"/[0-9a-fA-F]{24}(?=/|$)")
+
+
+class ApiClient:
+    """HTTP-клиент бэкенда: общий пул keep-alive соединений, таймауты,
+    повторы с backoff для идемпотентных запросов и счетчики задержек по маршрутам"""
+
+    def __init__(self, base_url, connect_timeout=3.05, read_timeout=10,
+                 retries=3, backoff_factor=0.3, pool_size=10):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(502, 503, 504),
+            # POST не идемпотентен: повторяется только при ошибке соединения
+            allowed_methods=frozenset(["GET", "HEAD", "OPTIONS", "PUT", "DELETE"]),
+            raise_on_status=False,
+            # Ждать Retry-After (до десятков секунд) внутри запроса нельзя: его учитывает вызывающий код
+            respect_retry_after_header=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+        self._cache = {}
+        self._inflight = {}
+        self._cache_lock = threading.Lock()
+        self._cache_generation = 0
+        self.cache_hits = 0
+        self.cache_revalidated = 0
+        self.cache_misses = 0
+
+    def request(self, method, path, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        endpoint = f"{method} {_ID_SEGMENT.sub('/<id>', path)}"
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, f"{self.base_url}{path}", **kwargs)
+        except requests.exceptions.RequestException:
+            self._record(endpoint, time.perf_counter() - started, error=True)
+            raise
+        self._record(endpoint, time.perf_counter() - started, error=response.status_code >= 500)
+        return response
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def put(self, path, **kwargs):
+        return self.request("PUT", path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.request("DELETE", path, **kwargs)
+
+    def get_cached(self, path, ttl, params=None, parse=None):
+        """GET с кешем ответов.
+
+        В пределах ttl секунд ответ берется из кеша без обращения к серверу,
+        после - запрос уходит с If-None-Match и ответ 304 продлевает запись.
+        Одновременные одинаковые запросы объединяются в один. Возвращает
+        разобранный ответ (parse(response), по умолчанию JSON) или None при
+        ошибке сервера. Возвращенные данные общие для всех вызовов - их нельзя изменять.
+        """
+        key = (path, tuple(sorted((params or {}).items())))
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry and time.monotonic() - entry.fetched_at < ttl:
+                self.cache_hits += 1
+                return entry.data
+            inflight = self._inflight.get(key)
+            leader = inflight is None
+            if leader:
+                inflight = self._inflight[key] = _InFlight()
+                generation = self._cache_generation
+
+        if not leader:
+            inflight.event.wait()
+            if inflight.error:
+                raise inflight.error
+            return inflight.result
+
+        try:
+            headers = {"If-None-Match": entry.etag} if entry and entry.etag else {}
+            response = self.get(path, params=params, headers=headers, stream=parse is not None)
+            with response:
+                if response.status_code == 304 and entry:
+                    with self._cache_lock:
+                        entry.fetched_at = time.monotonic()
+                        self.cache_revalidated += 1
+                    inflight.result = entry.data
+                elif response.ok:
+                    data = parse(response) if parse else response.json()
+                    with self._cache_lock:
+                        self.cache_misses += 1
+                        # Ответ, начатый до invalidate(), в кеш не попадает
+                        if generation == self._cache_generation:
+                            self._cache[key] = _CacheEntry(data, response.headers.get("ETag"), time.monotonic())
+                    inflight.result = data
+        except Exception as e:
+            inflight.error = e
+            raise
+        finally:
+            with self._cache_lock:
+                if self._inflight.get(key) is inflight:
+                    del self._inflight[key]
+            inflight.event.set()
+        return inflight.result
+
+    def invalidate(self, path_prefix):
+        """Удаляет из кеша ответы, путь которых начинается с path_prefix"""
+        with self._cache_lock:
+            self._cache_generation += 1
+            for key in [k for k in self._cache if k[0].startswith(path_prefix)]:
+                del self._cache[key]
+            # Новые запросы не должны присоединяться к уже устаревшим
+            for key in [k for k in self._inflight if k[0].startswith(path_prefix)]:
+                del self._inflight[key]
+
+    def cache_stats(self):
+        with self._cache_lock:
+            return {
+                "hits": self.cache_hits,
+                "revalidated": self.cache_revalidated,
+                "misses": self.cache_misses,
+                "size": len(self._cache),
+            }
+
+    def _record(self, endpoint, elapsed, error):
+        with self._stats_lock:
+            stats = self._stats.setdefault(
+                endpoint, {"count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0}
+            )
+            elapsed_ms = elapsed * 1000
+            stats["count"] += 1
+            stats["errors"] += int(error)
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+
+    def latency_stats(self):
+        """Счетчики по маршрутам: число вызовов, ошибок, средняя и максимальная задержка"""
+        with self._stats_lock:
+            return {
+                endpoint: {**stats, "avg_ms": stats["total_ms"] / stats["count"]}
+                for endpoint, stats in self._stats.items()
+            }
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,180 @@
+from PyQt5.QtCore import QAbstractListModel, QEvent, QModelIndex, QRect, QSize, Qt, pyqtSignal
+from PyQt5.QtGui import QColor, QFont, QPen
+from PyQt5.QtWidgets import QStyle, QStyledItemDelegate
+
+TaskIdRole = Qt.UserRole + 1
+TaskRole = Qt.UserRole + 2
+
+ROW_HEIGHT = 50
+
+
+class TaskListModel(QAbstractListModel):
+    """Задачи на выбранную дату, адресуемые по task_id.
+
+    Изменение одной задачи - это вставка, обновление или удаление одной
+    строки; представление не перестраивает остальные.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._tasks = []
+        self._rows = {}
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._tasks)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        task = self._tasks[index.row()]
+        if role in (Qt.DisplayRole, Qt.ToolTipRole):
+            return task.get('text', '')
+        if role == TaskIdRole:
+            return task['task_id']
+        if role == TaskRole:
+            return task
+        return None
+
+    def set_tasks(self, tasks):
+        """Заменяет список целиком (смена даты, первая загрузка)"""
+        self.beginResetModel()
+        self._tasks = []
+        self._rows = {}
+        for task in tasks:
+            task = _normalize(task)
+            if task and task['task_id'] not in self._rows:
+                self._rows[task['task_id']] = len(self._tasks)
+                self._tasks.append(task)
+        self.endResetModel()
+
+    def has_task(self, task_id):
+        return task_id in self._rows
+
+    def upsert_task(self, task):
+        """Добавляет задачу в конец списка или обновляет существующую строку"""
+        task = _normalize(task)
+        if not task:
+            return
+        row = self._rows.get(task['task_id'])
+        if row is not None:
+            self._tasks[row] = {**self._tasks[row], **task}
+            index = self.index(row)
+            self.dataChanged.emit(index, index)
+            return
+        row = len(self._tasks)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._tasks.append(task)
+        self._rows[task['task_id']] = row
+        self.endInsertRows()
+
+    def update_task(self, task_id, **fields):
+        row = self._rows.get(task_id)
+        if row is None:
+            return
+        self._tasks[row] = {**self._tasks[row], **fields}
+        index = self.index(row)
+        self.dataChanged.emit(index, index)
+
+    def remove_task(self, task_id):
+        row = self._rows.get(task_id)
+        if row is None:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._tasks[row]
+        del self._rows[task_id]
+        for shifted in self._tasks[row:]:
+            self._rows[shifted['task_id']] -= 1
+        self.endRemoveRows()
+
+
+def _normalize(task):
+    if not isinstance(task, dict):
+        return None
+    task_id = task.get('_id') or task.get('task_id')
+    if not task_id:
+        return None
+    return {**task, 'task_id': task_id}
+
+
+class TaskItemDelegate(QStyledItemDelegate):
+    """Рисует строку задачи: чекбокс и кнопка удаления зависят от роли.
+
+    Вместо виджета на каждую строку - только отрисовка, поэтому число
+    задач не влияет на стоимость прокрутки.
+    """
+    toggled = pyqtSignal(str, bool)         # task_id, новое состояние
+    delete_requested = pyqtSignal(str)      # task_id
+
+    CHECK_SIZE = 20
+    DELETE_SIZE = QSize(60, 30)
+    MARGIN = 15
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.access_level = None
+        self.text_font = QFont("Arial", 11)
+        self.button_font = QFont("Arial", 9)
+
+    def can_edit(self):
+        return self.access_level in ['admin', 'editor']
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), ROW_HEIGHT)
+
+    def _layout(self, rect):
+        """Прямоугольники чекбокса, текста и кнопки удаления внутри строки"""
+        left = rect.left() + self.MARGIN
+        right = rect.right() - self.MARGIN
+        check_rect = delete_rect = None
+        if self.can_edit():
+            check_rect = QRect(left, rect.center().y() - self.CHECK_SIZE // 2,
+                               self.CHECK_SIZE, self.CHECK_SIZE)
+            left = check_rect.right() + self.MARGIN
+            delete_rect = QRect(right - self.DELETE_SIZE.width() + 1,
+                                rect.center().y() - self.DELETE_SIZE.height() // 2,
+                                self.DELETE_SIZE.width(), self.DELETE_SIZE.height())
+            right = delete_rect.left() - self.MARGIN
+        text_rect = QRect(left, rect.top(), max(right - left, 0), rect.height())
+        return check_rect, text_rect, delete_rect
+
+    def paint(self, painter, option, index):
+        task = index.data(TaskRole)
+        painter.save()
+        painter.setRenderHint(painter.Antialiasing)
+
+        if option.state & QStyle.State_Selected:
+            painter.fillRect(option.rect, QColor("#f0f7ff"))
+        painter.setPen(QColor("#eeeeee"))
+        painter.drawLine(option.rect.bottomLeft(), option.rect.bottomRight())
+
+        check_rect, text_rect, delete_rect = self._layout(option.rect)
+        if check_rect is not None:
+            painter.setPen(QPen(QColor("#4a90e2"), 2))
+            painter.setBrush(QColor("#4a90e2") if task.get('is_done') else Qt.NoBrush)
+            painter.drawRoundedRect(check_rect, 4, 4)
+
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(QColor("#f44336"))
+            painter.drawRoundedRect(delete_rect, 4, 4)
+            painter.setPen(Qt.white)
+            painter.setFont(self.button_font)
+            painter.drawText(delete_rect, Qt.AlignCenter, "Удалить")
+
+        painter.setPen(option.palette.text().color())
+        painter.setFont(self.text_font)
+        text = painter.fontMetrics().elidedText(task.get('text', ''), Qt.ElideRight, text_rect.width())
+        painter.drawText(text_rect, Qt.AlignVCenter | Qt.AlignLeft, text)
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() != QEvent.MouseButtonRelease or event.button() != Qt.LeftButton:
+            return super().editorEvent(event, model, option, index)
+        check_rect, _, delete_rect = self._layout(option.rect)
+        task = index.data(TaskRole)
+        if check_rect is not None and check_rect.contains(event.pos()):
+            self.toggled.emit(task['task_id'], not task.get('is_done'))
+            return True
+        if delete_rect is not None and delete_rect.contains(event.pos()):
+            self.delete_requested.emit(task['task_id'])
+            return True
+        return super().editorEvent(event, model, option, index)
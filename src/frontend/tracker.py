@@ -1,15 +1,43 @@
 import sys
+from collections import OrderedDict
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                             QLabel, QLineEdit, QPushButton, QDateEdit,
-                            QScrollArea, QCheckBox, QListWidget, QListWidgetItem,
+                            QScrollArea, QListView, QListWidget, QListWidgetItem,
                             QSizePolicy, QMessageBox, QFrame, QTabWidget,
                             QStackedWidget, QDialog, QComboBox, QGroupBox)
 from PyQt5.QtCore import QDate, Qt, QSize, QTimer
 from PyQt5.QtGui import QFont, QPixmap, QIcon
-import requests
 
-from config import BASE_URL
-from api import get_all_users, get_friend_recommendations_api, get_workspace_stats, increment_workspace_stat
+from api import (
+    find_user_by_username, search_users, get_friend_recommendations_api, get_workspace_tasks,
+    get_workspace_dashboard,
+    get_workspace_stats, increment_workspace_stat, get_friends_api, add_friend_api, remove_friend_api,
+    get_user_workspaces_api, create_workspace_api, get_workspace_members_api,
+    add_workspace_member_api, remove_workspace_member_api,
+    create_task_api, update_task_status_api, delete_task_api,
+    invalidate_workspace_members, open_workspace_events
+)
+from config import EVENTS_RECONNECT_DELAY, USERS_SEARCH_DELAY, USERS_SEARCH_PAGE, WORKSPACE_VIEW_CACHE_SIZE
+from task_model import TaskItemDelegate, TaskListModel
+from workers import AsyncRequester, EventStream
+
+
+def _fetch_member_candidates(user_id, workspace_id):
+    """Друзья пользователя и текущие участники рабочей области (выполняется в фоне)"""
+    friends = get_friends_api(user_id)
+    members = get_workspace_members_api(workspace_id)
+    return (friends.get('friends', []) if friends else None), members
+
+
+def _fetch_friends_panel(user_id, prefix=None):
+    """Данные панели друзей: друзья, первая страница пользователей по префиксу
+    и рекомендации (выполняется в фоне)"""
+    friends = get_friends_api(user_id)
+    return {
+        "friends": friends.get('friends', []) if friends else None,
+        "users": search_users(prefix=prefix, limit=USERS_SEARCH_PAGE),
+        "recommendations": get_friend_recommendations_api(user_id)
+    }
 
 class CreateWorkspaceDialog(QDialog):
     def __init__(self, parent=None, friends=None):
@@ -55,19 +83,109 @@ class WorkspaceWidget(QWidget):
         self.user_id = user_id
         self.username = username
         self.current_date = QDate.currentDate()
+        self.access_level = None
+        self.stats = {}
+        # Все сетевые вызовы выполняются в пуле потоков
+        self.requester = AsyncRequester(self)
         self.init_ui()
-        self.load_tasks()
 
-        self.stats_timer = QTimer()
+        # Опрос статистики нужен только пока поток событий недоступен
+        self.stats_timer = QTimer(self)
         self.stats_timer.timeout.connect(self.update_stats)
-        self.stats_timer.start(30000) 
+        self.stats_timer.start(30000)
+
+        self.stream_lost = False
+        # Скрытый вид не обновляется и не держит поток событий; stale - данные нужно перечитать при показе
+        self.paused = False
+        self.stale = False
+        workspace_id = self.workspace['_id']
+        self.events = EventStream(
+            lambda: open_workspace_events(workspace_id),
+            reconnect_delay=EVENTS_RECONNECT_DELAY, parent=self
+        )
+        self.events.event_received.connect(self.apply_event)
+        self.events.connected.connect(self.events_connected)
+        self.events.disconnected.connect(self.events_disconnected)
+        self.events.start()
 
 
     def closeEvent(self, event):
         """Останавливаем таймер при закрытии"""
-        self.stats_timer.stop()
+        self.shutdown()
         super().closeEvent(event)
 
+    def shutdown(self):
+        """Останавливает таймер и поток событий, отбрасывает ответы незавершенных запросов"""
+        self.stats_timer.stop()
+        self.events.stop()
+        self.requester.cancel_all()
+
+    def pause(self):
+        """Вид скрыт: останавливаем опрос и поток событий, чтобы скрытый вид не занимал сервер"""
+        self.paused = True
+        self.stats_timer.stop()
+        self.events.stop()
+        # События за время паузы не придут
+        self.stream_lost = True
+        self.stale = True
+
+    def resume(self):
+        """Вид снова показан: переподключаем поток событий и перечитываем данные"""
+        if not self.paused:
+            return
+        self.paused = False
+        # Как при открытии вида: опрос до подключения потока, данные читаются сразу
+        self.stream_lost = False
+        self.stats_timer.start(30000)
+        self.events.start()
+        if self.stale:
+            self.refresh()
+
+    def refresh(self):
+        """Перечитывает роль, участников, задачи и статистику"""
+        if self.paused:
+            self.stale = True
+            return
+        self.stale = False
+        self.load_dashboard()
+
+    def events_connected(self):
+        """Поток событий доступен: опрос не нужен, пропущенное за разрыв перечитываем"""
+        self.stats_timer.stop()
+        if self.stream_lost:
+            self.stream_lost = False
+            self.refresh()
+
+    def events_disconnected(self):
+        if not self.stream_lost:
+            self.stream_lost = True
+            if not self.paused:
+                self.stats_timer.start(30000)
+
+    def apply_event(self, event):
+        """Применяет изменение из потока событий без полной перезагрузки"""
+        event_type = event.get('type')
+        if event_type == 'task_created':
+            task = event.get('task') or {}
+            if task.get('date') == self.current_date.toString("yyyy-MM-dd") and not task.get('is_done'):
+                self.add_task_item(task)
+        elif event_type == 'task_updated':
+            if event.get('is_done'):
+                self.remove_task_item(event.get('task_id'))
+            elif event.get('task'):
+                self.show_updated_task(event['task'])
+            elif not self.task_model.has_task(event.get('task_id')):
+                # Задача снова открыта, а в событии (пакетное изменение) ее нет
+                self.load_tasks()
+        elif event_type == 'task_deleted':
+            self.remove_task_item(event.get('task_id'))
+        elif event_type in ('member_added', 'member_removed'):
+            invalidate_workspace_members(self.workspace['_id'])
+            self.load_access_level()
+        elif event_type == 'stat':
+            self.stats[event['name']] = event['value']
+            self.show_stats(self.stats)
+
     def format_stat_name(self, stat: str) -> str:
         """Форматирует название статистики для красивого отображения в UI"""
         # Заменяем подчеркивания на пробелы и делаем первую букву заглавной
@@ -114,25 +232,25 @@ class WorkspaceWidget(QWidget):
         stats_layout.setContentsMargins(10, 5, 10, 5)
         main_layout.addWidget(self.stats_panel)
 
-        # Панель управления (для администраторов)
-        self.access_level = self.get_user_access_level()
-        if self.access_level == 'admin':
-            self.manage_panel = QHBoxLayout()
-            
-            self.add_member_btn = QPushButton("Добавить участника")
-            self.add_member_btn.setStyleSheet("""
-                QPushButton {
-                    background: #4CAF50;
-                    color: white;
-                    padding: 8px;
-                    border-radius: 4px;
-                }
-            """)
-            self.add_member_btn.clicked.connect(self.show_add_member_dialog)
-            
-            self.manage_panel.addWidget(self.add_member_btn)
-            self.manage_panel.addStretch()
-            main_layout.addLayout(self.manage_panel)
+        # Панель управления (для администраторов), показывается после загрузки роли
+        self.manage_panel = QWidget()
+        manage_layout = QHBoxLayout(self.manage_panel)
+        manage_layout.setContentsMargins(0, 0, 0, 0)
+        self.add_member_btn = QPushButton("Добавить участника")
+        self.add_member_btn.setStyleSheet("""
+            QPushButton {
+                background: #4CAF50;
+                color: white;
+                padding: 8px;
+                border-radius: 4px;
+            }
+        """)
+        self.add_member_btn.clicked.connect(self.show_add_member_dialog)
+
+        manage_layout.addWidget(self.add_member_btn)
+        manage_layout.addStretch()
+        self.manage_panel.hide()
+        main_layout.addWidget(self.manage_panel)
 
         # Область участников
         self.members_scroll = QScrollArea()
@@ -168,83 +286,140 @@ class WorkspaceWidget(QWidget):
         self.date_panel.addStretch()
         main_layout.addLayout(self.date_panel)
         
-        # Список задач
-        self.tasks_list = QListWidget()
+        # Список задач: модель по task_id и отрисовка строк делегатом
+        self.task_model = TaskListModel(self)
+        self.task_delegate = TaskItemDelegate(self)
+        self.task_delegate.toggled.connect(self.toggle_task)
+        self.task_delegate.delete_requested.connect(self.delete_task)
+
+        self.tasks_list = QListView()
+        self.tasks_list.setModel(self.task_model)
+        self.tasks_list.setItemDelegate(self.task_delegate)
+        # Все строки одной высоты: вид не измеряет каждую строку при прокрутке
+        self.tasks_list.setUniformItemSizes(True)
         self.tasks_list.setStyleSheet("""
-            QListWidget {
+            QListView {
                 background: white;
                 border: 1px solid #ddd;
                 border-radius: 8px;
                 padding: 5px;
             }
-            QListWidget::item {
-                border-bottom: 1px solid #eee;
-                height: 50px;
-            }
-            QListWidget::item:selected {
-                background: #f0f7ff;
-            }
         """)
         self.tasks_list.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
         main_layout.addWidget(self.tasks_list)
-        
-        # Панель добавления задачи (недоступна для viewer)
-        if self.access_level != 'viewer':
-            self.add_panel = QHBoxLayout()
-            self.new_task_input = QLineEdit()
-            self.new_task_input.setPlaceholderText("Добавить новую задачу...")
-            self.new_task_input.setStyleSheet("""
-                QLineEdit {
-                    padding: 10px;
-                    border: 1px solid #ddd;
-                    border-radius: 6px;
-                    font-size: 14px;
-                }
-            """)
-            self.new_task_input.returnPressed.connect(self.add_new_task)
-            
-            self.add_btn = QPushButton("Добавить")
-            self.add_btn.setStyleSheet("""
-                QPushButton {
-                    background: #4a90e2;
-                    color: white;
-                    padding: 10px 20px;
-                    border: none;
-                    border-radius: 6px;
-                    font-size: 14px;
-                }
-                QPushButton:hover {
-                    background: #3a7bc8;
-                }
-            """)
-            self.add_btn.clicked.connect(self.add_new_task)
-            
-            self.add_panel.addWidget(self.new_task_input)
-            self.add_panel.addWidget(self.add_btn)
-            main_layout.addLayout(self.add_panel)
-        
+
+        self.tasks_placeholder = QLabel()
+        self.tasks_placeholder.setAlignment(Qt.AlignCenter)
+        self.tasks_placeholder.setStyleSheet("color: gray; padding: 10px;")
+        self.tasks_placeholder.hide()
+        main_layout.addWidget(self.tasks_placeholder)
+        
+        # Панель добавления задачи (недоступна для viewer), показывается после загрузки роли
+        self.add_panel = QWidget()
+        add_layout = QHBoxLayout(self.add_panel)
+        add_layout.setContentsMargins(0, 0, 0, 0)
+        self.new_task_input = QLineEdit()
+        self.new_task_input.setPlaceholderText("Добавить новую задачу...")
+        self.new_task_input.setStyleSheet("""
+            QLineEdit {
+                padding: 10px;
+                border: 1px solid #ddd;
+                border-radius: 6px;
+                font-size: 14px;
+            }
+        """)
+        self.new_task_input.returnPressed.connect(self.add_new_task)
+
+        self.add_btn = QPushButton("Добавить")
+        self.add_btn.setStyleSheet("""
+            QPushButton {
+                background: #4a90e2;
+                color: white;
+                padding: 10px 20px;
+                border: none;
+                border-radius: 6px;
+                font-size: 14px;
+            }
+            QPushButton:hover {
+                background: #3a7bc8;
+            }
+        """)
+        self.add_btn.clicked.connect(self.add_new_task)
+
+        add_layout.addWidget(self.new_task_input)
+        add_layout.addWidget(self.add_btn)
+        self.add_panel.hide()
+        main_layout.addWidget(self.add_panel)
+
         # Настройка основного виджета
         scroll_area.setWidget(scroll_content)
         self.setLayout(QVBoxLayout())
         self.layout().addWidget(scroll_area)
         
-        # Загружаем данные
-        self.update_members_list()
-        self.update_stats()
-        self.load_tasks()
+        # Роль, участники, задачи и статистика приходят одним ответом
+        self.load_dashboard()
+
+
+    def load_dashboard(self):
+        """Загружает роль, участников, задачи за текущую дату и статистику одним запросом"""
+        date_str = self.current_date.toString("yyyy-MM-dd")
+        self.requester.submit(
+            get_workspace_dashboard, self.workspace['_id'], self.user_id, date_str,
+            is_done=False, fields=("text",),
+            channel="dashboard", on_success=lambda data: self.show_dashboard(data, date_str)
+        )
 
+    def show_dashboard(self, data, date_str):
+        if data is None:
+            # Сервер без /dashboard или ошибка: загружаем по отдельности
+            self.load_access_level()
+            self.load_tasks()
+            self.update_stats()
+            return
+        self.apply_access_level(data.get('members'), data.get('role'))
+        if date_str == self.current_date.toString("yyyy-MM-dd"):
+            self.show_tasks(data.get('tasks'))
+        self.show_stats(data.get('stats'))
+
+    def load_access_level(self):
+        """Загружает роль пользователя, затем участников и задачи"""
+        self.requester.submit(
+            get_workspace_members_api, self.workspace['_id'],
+            channel="access", on_success=self.apply_access_level
+        )
+
+    def apply_access_level(self, members, role=None):
+        """Настраивает интерфейс под роль пользователя; без role она ищется среди участников"""
+        previous = self.access_level
+        self.access_level = role or next(
+            (m['role'] for m in members or [] if m['user_id'] == self.user_id), 'viewer'
+        )
+        self.manage_panel.setVisible(self.access_level == 'admin')
+        self.add_panel.setVisible(self.access_level != 'viewer')
+        if members is not None:
+            self.show_members(members)
+        # Вид строк задач зависит от роли: достаточно перерисовать их
+        if self.access_level != previous:
+            self.task_delegate.access_level = self.access_level
+            self.tasks_list.viewport().update()
 
     def update_stats(self):
+        """Запрашивает статистику рабочей области"""
+        self.requester.submit(
+            get_workspace_stats, self.workspace['_id'],
+            channel="stats", on_success=self.show_stats
+        )
+
+    def show_stats(self, stats):
         """Обновляет отображение статистики рабочей области"""
-        # Очищаем текущую статистику
-        for i in reversed(range(self.stats_panel.layout().count())):
-            widget = self.stats_panel.layout().itemAt(i).widget()
+        self.stats = dict(stats or {})
+        # Очищаем текущую статистику вместе с растягивающим элементом
+        layout = self.stats_panel.layout()
+        while layout.count():
+            widget = layout.takeAt(0).widget()
             if widget:
                 widget.deleteLater()
         
-        # Получаем статистику
-        stats = get_workspace_stats(self.workspace['_id'])
-        
         if not stats:
             label = QLabel("Статистика недоступна")
             label.setStyleSheet("color: #6c757d; font-style: italic;")
@@ -281,149 +456,67 @@ class WorkspaceWidget(QWidget):
     
     def load_tasks(self):
         """Загружает только невыполненные задачи для текущей даты"""
-        self.tasks_list.clear()
-        
         date_str = self.current_date.toString("yyyy-MM-dd")
-        response = requests.get(
-            f"{BASE_URL}/workspaces/{self.workspace['_id']}/tasks?date={date_str}"
+        # Выполненные задачи отфильтровываются на сервере; ответ на запрос
+        # за предыдущую дату отбрасывается
+        self.requester.submit(
+            get_workspace_tasks, self.workspace['_id'], date_str, is_done=False, fields=("text",),
+            channel="tasks", on_success=self.show_tasks
         )
-        
-        if response.status_code != 200:
-            item = QListWidgetItem("Не удалось загрузить задачи")
-            item.setFlags(item.flags() & ~Qt.ItemIsSelectable)
-            item.setForeground(Qt.gray)
-            self.tasks_list.addItem(item)
-            return
-            
-        tasks = response.json().get('tasks', [])
-        
-        # Фильтруем только невыполненные задачи
-        incomplete_tasks = [task for task in tasks if not task.get('is_done', False)]
-        
-        if not incomplete_tasks:
-            item = QListWidgetItem("Нет активных задач на эту дату")
-            item.setFlags(item.flags() & ~Qt.ItemIsSelectable)
-            item.setForeground(Qt.gray)
-            self.tasks_list.addItem(item)
+
+    def show_tasks(self, data):
+        """Отображает загруженные задачи"""
+        if data is None:
+            self.task_model.set_tasks([])
+            self.update_tasks_placeholder("Не удалось загрузить задачи")
             return
-            
-        for task in incomplete_tasks:
+
+        self.task_model.set_tasks(data.get('tasks', []))
+        self.update_tasks_placeholder()
+
+    def update_tasks_placeholder(self, text=None):
+        """Показывает заглушку вместо пустого списка"""
+        if text is None and not self.task_model.rowCount():
+            text = "Нет активных задач на эту дату"
+        self.tasks_placeholder.setText(text or "")
+        self.tasks_placeholder.setVisible(bool(text))
+        self.tasks_list.setVisible(not text)
+
+    def show_updated_task(self, task):
+        """Приводит строку к состоянию задачи с сервера: открытая за текущую дату показывается"""
+        if task.get('is_done') or task.get('date') != self.current_date.toString("yyyy-MM-dd"):
+            self.remove_task_item(task.get('task_id'))
+        else:
             self.add_task_item(task)
-    
+
+    def remove_task_item(self, task_id):
+        """Убирает строку задачи из списка, если она показана"""
+        self.task_model.remove_task(task_id)
+        self.update_tasks_placeholder()
+
     def add_task_item(self, task):
-        """Добавляет задачу в список с учетом прав доступа"""
-        if not isinstance(task, dict):
-            return
-            
-        task_id = task.get('_id') or task.get('task_id')
-        if not task_id:
-            return
-            
-        item = QListWidgetItem()
-        widget = QWidget()
-        widget.setFixedHeight(50)
-        layout = QHBoxLayout(widget)
-        
-        # Чекбокс выполнения (только для editor и admin)
-        if self.access_level in ['admin', 'editor']:
-            checkbox = QCheckBox()
-            checkbox.setChecked(False)
-            checkbox.setStyleSheet("""
-                QCheckBox {
-                    spacing: 8px;
-                }
-                QCheckBox::indicator {
-                    width: 20px;
-                    height: 20px;
-                    border: 2px solid #4a90e2;
-                    border-radius: 4px;
-                }
-                QCheckBox::indicator:checked {
-                    background-color: #4a90e2;
-                }
-            """)
-            checkbox.stateChanged.connect(
-                lambda state, task_id=task_id: self.toggle_task(task_id, state == Qt.Checked)
-            )
-            layout.addWidget(checkbox, 0)
-        
-        # Текст задачи
-        task_text = QLabel(task.get('text', ''))
-        task_text.setWordWrap(True)
-        task_text.setStyleSheet("""
-            QLabel {
-                font-size: 14px;
-                padding: 5px 0;
-                margin-right: 15px;
-                min-width: 300px;
-            }
-        """)
-        task_text.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Preferred)
+        """Добавляет задачу в список; повторное добавление обновляет строку"""
+        self.task_model.upsert_task(task)
+        self.update_tasks_placeholder()
 
-        if self.access_level == 'admin' or self.access_level == 'editor':
-            delete_btn = QPushButton("Удалить")
-            delete_btn.setFixedSize(60, 30)
-            delete_btn.setStyleSheet("""
-                QPushButton {
-                    background: #f44336;
-                    color: white;
-                    border: none;
-                    border-radius: 4px;
-                    font-size: 12px;
-                }
-                QPushButton:hover {
-                    background: #d32f2f;
-                }
-            """)
-            delete_btn.clicked.connect(
-                lambda _, task_id=task_id: self.delete_task(task_id)
-            )
-            layout.addWidget(delete_btn, 0, Qt.AlignRight)
-        
-        hide_btn = QPushButton("×")
-        hide_btn.setFont(QFont("Arial", 14, QFont.Bold))
-        hide_btn.setFixedSize(30, 30)
-        hide_btn.setStyleSheet("""
-            QPushButton {
-                border: none;
-                background: transparent;
-                color: #888;
-                border-radius: 15px;
-            }
-            QPushButton:hover {
-                background: #ffebee;
-                color: #f44336;
-            }
-        """)
-        hide_btn.clicked.connect(
-            lambda _, task_id=task_id: self.hide_task(task_id)
+    def show_add_member_dialog(self):
+        # Получаем список друзей и текущих участников
+        self.requester.submit(
+            _fetch_member_candidates, self.user_id, self.workspace['_id'],
+            channel="add_member", on_success=self.open_add_member_dialog
         )
-    
-        layout.addWidget(task_text, 1)
-        # layout.addWidget(hide_btn, 0, Qt.AlignRight)
-        layout.setContentsMargins(15, 5, 15, 5)
-        layout.setSpacing(15)
-        
-        item.setSizeHint(widget.sizeHint())
-        self.tasks_list.addItem(item)
-        self.tasks_list.setItemWidget(item, widget)
 
-    def show_add_member_dialog(self):
-        # Получаем список друзей
-        response = requests.get(f"{BASE_URL}/friends/{self.user_id}")
-        if response.status_code != 200:
+    def open_add_member_dialog(self, result):
+        friends_data, members = result
+        if friends_data is None:
             QMessageBox.warning(self, "Ошибка", "Не удалось загрузить список друзей")
             return
         
-        friends_data = response.json().get('friends', [])
-        
-        # Получаем текущих участников рабочей области
-        response = requests.get(f"{BASE_URL}/workspaces/{self.workspace['_id']}/members")
-        if response.status_code != 200:
+        if members is None:
             QMessageBox.warning(self, "Ошибка", "Не удалось загрузить список участников")
             return
         
-        current_members = [m['user_id'] for m in response.json().get('members', [])]
+        current_members = [m['user_id'] for m in members]
         
         # Фильтруем друзей, которые еще не в рабочей области
         available_friends = [
@@ -437,30 +530,16 @@ class WorkspaceWidget(QWidget):
             if not selection['user_id']:
                 return
                 
-            data = {
-                "admin_id": self.user_id,
-                "user_id": selection['user_id'],
-                "role": selection['role']
-            }
-            
-            response = requests.post(
-                f"{BASE_URL}/workspaces/{self.workspace['_id']}/members",
-                json=data
+            self.requester.submit(
+                add_workspace_member_api, self.workspace['_id'], self.user_id,
+                selection['user_id'], selection['role'],
+                on_success=self.member_added
             )
-            
-            if response.status_code == 200:
-                self.update_members_list()
-                increment_workspace_stat(self.workspace['_id'], 'members_added')
-
-    def get_user_access_level(self):
-        response = requests.get(f"{BASE_URL}/workspaces/{self.workspace['_id']}/members")
-        if response.status_code == 200:
-            members = response.json().get('members', [])
-            for member in members:
-                if member['user_id'] == self.user_id:
-                    return member['role']
-        return 'viewer'
-    
+
+    def member_added(self, success):
+        if success:
+            self.update_members_list()
+            self.requester.submit(increment_workspace_stat, self.workspace['_id'], 'members_added')
 
     def hide_task(self, task_id):
         """Помечает задачу как выполненную (скрывает из списка)"""
@@ -477,47 +556,36 @@ class WorkspaceWidget(QWidget):
         )
         
         if confirm == QMessageBox.Yes:
-            try:
-                data = {
-                    "user_id": self.user_id,
-                    "is_done": True
-                }
-                
-                response = requests.put(
-                    f"{BASE_URL}/workspaces/{self.workspace['_id']}/tasks/{task_id}",
-                    json=data
-                )
-                
-                if response.status_code == 200:
-                    self.load_tasks()  # Перезагружаем список задач
-                else:
-                    QMessageBox.warning(self, "Ошибка", "Не удалось обновить задачу")
-            except Exception as e:
-                QMessageBox.warning(self, "Ошибка", f"Ошибка соединения: {str(e)}")
+            self.requester.submit(
+                update_task_status_api, self.workspace['_id'], task_id, self.user_id, True,
+                on_success=lambda task: self.task_hidden(task, task_id)
+            )
+
+    def task_hidden(self, task, task_id):
+        if task:
+            self.remove_task_item(task_id)
+        else:
+            QMessageBox.warning(self, "Ошибка", "Не удалось обновить задачу")
     
     def update_members_list(self):
+        """Запрашивает список участников рабочей области"""
+        self.requester.submit(
+            get_workspace_members_api, self.workspace['_id'],
+            channel="members", on_success=self.show_members
+        )
+
+    def show_members(self, members):
         """Обновляет список участников рабочей области с автоматической высотой"""
+        if members is None:
+            return
+
         # Очищаем текущий список
         for i in reversed(range(self.members_layout.count())): 
             widget = self.members_layout.itemAt(i).widget()
             if widget:
                 widget.setParent(None)
         
-        # Получаем данные участников
         try:
-            response = requests.get(f"{BASE_URL}/workspaces/{self.workspace['_id']}/members")
-            if response.status_code != 200:
-                return
-                
-            members = response.json().get('members', [])
-            
-            users_response = requests.get(f"{BASE_URL}/users")
-            if users_response.status_code != 200:
-                return
-                
-            all_users = users_response.json().get('users', [])
-            user_dict = {user['_id']: user['username'] for user in all_users}
-            
             # Добавляем заголовок
             header = QLabel("Участники:")
             header.setFont(QFont("Arial", 10, QFont.Bold))
@@ -525,7 +593,7 @@ class WorkspaceWidget(QWidget):
             
             # Добавляем участников
             for i, member in enumerate(members):
-                username = user_dict.get(member['user_id'], "Неизвестный пользователь")
+                username = member.get('username', "Неизвестный пользователь")
                 
                 member_widget = QWidget()
                 member_layout = QHBoxLayout(member_widget)
@@ -617,21 +685,20 @@ class WorkspaceWidget(QWidget):
             return
             
         date_str = self.current_date.toString("yyyy-MM-dd")
-        data = {
-            "user_id": self.user_id,
-            "text": text,
-            "date": date_str
-        }
-        
-        response = requests.post(
-            f"{BASE_URL}/workspaces/{self.workspace['_id']}/tasks",
-            json=data
+        self.requester.submit(
+            create_task_api, self.workspace['_id'], self.user_id, text, date_str,
+            on_success=lambda task_id: self.task_created(
+                task_id, {"task_id": task_id, "text": text, "date": date_str, "is_done": False}
+            )
         )
-        
-        if response.status_code == 201:
+
+    def task_created(self, task_id, task):
+        if task_id:
             self.new_task_input.clear()
-            self.load_tasks()
-            increment_workspace_stat(self.workspace['_id'], 'tasks_created')
+            # Событие task_created из потока может прийти раньше - дубль не добавится
+            if task['date'] == self.current_date.toString("yyyy-MM-dd"):
+                self.add_task_item(task)
+            self.requester.submit(increment_workspace_stat, self.workspace['_id'], 'tasks_created')
         else:
             QMessageBox.warning(self, "Ошибка", "Не удалось добавить задачу")
     
@@ -639,27 +706,21 @@ class WorkspaceWidget(QWidget):
         """Обновляет статус задачи (для чекбокса)"""
         if self.access_level not in ['admin', 'editor']:
             return
-            
-        try:
-            data = {
-                "user_id": self.user_id,
-                "is_done": completed
-            }
-            
-            response = requests.put(
-                f"{BASE_URL}/workspaces/{self.workspace['_id']}/tasks/{task_id}",
-                json=data
-            )
-            
-            if response.status_code == 200:
-                if completed:
-                    self.load_tasks()  # Перезагружаем список, если задача выполнена
-            else:
-                QMessageBox.warning(self, "Ошибка", "Не удалось обновить задачу")
-                self.load_tasks()  # Восстанавливаем состояние
-        except Exception as e:
-            QMessageBox.warning(self, "Ошибка", f"Ошибка соединения: {str(e)}")
-            self.load_tasks()
+
+        # Отмечаем строку сразу, не дожидаясь ответа сервера
+        self.task_model.update_task(task_id, is_done=completed)
+        self.requester.submit(
+            update_task_status_api, self.workspace['_id'], task_id, self.user_id, completed,
+            on_success=lambda task: self.task_toggled(task, task_id)
+        )
+
+    def task_toggled(self, task, task_id):
+        if task:
+            # Ответ содержит задачу целиком - перечитывать список не нужно
+            self.show_updated_task(task)
+        else:
+            QMessageBox.warning(self, "Ошибка", "Не удалось обновить задачу")
+            self.load_tasks()  # Восстанавливаем состояние
     
 
     def remove_member(self, user_id):
@@ -675,27 +736,19 @@ class WorkspaceWidget(QWidget):
         if confirm == QMessageBox.No:
             return
         
-        try:
-            data = {
-                "requester_id": self.user_id,
-                "target_id": user_id
-            }
-            
-            response = requests.delete(
-                f"{BASE_URL}/workspaces/{self.workspace['_id']}/members",
-                json=data
-            )
-            
-            if response.status_code == 200:
-                QMessageBox.information(self, "Успех", "Участник удален")
-                self.update_members_list()
-                increment_workspace_stat(self.workspace['_id'], 'members_removed')
-            else:
-                error = response.json().get('error', 'Неизвестная ошибка')
-                QMessageBox.warning(self, "Ошибка", f"Не удалось удалить участника: {error}")
-                
-        except Exception as e:
-            QMessageBox.warning(self, "Ошибка", f"Ошибка соединения: {str(e)}")
+        self.requester.submit(
+            remove_workspace_member_api, self.workspace['_id'], self.user_id, user_id,
+            on_success=self.member_removed
+        )
+
+    def member_removed(self, result):
+        success, error = result
+        if success:
+            QMessageBox.information(self, "Успех", "Участник удален")
+            self.update_members_list()
+            self.requester.submit(increment_workspace_stat, self.workspace['_id'], 'members_removed')
+        else:
+            QMessageBox.warning(self, "Ошибка", f"Не удалось удалить участника: {error}")
 
     def delete_task(self, task_id):
         """Удаляет задачу после подтверждения"""
@@ -714,36 +767,47 @@ class WorkspaceWidget(QWidget):
         if confirm == QMessageBox.No:
             return
         
-        try:
-            data = {"user_id": self.user_id}
-            response = requests.delete(
-                f"{BASE_URL}/workspaces/{self.workspace['_id']}/tasks/{task_id}",
-                json=data
-            )
-            
-            if response.status_code == 200:
-                QMessageBox.information(self, "Успех", "Задача удалена")
-                self.load_tasks()  # Обновляем список задач
-            else:
-                error = response.json().get('error', 'Не удалось удалить задачу')
-                QMessageBox.warning(self, "Ошибка", error)
-        except Exception as e:
-            QMessageBox.warning(self, "Ошибка", f"Ошибка соединения: {str(e)}")
+        self.requester.submit(
+            delete_task_api, self.workspace['_id'], task_id, self.user_id,
+            on_success=lambda result: self.task_deleted(result, task_id)
+        )
+
+    def task_deleted(self, result, task_id):
+        success, error = result
+        if success:
+            self.remove_task_item(task_id)
+            QMessageBox.information(self, "Успех", "Задача удалена")
+        else:
+            QMessageBox.warning(self, "Ошибка", error)
 
 class TodoTracker(QMainWindow):
     def __init__(self, username):
         super().__init__()
         self.username = username
-
-        users = get_all_users()
-        for user in users:
-            if user['username'] == username:
-                self.user_id = user['_id']
+        self.user_id = None
+        # Виды рабочих областей в порядке последнего показа (LRU)
+        self.workspace_views = OrderedDict()
+        self.requester = AsyncRequester(self)
 
         self.current_date = QDate.currentDate()
         self.workspaces = []
+        # Панель "Добавить": друзья не предлагаются, следующая страница - по курсору
+        self.friend_ids = set()
+        self.suggested_cursor = None
         self.init_ui()
+        self.requester.submit(
+            find_user_by_username, username,
+            channel="user", on_success=self.user_loaded
+        )
+
+    def user_loaded(self, user):
+        """Получив ID пользователя, загружаем рабочие области и друзей"""
+        if not user:
+            QMessageBox.warning(self, "Ошибка", "Не удалось загрузить пользователя")
+            return
+        self.user_id = user['_id']
         self.load_workspaces()
+        self.load_friends_data()
         
     def init_ui(self):
         self.setWindowTitle(f"Todo Tracker - {self.username}")
@@ -891,10 +955,30 @@ class TodoTracker(QMainWindow):
         self.friends_list = self.create_styled_list()
         self.suggested_list = self.create_styled_list()
         self.recommendations_list = self.create_styled_list()
+
+        # Пользователи для добавления: поиск по началу имени и постраничная подгрузка
+        suggested_page = QWidget()
+        suggested_layout = QVBoxLayout(suggested_page)
+        suggested_layout.setContentsMargins(0, 0, 0, 0)
+        self.user_search = QLineEdit()
+        self.user_search.setPlaceholderText("Поиск по имени...")
+        self.more_users_btn = QPushButton("Показать еще")
+        self.more_users_btn.setVisible(False)
+        suggested_layout.addWidget(self.user_search)
+        suggested_layout.addWidget(self.suggested_list)
+        suggested_layout.addWidget(self.more_users_btn)
+
+        # Запрос уходит после паузы в наборе, а не на каждую клавишу
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(USERS_SEARCH_DELAY)
+        self.search_timer.timeout.connect(self.search_suggested)
+        self.user_search.textChanged.connect(self.search_timer.start)
+        self.more_users_btn.clicked.connect(self.load_more_suggested)
         
         # Добавляем списки в stacked widget
         self.friends_stack.addWidget(self.friends_list)
-        self.friends_stack.addWidget(self.suggested_list)
+        self.friends_stack.addWidget(suggested_page)
         self.friends_stack.addWidget(self.recommendations_list)
 
         # Подключаем кнопки к переключению
@@ -912,12 +996,16 @@ class TodoTracker(QMainWindow):
         main_layout.addWidget(right_panel, 30)
         
         self.setCentralWidget(main_widget)
-        self.load_friends_data()
     
     def load_workspaces(self):
-        response = requests.get(f"{BASE_URL}/users/{self.user_id}/workspaces")
-        if response.status_code == 200:
-            self.workspaces = response.json().get('workspaces', [])
+        self.requester.submit(
+            get_user_workspaces_api, self.user_id,
+            channel="workspaces", on_success=self.show_workspaces
+        )
+
+    def show_workspaces(self, workspaces):
+        if workspaces is not None:
+            self.workspaces = workspaces
             self.workspace_list.clear()
             
             for ws in self.workspaces:
@@ -925,6 +1013,11 @@ class TodoTracker(QMainWindow):
                 item.setData(Qt.UserRole, ws['_id'])
                 self.workspace_list.addItem(item)
             
+            # Виды удаленных или недоступных рабочих областей больше не нужны
+            listed = {ws['_id'] for ws in self.workspaces}
+            for workspace_id in [w for w in self.workspace_views if w not in listed]:
+                self.drop_workspace_view(workspace_id)
+
             if self.workspaces:
                 self.show_workspace(self.workspace_list.item(0))
             else:
@@ -932,7 +1025,10 @@ class TodoTracker(QMainWindow):
                 while self.workspace_container.count() > 0:
                     widget = self.workspace_container.widget(0)
                     self.workspace_container.removeWidget(widget)
+                    if isinstance(widget, WorkspaceWidget):
+                        widget.shutdown()
                     widget.deleteLater()
+                self.workspace_views.clear()
 
                 label = QLabel("У вас нет рабочих областей. Создайте новую.")
                 label.setAlignment(Qt.AlignCenter)
@@ -946,32 +1042,56 @@ class TodoTracker(QMainWindow):
         workspace = next((ws for ws in self.workspaces if ws['_id'] == workspace_id), None)
         
         if workspace:
-            # Удаляем предыдущий виджет, если он есть
-            if self.workspace_container.count() > 0:
-                old_widget = self.workspace_container.currentWidget()
-                self.workspace_container.removeWidget(old_widget)
-                old_widget.deleteLater()
-            
-            # Создаем и добавляем новый виджет рабочей области
-            ws_widget = WorkspaceWidget(workspace, self.user_id, self.username)
-            self.workspace_container.addWidget(ws_widget)
+            old_widget = self.workspace_container.currentWidget()
+
+            # Недавно открытые рабочие области показываются из кеша видов
+            ws_widget = self.workspace_views.pop(workspace_id, None)
+            if ws_widget is None:
+                ws_widget = WorkspaceWidget(workspace, self.user_id, self.username)
+                self.workspace_container.addWidget(ws_widget)
+            self.workspace_views[workspace_id] = ws_widget
+
+            if old_widget is not None and old_widget is not ws_widget:
+                if isinstance(old_widget, WorkspaceWidget):
+                    old_widget.pause()
+                else:
+                    # Заглушка "нет рабочих областей"
+                    self.workspace_container.removeWidget(old_widget)
+                    old_widget.deleteLater()
+
             self.workspace_container.setCurrentWidget(ws_widget)
+            ws_widget.resume()
+
+            while len(self.workspace_views) > WORKSPACE_VIEW_CACHE_SIZE:
+                self.drop_workspace_view(next(iter(self.workspace_views)))
+
+    def closeEvent(self, event):
+        """Останавливаем потоки событий всех открытых рабочих областей"""
+        for ws_widget in self.workspace_views.values():
+            ws_widget.shutdown()
+        super().closeEvent(event)
+
+    def drop_workspace_view(self, workspace_id):
+        """Удаляет вид рабочей области из кеша и останавливает его запросы"""
+        ws_widget = self.workspace_views.pop(workspace_id)
+        self.workspace_container.removeWidget(ws_widget)
+        ws_widget.shutdown()
+        ws_widget.deleteLater()
     
     def show_create_workspace_dialog(self):
         dialog = CreateWorkspaceDialog(self)
         if dialog.exec_() == QDialog.Accepted:
             data = dialog.get_data()
-            data['user_id'] = self.user_id
-            
-            response = requests.post(
-                f"{BASE_URL}/workspaces",
-                json=data
+            self.requester.submit(
+                create_workspace_api, data['name'], self.user_id,
+                on_success=self.workspace_created
             )
-            
-            if response.status_code == 201:
-                self.load_workspaces()
-            else:
-                QMessageBox.warning(self, "Ошибка", "Не удалось создать рабочую область")
+
+    def workspace_created(self, success):
+        if success:
+            self.load_workspaces()
+        else:
+            QMessageBox.warning(self, "Ошибка", "Не удалось создать рабочую область")
     
     def create_styled_list(self):
         """Создает стилизованный QListWidget"""
@@ -1010,79 +1130,100 @@ class TodoTracker(QMainWindow):
         return list_widget
     
     def load_friends_data(self):
-        """Загрузка данных о друзьях и предложенных пользователях"""
-        # Получаем текущих друзей
-        response = requests.get(f"{BASE_URL}/friends/{self.user_id}")
-        if response.status_code == 200:
-            friends_data = response.json().get('friends', [])
-            friend_ids = {f['user_id'] for f in friends_data}
-        else:
-            friend_ids = set()
-        
-        # Получаем всех пользователей
-        response = requests.get(f"{BASE_URL}/users")
-        if response.status_code != 200:
-            self.show_message_in_list(self.friends_list, "Не удалось загрузить друзей")
-            self.show_message_in_list(self.suggested_list, "Не удалось загрузить пользователей")
+        """Загрузка друзей, первой страницы пользователей для добавления и рекомендаций"""
+        if not self.user_id:
             return
-        
-        all_users = response.json().get('users', [])
-        
-        # Разделяем на друзей и других пользователей
-        friends = []
-        suggested = []
-    
-        for user in all_users:
-            user_id = user.get('_id', '')
-            username = user.get('username', '').strip()
-                
-            if not username or username.lower() == self.username.lower():
-                continue
-                    
-            if user_id in friend_ids:
-                friends.append(user)
-            else:
-                suggested.append(user)
-    
-        # Получаем рекомендации
-        recommendations = get_friend_recommendations_api(self.user_id)
-        
-        # Отображаем друзей
-        if friends:
-            self.add_users_to_list(friends, self.friends_list, is_friend=True)
-        else:
-            self.show_message_in_list(self.friends_list, "У вас пока нет друзей")
-        
-        # Отображаем предложенных друзей
-        if suggested:
-            self.add_users_to_list(suggested, self.suggested_list, is_friend=False)
+        # Ответ содержит и первую страницу поиска - запущенный поиск устарел
+        self.search_timer.stop()
+        self.requester.cancel("suggested")
+        self.requester.submit(
+            _fetch_friends_panel, self.user_id, self.user_search.text().strip() or None,
+            channel="friends", on_success=self.show_friends_data
+        )
+
+    def show_friends_data(self, data):
+        """Отображение друзей, предложенных пользователей и рекомендаций"""
+        friends_data = data["friends"]
+        if friends_data is None:
+            self.show_message_in_list(self.friends_list, "Не удалось загрузить друзей")
         else:
-            self.show_message_in_list(self.suggested_list, "Нет пользователей для добавления")
+            self.friend_ids = {f['user_id'] for f in friends_data}
+            friends = [
+                {"_id": f['user_id'], "username": f['username']}
+                for f in friends_data if f.get('username', '').strip()
+            ]
+            if friends:
+                self.add_users_to_list(friends, self.friends_list, is_friend=True)
+            else:
+                self.show_message_in_list(self.friends_list, "У вас пока нет друзей")
 
+        self.show_suggested(data["users"])
+
+        recommendations = data["recommendations"]
         if recommendations:
             self.add_recommendations_to_list(recommendations)
         else:
             self.show_message_in_list(self.recommendations_list, "Нет рекомендаций")
-    
+
+    def search_suggested(self):
+        """Первая страница пользователей, чье имя начинается с введенного текста"""
+        if not self.user_id:
+            return
+        self.requester.submit(
+            search_users, prefix=self.user_search.text().strip() or None, limit=USERS_SEARCH_PAGE,
+            channel="suggested", on_success=self.show_suggested
+        )
+
+    def load_more_suggested(self):
+        """Следующая страница текущего поиска"""
+        if not self.suggested_cursor:
+            return
+        self.more_users_btn.setEnabled(False)
+        self.requester.submit(
+            search_users, prefix=self.user_search.text().strip() or None,
+            cursor=self.suggested_cursor, limit=USERS_SEARCH_PAGE,
+            channel="suggested", on_success=lambda page: self.show_suggested(page, append=True)
+        )
+
+    def show_suggested(self, page, append=False):
+        """Показывает страницу (users, next_cursor) без себя и текущих друзей"""
+        users, next_cursor = page
+        self.more_users_btn.setEnabled(True)
+        if users is None:
+            if not append:
+                self.show_message_in_list(self.suggested_list, "Не удалось загрузить пользователей")
+            return
+
+        suggested = [
+            user for user in users
+            if user.get('username', '').strip()
+            and user['username'].lower() != self.username.lower()
+            and user['_id'] not in self.friend_ids
+        ]
+        self.suggested_cursor = next_cursor
+        self.more_users_btn.setVisible(bool(next_cursor))
+        if suggested:
+            self.add_users_to_list(suggested, self.suggested_list, is_friend=False, clear=not append)
+        elif not append:
+            self.show_message_in_list(self.suggested_list, "Нет пользователей для добавления")
+
     def add_recommendations_to_list(self, recommendations):
         """Добавляет рекомендации в список с дополнительной информацией"""
         self.recommendations_list.clear()
 
-        all_users = get_all_users()
-        users_dict = {user['_id']: user for user in all_users}
-        
         for rec in recommendations:
+            # Имя пользователя приходит вместе с рекомендацией
+            username = rec.get('username')
+            if not username:
+                continue
+
             item = QListWidgetItem()
             widget = QWidget()
             layout = QHBoxLayout(widget)
             layout.setContentsMargins(10, 5, 10, 5)
 
             # Аватар
-            user_info = users_dict.get(rec['user_id'])
-            if not user_info:
-                continue
-
-            avatar = QLabel(user_info['username'][0].upper())
+            avatar = QLabel(username[0].upper())
             avatar.setAlignment(Qt.AlignCenter)
             avatar.setStyleSheet("""
                 background: #4a90e2;
@@ -1097,7 +1238,7 @@ class TodoTracker(QMainWindow):
 
             # Информация о пользователе
             info_layout = QVBoxLayout()
-            name_label = QLabel(user_info['username'])
+            name_label = QLabel(username)
             name_label.setStyleSheet("font-size: 14px; font-weight: bold;")
             
             common_label = QLabel(f"Общих друзей: {rec.get('common_friends', 0)}")
@@ -1138,9 +1279,10 @@ class TodoTracker(QMainWindow):
         item.setFlags(item.flags() & ~Qt.ItemIsSelectable)
         list_widget.addItem(item)
     
-    def add_users_to_list(self, users, list_widget, is_friend):
+    def add_users_to_list(self, users, list_widget, is_friend, clear=True):
         """Стилизованное добавление пользователей в список"""
-        list_widget.clear()
+        if clear:
+            list_widget.clear()
         
         for user in users:
             item = QListWidgetItem()
@@ -1205,34 +1347,26 @@ class TodoTracker(QMainWindow):
     
     def add_friend(self, friend_id):
         """Добавление пользователя в друзья"""
-        data = {
-            "user_id": self.user_id,
-            "friend_id": friend_id
-        }
-        
-        response = requests.post(
-            f"{BASE_URL}/friends",
-            json=data
+        self.requester.submit(
+            add_friend_api, self.user_id, friend_id,
+            on_success=self.friend_added
         )
-        
-        if response.status_code == 200:
+
+    def friend_added(self, success):
+        if success:
             self.load_friends_data()
         else:
             QMessageBox.warning(self, "Ошибка", "Не удалось добавить друга")
     
     def remove_friend(self, friend_id):
         """Удаление пользователя из друзей"""
-        data = {
-            "user_id": self.user_id,
-            "friend_id": friend_id
-        }
-        
-        response = requests.delete(
-            f"{BASE_URL}/friends",
-            json=data
+        self.requester.submit(
+            remove_friend_api, self.user_id, friend_id,
+            on_success=self.friend_removed
         )
-        
-        if response.status_code == 200:
+
+    def friend_removed(self, success):
+        if success:
             self.load_friends_data()
         else:
             QMessageBox.warning(self, "Ошибка", "Не удалось удалить друга")
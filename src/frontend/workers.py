@@ -0,0 +1,173 @@
+import itertools
+import json
+from PyQt5.QtCore import QObject, QRunnable, QThread, QThreadPool, pyqtSignal, pyqtSlot
+
+
+class RequestSignals(QObject):
+    """Сигналы фоновой задачи; доставляются в поток интерфейса"""
+    finished = pyqtSignal(object, object)  # token, результат
+    failed = pyqtSignal(object, str)       # token, текст ошибки
+
+
+class RequestTask(QRunnable):
+    """Выполняет блокирующий вызов API в пуле потоков"""
+
+    def __init__(self, token, fn, args, kwargs):
+        super().__init__()
+        self.token = token
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = RequestSignals()
+
+    @pyqtSlot()
+    def run(self):
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            self.signals.failed.emit(self.token, str(e))
+        else:
+            self.signals.finished.emit(self.token, result)
+
+
+class AsyncRequester(QObject):
+    """Запускает вызовы API вне потока интерфейса и возвращает результат через сигналы.
+
+    Запросы одного канала (channel) вытесняют друг друга: ответ на устаревший
+    запрос отбрасывается. cancel() отменяет ответы канала, cancel_all() - все.
+    """
+
+    def __init__(self, parent=None, pool=None):
+        super().__init__(parent)
+        self.pool = pool or QThreadPool.globalInstance()
+        self._generations = {}
+        self._callbacks = {}
+        self._running = {}
+        self._counter = itertools.count()
+
+    def submit(self, fn, *args, channel=None, on_success=None, on_error=None, **kwargs):
+        if channel is None:
+            channel = ("once", next(self._counter))
+        generation = self._generations.get(channel, 0) + 1
+        self._generations[channel] = generation
+        token = (channel, generation)
+
+        task = RequestTask(token, fn, args, kwargs)
+        task.signals.finished.connect(self._on_finished)
+        task.signals.failed.connect(self._on_failed)
+        # Держим ссылку на сигналы, пока задача не завершится
+        self._running[token] = task.signals
+        self._callbacks[token] = (on_success, on_error)
+        self.pool.start(task)
+        return token
+
+    def cancel(self, channel):
+        """Отбрасывает ответы на все запущенные запросы канала"""
+        self._generations[channel] = self._generations.get(channel, 0) + 1
+        for token in [t for t in self._callbacks if t[0] == channel]:
+            del self._callbacks[token]
+
+    def cancel_all(self):
+        for channel in list(self._generations):
+            self._generations[channel] += 1
+        self._callbacks.clear()
+
+    def _take_callbacks(self, token):
+        self._running.pop(token, None)
+        callbacks = self._callbacks.pop(token, None)
+        channel, generation = token
+        current = self._generations.get(channel)
+        if isinstance(channel, tuple) and channel[0] == "once":
+            self._generations.pop(channel, None)
+        if callbacks is None or current != generation:
+            return None
+        return callbacks
+
+    def _on_finished(self, token, result):
+        callbacks = self._take_callbacks(token)
+        if callbacks and callbacks[0]:
+            callbacks[0](result)
+
+    def _on_failed(self, token, message):
+        callbacks = self._take_callbacks(token)
+        if callbacks and callbacks[1]:
+            callbacks[1](message)
+        elif callbacks:
+            print(f"Request error: {message}")
+
+
+class EventStream(QThread):
+    """Читает поток событий сервера (SSE) в отдельном потоке.
+
+    open_stream() возвращает ответ requests с stream=True. При обрыве поток
+    переподключается через reconnect_delay секунд (или через Retry-After
+    ответа с ошибкой, если он больше); события, пропущенные за время
+    разрыва, не восстанавливаются - подписчик перечитывает данные по
+    сигналу connected. stop() не вызывает disconnected.
+    """
+    event_received = pyqtSignal(dict)
+    connected = pyqtSignal()
+    disconnected = pyqtSignal()
+
+    def __init__(self, open_stream, reconnect_delay=3, parent=None):
+        super().__init__(parent)
+        self.open_stream = open_stream
+        self.reconnect_delay = reconnect_delay
+        self._stopped = False
+        self._response = None
+
+    def run(self):
+        while not self._stopped:
+            delay = self.reconnect_delay
+            try:
+                self._response = self.open_stream()
+                if self._response.ok:
+                    self.connected.emit()
+                    self._read_events(self._response)
+                else:
+                    # 503 от перегруженного сервера говорит, когда повторить
+                    retry_after = self._response.headers.get("Retry-After", "")
+                    if retry_after.isdigit():
+                        delay = max(delay, int(retry_after))
+            except Exception as e:
+                if not self._stopped:
+                    print(f"Event stream error: {e}")
+            finally:
+                response, self._response = self._response, None
+                if response is not None:
+                    response.close()
+            if self._stopped:
+                break
+            self.disconnected.emit()
+            # Ждем короткими интервалами, чтобы stop() не блокировался
+            for _ in range(int(delay * 10)):
+                if self._stopped:
+                    break
+                self.msleep(100)
+
+    def _read_events(self, response):
+        data = []
+        for line in response.iter_lines(decode_unicode=True):
+            if self._stopped:
+                return
+            if line.startswith("data:"):
+                data.append(line[5:].lstrip())
+            elif not line and data:
+                try:
+                    self.event_received.emit(json.loads("\n".join(data)))
+                except ValueError:
+                    pass
+                data = []
+
+    def start(self):
+        """Запускает чтение; после stop() поток можно запустить снова"""
+        self._stopped = False
+        super().start()
+
+    def stop(self, timeout_ms=2000):
+        """Закрывает соединение и дожидается завершения потока"""
+        self._stopped = True
+        response = self._response
+        if response is not None:
+            response.close()
+        self.wait(timeout_ms)